@@ -0,0 +1,143 @@
+"""Import-time report of the Streamlit page scripts.
+
+Runs the imports at the head of each page in a fresh interpreter with
+`python -X importtime`, as a cold process does before rendering anything,
+and reports the total time, the slowest modules and any heavy library
+loaded. Heavy libraries must only be imported by the sections that render
+them, so the script exits with status 1 when a page loads one up front or
+goes over the budget.
+
+    poetry run python benchmarks/import_time.py
+    poetry run python benchmarks/import_time.py --budget-ms 1500 --top 5
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+PAGES = [SRC / "Dashboard.py", *sorted((SRC / "pages").glob("[0-9]*.py"))]
+
+HEAVY_MODULES = ("pandas", "plotly.express")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class PageReport:
+    page: str
+    timings: list[ImportTiming] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return (
+            sum(t.cumulative_us for t in self.timings if t.depth == 0) / 1000
+        )
+
+    @property
+    def heavy_modules(self) -> list[str]:
+        loaded = {t.module for t in self.timings}
+        return [module for module in HEAVY_MODULES if module in loaded]
+
+    def slowest(self, top: int) -> list[ImportTiming]:
+        return sorted(self.timings, key=lambda t: t.self_us, reverse=True)[
+            :top
+        ]
+
+
+def head_imports(script: Path) -> str:
+    """Returns the import statements a page runs before any other code"""
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    statements = []
+    for node in tree.body:
+        if not isinstance(node, ast.Import | ast.ImportFrom):
+            break
+        statements.append(ast.unparse(node))
+    return "\n".join(statements)
+
+
+def parse_importtime(stderr: str) -> list[ImportTiming]:
+    """Parses the `import time: self | cumulative | module` lines"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split(
+            "|"
+        )
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        module = name.rstrip()
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        timings.append(
+            ImportTiming(
+                module.strip(), int(self_us), int(cumulative_us), depth
+            )
+        )
+    return timings
+
+
+def measure_page(script: Path) -> PageReport:
+    """Imports the head of a page in a new interpreter and times it.
+
+    It runs in a temporary directory so the SQLite file created by the
+    database module does not land in the repository.
+    """
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", head_imports(script)],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return PageReport(script.name, parse_importtime(result.stderr))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="fail when the imports of a page take longer than this",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="slowest modules to list"
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    for script in PAGES:
+        report = measure_page(script)
+        print(f"{report.page}: {report.total_ms:.1f} ms")
+        for timing in report.slowest(args.top):
+            print(
+                f"  {timing.self_us / 1000:8.1f} ms  "
+                f"{timing.cumulative_us / 1000:8.1f} ms  {timing.module}"
+            )
+        if report.heavy_modules:
+            failed = True
+            print(f"  heavy modules loaded: {', '.join(report.heavy_modules)}")
+        if args.budget_ms is not None and report.total_ms > args.budget_ms:
+            failed = True
+            print(f"  over the budget of {args.budget_ms:.0f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Load test of concurrent sessions built on Streamlit's AppTest.
+
+Each simulated session runs in its own process, like a browser tab with
+its own Streamlit session, and for `--duration` seconds picks scripted
+actions from the `--mix`: viewing the Dashboard or registering a task on
+the admin page. Every session talks to the same seeded database, a
+temporary SQLite file unless POSTGRESCONNECTIONSTRING is set.
+
+AppTest swaps Streamlit's global runtime on every run, so sessions cannot
+share one process. Each process therefore keeps its own caches, and the
+queries per run it reports are an upper bound for a single server where
+every session reads the same snapshot.
+
+The report covers throughput, p50/p95/p99 render latency per action,
+database queries per run and the memory each session adds to its
+process.
+
+    poetry run python benchmarks/load_test.py --sessions 50 --duration 60
+    poetry run python benchmarks/load_test.py --mix dashboard=1 --youths 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+DASHBOARD = SRC / "Dashboard.py"
+REGISTRATION = SRC / "pages" / "2_📝_Registro_das_Tarefas.py"
+
+ACTIONS = ("dashboard", "register")
+DEFAULT_MIX = "dashboard=9,register=1"
+# Password of the admin pages during the test
+LOAD_TEST_AUTH = "load-test"
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parses `action=weight` pairs, e.g. `dashboard=9,register=1`"""
+    weights = {}
+    for pair in mix.split(","):
+        action, _, weight = pair.partition("=")
+        action = action.strip()
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action!r}")
+        weights[action] = float(weight or 1)
+    return weights
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    """p50, p95 and p99 of a list of latencies, in milliseconds"""
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    if len(latencies) == 1:
+        cuts = [latencies[0]] * 99
+    else:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50": cuts[49] * 1000,
+        "p95": cuts[94] * 1000,
+        "p99": cuts[98] * 1000,
+    }
+
+
+def rss_bytes() -> int:
+    """Resident memory of the current process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak instead of current where /proc is missing; KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def seed_database(youths: int, entries: int, seed: int = 0) -> None:
+    """Fills the database with youths, repeatable tasks and entries spread
+    over the last weeks"""
+    sys.path.insert(0, str(SRC))
+    from sqlmodel import Session
+
+    import database
+
+    rng = random.Random(seed)
+    with Session(database.engine) as session:
+        youth_rows = [
+            database.YouthFormData(
+                name=f"Jovem {i}",
+                age=rng.randint(12, 18),
+                organization=rng.choice(["Rapazes", "Moças"]),
+                total_points=0,
+            )
+            for i in range(youths)
+        ]
+        task_rows = [
+            database.TasksFormData(tasks=name, points=points, repeatable=True)
+            for name, points in [
+                ("Entregar Livro de Mórmon + foto + relato no grupo", 10),
+                ("Visitar com as Sisteres", 5),
+                ("Postar mensagem do evangelho nas redes sociais + print", 2),
+            ]
+        ]
+        session.add_all(youth_rows + task_rows)
+        session.flush()
+
+        now = time.time()
+        points = defaultdict(int)
+        for _ in range(entries):
+            youth = rng.choice(youth_rows)
+            task = rng.choice(task_rows)
+            quantity = rng.randint(1, 3)
+            points[youth.id] += task.points * quantity
+            session.add(
+                database.CompiledFormData(
+                    youth_id=youth.id,
+                    task_id=task.id,
+                    timestamp=now - rng.uniform(0, 8 * 7 * 24 * 3600),
+                    quantity=quantity,
+                    bonus=0,
+                )
+            )
+        for youth in youth_rows:
+            youth.total_points = points[youth.id]
+        session.commit()
+
+
+def seeded_ids() -> tuple[list[tuple[int, str]], list[int]]:
+    """Ids and names of the youths and ids of the tasks the registrations
+    pick from"""
+    from database import TasksFormDataRepository, YouthFormDataRepository
+
+    return (
+        [
+            (youth.id, youth.name)
+            for youth in YouthFormDataRepository.get_all()
+        ],
+        [task.id for task in TasksFormDataRepository.get_all()],
+    )
+
+
+def run_session(
+    session_id: int, mix: dict[str, float], start_at: float, duration: float
+) -> dict:
+    """Runs one simulated session until the test is over and returns its
+    measurements"""
+    sys.path.insert(0, str(SRC))
+    os.environ.setdefault("AUTH", LOAD_TEST_AUTH)
+    from sqlalchemy import Engine, event
+    from streamlit.testing.v1 import AppTest
+
+    queries = 0
+
+    def _count_query(*_):
+        nonlocal queries
+        queries += 1
+
+    # Every engine, including the sync side of the async one
+    event.listen(Engine, "before_cursor_execute", _count_query)
+
+    rng = random.Random(session_id)
+    dashboard = AppTest.from_file(str(DASHBOARD), default_timeout=60)
+    registration = AppTest.from_file(str(REGISTRATION), default_timeout=60)
+    registration.session_state["password_correct"] = True
+
+    # Imports and the first load of the game data are paid per process,
+    # not per session, so they stay out of the measurements
+    dashboard.run()
+    queries = 0
+    rss_before = rss_bytes()
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + duration
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+    youths = task_ids = None
+    while time.time() < deadline:
+        action = rng.choices(list(mix), weights=list(mix.values()))[0]
+        started = time.perf_counter()
+        if action == "dashboard":
+            dashboard.run()
+            failed = bool(dashboard.exception)
+        else:
+            if youths is None:
+                registration.run()
+                youths, task_ids = seeded_ids()
+            # Typing the name reruns the page with the matching youths
+            youth_id, name = rng.choice(youths)
+            registration.text_input[0].input(name).run()
+            youth_select, task_select = registration.selectbox[:2]
+            youth_select.select(youth_id)
+            task_select.select(rng.choice(task_ids))
+            submit = next(
+                b
+                for b in registration.button
+                if b.label == "Registrar Entrada"
+            )
+            submit.click().run()
+            failed = bool(registration.exception) or bool(registration.error)
+        latencies[action].append(time.perf_counter() - started)
+        errors += failed
+
+    return {
+        "session": session_id,
+        "latencies": dict(latencies),
+        "queries": queries,
+        "errors": errors,
+        "rss_before": rss_before,
+        "rss_after": rss_bytes(),
+    }
+
+
+def summarize(results: list[dict], duration: float) -> dict:
+    """Aggregates the measurements of every session"""
+    by_action: dict[str, list[float]] = defaultdict(list)
+    for result in results:
+        for action, latencies in result["latencies"].items():
+            by_action[action].extend(latencies)
+    runs = sum(len(latencies) for latencies in by_action.values())
+    all_latencies = [lat for lats in by_action.values() for lat in lats]
+    return {
+        "sessions": len(results),
+        "runs": runs,
+        "throughput": runs / duration if duration else 0.0,
+        "errors": sum(result["errors"] for result in results),
+        "latency": percentiles(all_latencies),
+        "latency_by_action": {
+            action: {"runs": len(lats), **percentiles(lats)}
+            for action, lats in sorted(by_action.items())
+        },
+        "queries_per_run": (
+            sum(result["queries"] for result in results) / runs
+            if runs
+            else 0.0
+        ),
+        "memory_per_session": statistics.mean(
+            result["rss_after"] - result["rss_before"] for result in results
+        )
+        if results
+        else 0,
+        "rss_per_process": statistics.mean(
+            result["rss_after"] for result in results
+        )
+        if results
+        else 0,
+    }
+
+
+def print_report(summary: dict) -> None:
+    mib = 1024 * 1024
+    print(
+        f"{summary['sessions']} sessions, {summary['runs']} runs, "
+        f"{summary['throughput']:.1f} runs/s, {summary['errors']} errors"
+    )
+    latency = summary["latency"]
+    print(
+        f"latency: p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, "
+        f"p99 {latency['p99']:.0f} ms"
+    )
+    for action, stats in summary["latency_by_action"].items():
+        print(
+            f"  {action}: {stats['runs']} runs, p50 {stats['p50']:.0f} ms, "
+            f"p95 {stats['p95']:.0f} ms, p99 {stats['p99']:.0f} ms"
+        )
+    print(f"database queries per run: {summary['queries_per_run']:.1f}")
+    print(
+        f"memory per session: {summary['memory_per_session'] / mib:.1f} MiB "
+        f"(process RSS {summary['rss_per_process'] / mib:.0f} MiB)"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument(
+        "--duration", type=float, default=30, help="seconds of load"
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"weights of the actions (default {DEFAULT_MIX})",
+    )
+    parser.add_argument("--youths", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # The SQLite file of the database module is relative to the cwd,
+        # which the session processes inherit
+        os.chdir(workdir)
+        seed_database(args.youths, args.entries)
+
+        # Sessions start together once every process has imported the app
+        start_at = time.time() + 10 + args.sessions * 0.2
+        with ProcessPoolExecutor(max_workers=args.sessions) as executor:
+            futures = [
+                executor.submit(run_session, i, mix, start_at, args.duration)
+                for i in range(args.sessions)
+            ]
+            results = [future.result() for future in futures]
+        os.chdir(ROOT)
+
+    summary = summarize(results, args.duration)
+    print_report(summary)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""Aggregates behind the heavy sections of the Dashboard.
+
+The totals cards, the weekly ranking and the task charts sum every entry
+of the season. Rather than summing them on each load, the database keeps
+three aggregates, which the Dashboard reads through
+`DashboardAggregateRepository`:
+
+- `agg_task_totals`: quantity and points of each task
+- `agg_youth_daily_points`: points of each youth per day
+- `agg_task_daily_quantities`: quantity of each task per day
+
+Each one is grouped by ward and season, with entries without a season
+under season 0. The rows are kept per day rather than per week, so the
+sections still decide which Sunday a week starts on exactly as they do for
+the entries, and the days are local to `AGGREGATES_UTC_OFFSET_SECONDS`.
+
+On Postgres they are materialized views with a unique index, refreshed
+with `REFRESH MATERIALIZED VIEW CONCURRENTLY`, so the Dashboard reads, on
+the primary or on the replica, never wait for a refresh nor block a write.
+SQLite has no materialized views: the same queries fill summary tables of
+the same name, rebuilt for the wards that changed in one transaction,
+which readers in WAL mode do not wait for either.
+
+Writes made by this process mark their ward, and a background refresher
+brings the aggregates up to date once no write came for
+`AGGREGATES_DEBOUNCE_SECONDS`, so a burst of entries costs one refresh.
+It then bumps the data version of those wards with the `AGGREGATES_TABLE`
+table, which publishes the refresh to the other processes, and the caches
+built from the previous aggregates are dropped everywhere. Until then the
+Dashboard shows the aggregates as of the last refresh.
+
+The aggregates are created by the migrations, and the start-up warm-up
+refreshes them for every ward before starting the refresher, so the
+Dashboard only ever reads them.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Collection
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Engine,
+    Integer,
+    MetaData,
+    Row,
+    Select,
+    String,
+    Table,
+    cast,
+    func,
+    select,
+)
+
+import database
+from cache import LRUCache
+from database import CompiledFormData, TasksFormData, routed_read
+from tenancy import bump_data_version, get_current_tenant, on_data_change
+from utils import handle_database_operation
+
+AGGREGATES_DEBOUNCE_SECONDS = float(
+    os.getenv("AGGREGATES_DEBOUNCE_SECONDS", "1")
+)
+# Offset of the local time the days are counted in, the standard time of
+# the server by default
+AGGREGATES_UTC_OFFSET_SECONDS = int(
+    os.getenv("AGGREGATES_UTC_OFFSET_SECONDS", str(-time.timezone))
+)
+AGGREGATE_CACHE_SIZE = int(os.getenv("AGGREGATE_CACHE_SIZE", "32"))
+# Wait before refreshing again after a refresh failed
+AGGREGATES_RETRY_SECONDS = 5
+
+# Table reported with the data version bumps of a refresh
+AGGREGATES_TABLE = "aggregates"
+
+# date(1970, 1, 1).toordinal(), so the days are calendar ordinals
+UNIX_EPOCH_ORDINAL = 719163
+
+aggregate_metadata = MetaData()
+
+task_totals = Table(
+    "agg_task_totals",
+    aggregate_metadata,
+    Column("tenant_id", String, primary_key=True),
+    Column("season_id", Integer, primary_key=True),
+    Column("task_id", Integer, primary_key=True),
+    Column("quantity", BigInteger, nullable=False),
+    Column("points", BigInteger, nullable=False),
+)
+youth_daily_points = Table(
+    "agg_youth_daily_points",
+    aggregate_metadata,
+    Column("tenant_id", String, primary_key=True),
+    Column("season_id", Integer, primary_key=True),
+    Column("youth_id", Integer, primary_key=True),
+    Column("day", Integer, primary_key=True),
+    Column("points", BigInteger, nullable=False),
+)
+task_daily_quantities = Table(
+    "agg_task_daily_quantities",
+    aggregate_metadata,
+    Column("tenant_id", String, primary_key=True),
+    Column("season_id", Integer, primary_key=True),
+    Column("task_id", Integer, primary_key=True),
+    Column("day", Integer, primary_key=True),
+    Column("quantity", BigInteger, nullable=False),
+)
+AGGREGATE_TABLES = (task_totals, youth_daily_points, task_daily_quantities)
+
+
+def uses_materialized_views(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def day_of(timestamp, dialect_name: str):
+    """SQL expression of the local calendar day of a timestamp column, as
+    an ordinal like `database.day_bucket_of`"""
+    shifted = timestamp + AGGREGATES_UTC_OFFSET_SECONDS
+    if dialect_name == "postgresql":
+        # Casting rounds on Postgres, while SQLite truncates
+        shifted = func.floor(shifted)
+    return cast(shifted, BigInteger) // 86400 + UNIX_EPOCH_ORDINAL
+
+
+def aggregate_queries(dialect_name: str) -> dict[Table, Select]:
+    """Query computing each aggregate, its columns in the table's order.
+    Entries of a deleted task give no points, as in the sections."""
+    compiled = CompiledFormData.__table__
+    tasks = TasksFormData.__table__
+    entries = compiled.join(tasks, tasks.c.id == compiled.c.task_id)
+    season = func.coalesce(compiled.c.season_id, 0)
+    day = day_of(compiled.c.timestamp, dialect_name)
+    quantity = func.sum(compiled.c.quantity)
+    points = func.sum(compiled.c.quantity * tasks.c.points + compiled.c.bonus)
+    return {
+        task_totals: select(
+            compiled.c.tenant_id,
+            season.label("season_id"),
+            compiled.c.task_id,
+            quantity.label("quantity"),
+            points.label("points"),
+        )
+        .select_from(entries)
+        .group_by(compiled.c.tenant_id, season, compiled.c.task_id),
+        youth_daily_points: select(
+            compiled.c.tenant_id,
+            season.label("season_id"),
+            compiled.c.youth_id,
+            day.label("day"),
+            points.label("points"),
+        )
+        .select_from(entries)
+        .group_by(compiled.c.tenant_id, season, compiled.c.youth_id, day),
+        task_daily_quantities: select(
+            compiled.c.tenant_id,
+            season.label("season_id"),
+            compiled.c.task_id,
+            day.label("day"),
+            quantity.label("quantity"),
+        )
+        .select_from(entries)
+        .group_by(compiled.c.tenant_id, season, compiled.c.task_id, day),
+    }
+
+
+def materialized_view_statements(engine: Engine) -> list[str]:
+    """DDL of the materialized views and of the unique indexes that
+    `REFRESH ... CONCURRENTLY` requires"""
+    statements = []
+    for table, query in aggregate_queries("postgresql").items():
+        definition = query.compile(
+            dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        key = ", ".join(column.name for column in table.primary_key)
+        statements += [
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {table.name} AS "
+            f"{definition}",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {table.name}_key "
+            f"ON {table.name} ({key})",
+        ]
+    return statements
+
+
+def create_aggregates(engine: Engine) -> None:
+    """Creates the materialized views, or the summary tables, if missing"""
+    if uses_materialized_views(engine):
+        with engine.begin() as connection:
+            for statement in materialized_view_statements(engine):
+                connection.exec_driver_sql(statement)
+    else:
+        aggregate_metadata.create_all(engine)
+
+
+def refresh_aggregates(
+    engine: Engine, tenants: Collection[str] | None = None
+) -> None:
+    """Brings the aggregates up to date with the entries. The summary
+    tables are only rebuilt for the given wards, all of them by default;
+    a materialized view is always refreshed as a whole."""
+    if uses_materialized_views(engine):
+        # Each view is refreshed and committed on its own, so its lock is
+        # released as soon as it is done
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            for table in AGGREGATE_TABLES:
+                connection.exec_driver_sql(
+                    f"REFRESH MATERIALIZED VIEW CONCURRENTLY {table.name}"
+                )
+        return
+
+    with engine.begin() as connection:
+        for table, query in aggregate_queries(engine.dialect.name).items():
+            clear = table.delete()
+            if tenants is not None:
+                clear = clear.where(table.c.tenant_id.in_(tenants))
+                query = query.where(
+                    CompiledFormData.__table__.c.tenant_id.in_(tenants)
+                )
+            connection.execute(clear)
+            connection.execute(
+                table.insert().from_select(
+                    [column.name for column in table.columns], query
+                )
+            )
+
+
+class AggregateRefresher:
+    """Refreshes the aggregates of an engine after the writes of this
+    process, once they stopped for the debounce delay"""
+
+    def __init__(
+        self,
+        engine: Engine,
+        debounce_seconds: float = AGGREGATES_DEBOUNCE_SECONDS,
+    ):
+        self.engine = engine
+        self.debounce_seconds = debounce_seconds
+        self.refreshes = 0
+        self.last_refresh_seconds: float | None = None
+        self.error: str | None = None
+        self._dirty: set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def mark_dirty(self, tenant: str, table: str | None = None) -> None:
+        """`on_data_change` listener noting the ward of a write. Writes to
+        another engine, as in tests, and the bumps of the refreshes
+        themselves are ignored."""
+        if table == AGGREGATES_TABLE or database.engine is not self.engine:
+            return
+        with self._dirty_lock:
+            self._dirty.add(tenant)
+        self._wake.set()
+
+    def refresh(self) -> set[str]:
+        """Refreshes the aggregates of the wards written to, returning
+        them"""
+        with self._dirty_lock:
+            tenants, self._dirty = self._dirty, set()
+        if not tenants:
+            return tenants
+        started = time.perf_counter()
+        try:
+            refresh_aggregates(self.engine, tenants)
+        except Exception:
+            with self._dirty_lock:
+                self._dirty |= tenants
+            raise
+        self.last_refresh_seconds = time.perf_counter() - started
+        self.refreshes += 1
+        self.error = None
+        for tenant in tenants:
+            bump_data_version(tenant, AGGREGATES_TABLE)
+        return tenants
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait()
+            # Writes made during the delay are refreshed together
+            if self._stopped.wait(self.debounce_seconds):
+                break
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error = str(e)
+                logging.error(f"Refreshing the aggregates failed: {e}")
+                self._stopped.wait(AGGREGATES_RETRY_SECONDS)
+                self._wake.set()
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(
+            target=self.run, name="aggregate-refresher", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "kind": (
+                "materialized_views"
+                if uses_materialized_views(self.engine)
+                else "summary_tables"
+            ),
+            "running": self._thread is not None and self._thread.is_alive(),
+            "refreshes": self.refreshes,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "error": self.error,
+        }
+
+
+_refreshers: dict[Engine, AggregateRefresher] = {}
+_refreshers_lock = threading.Lock()
+
+
+def start_aggregate_refresher() -> AggregateRefresher:
+    """Starts the refresher of the current engine, once per process, from
+    the start-up warm-up. The aggregates are created if needed and
+    refreshed for every ward first, which catches up with the writes made
+    while no process was running; the writes made meanwhile are already
+    marked for the next refresh."""
+    engine = database.engine
+    with _refreshers_lock:
+        refresher = _refreshers.get(engine)
+        if refresher is None:
+            refresher = AggregateRefresher(engine)
+            on_data_change(refresher.mark_dirty)
+            create_aggregates(engine)
+            refresh_aggregates(engine)
+            refresher.start()
+            _refreshers[engine] = refresher
+    return refresher
+
+
+def aggregates_state() -> dict[str, Any] | None:
+    refresher = _refreshers.get(database.engine)
+    return refresher.state() if refresher is not None else None
+
+
+@dataclass(frozen=True, slots=True)
+class DashboardAggregates:
+    """Rows of the aggregates of one ward and season"""
+
+    task_totals: tuple[Row, ...] = ()
+    youth_daily_points: tuple[Row, ...] = ()
+    task_daily_quantities: tuple[Row, ...] = ()
+
+
+class DashboardAggregateRepository:
+    """Reads of the aggregates of the current tenant. Without a season,
+    the rows of every season are returned and summed by the sections."""
+
+    @staticmethod
+    def get(season_id: int | None = None) -> DashboardAggregates | None:
+        def _get_operation(bind: Engine):
+            rows = []
+            with bind.connect() as connection:
+                for table in AGGREGATE_TABLES:
+                    statement = select(table).where(
+                        table.c.tenant_id == get_current_tenant()
+                    )
+                    if season_id is not None:
+                        statement = statement.where(
+                            table.c.season_id == season_id
+                        )
+                    rows.append(tuple(connection.execute(statement).all()))
+            return DashboardAggregates(*rows)
+
+        return handle_database_operation(
+            routed_read(_get_operation), "busca dos agregados do painel"
+        )
+
+
+aggregate_cache: LRUCache[tuple[str, int | None, int], DashboardAggregates] = (
+    LRUCache(AGGREGATE_CACHE_SIZE)
+)
+
+
+def load_dashboard_aggregates(
+    season_id: int | None, data_version: int
+) -> DashboardAggregates:
+    """Aggregates of the current tenant for the Dashboard, kept until its
+    data version changes. Errors are shown to the user and give empty
+    aggregates."""
+
+    aggregates = aggregate_cache.get_or_build(
+        (get_current_tenant(), season_id, data_version),
+        lambda: DashboardAggregateRepository.get(season_id),
+    )
+    return aggregates if aggregates is not None else DashboardAggregates()
@@ -0,0 +1,152 @@
+"""Read-only JSON API of the leaderboard.
+
+Bots and ward websites poll these endpoints instead of scraping the
+Streamlit page. Each response is built from the repositories once per
+data version of the ward, and per day since the weekly numbers depend on
+the date, and carries an ETag, so a client polling an unchanged ward gets
+a 304 without any query or serialization. The cache is bounded, and the
+public server only answers for existing wards, so made-up ward names in
+the URL cannot grow it.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from typing import Any
+
+import sections
+from async_database import get_game_data
+from cache import LRUCache
+from database import Season, SeasonRepository
+from tenancy import get_data_version, tenant_scope
+
+Payload = dict[str, Any]
+
+
+def season_payload(season: Season | None) -> Payload | None:
+    if season is None:
+        return None
+    return {
+        "name": season.name,
+        "start_date": season.start_date.isoformat(),
+        "end_date": season.end_date.isoformat(),
+    }
+
+
+def rankings_payload(
+    youth_entries, task_entries, compiled_entries, season
+) -> Payload:
+    sorted_youth = sorted(
+        (y for y in youth_entries if y.total_points > 0),
+        key=lambda y: y.total_points,
+        reverse=True,
+    )
+    return {
+        "rankings": [
+            {
+                "position": idx + 1,
+                "id": y.id,
+                "name": y.name,
+                "age": y.age,
+                "organization": y.organization,
+                "total_points": y.total_points,
+            }
+            for idx, y in enumerate(sorted_youth)
+        ]
+    }
+
+
+def weekly_points_payload(
+    youth_entries, task_entries, compiled_entries, season
+) -> Payload:
+    weekly_points = sections.calculate_weekly_youth_points(
+        compiled_entries, task_entries, youth_entries
+    )
+    return {
+        "week_start": sections.get_last_sunday().date().isoformat(),
+        "weekly_points": [
+            {"id": youth_id, **data}
+            for youth_id, data in sorted(
+                weekly_points.items(),
+                key=lambda item: item[1]["points"],
+                reverse=True,
+            )
+        ],
+    }
+
+
+def activity_totals_payload(
+    youth_entries, task_entries, compiled_entries, season
+) -> Payload:
+    totals, deltas = sections.calculate_task_totals(
+        compiled_entries, task_entries
+    )
+    return {"totals": totals, "this_week": deltas}
+
+
+def weekly_series_payload(
+    youth_entries, task_entries, compiled_entries, season
+) -> Payload:
+    weekly_series = sections.calculate_weekly_series(
+        compiled_entries, task_entries, season.start_date if season else None
+    )
+    return {
+        "weekly_series": [
+            {
+                "week": week,
+                "start": data["start"].date().isoformat(),
+                "points": data["points"],
+                "activities": data["activities"],
+            }
+            for week, data in weekly_series.items()
+        ]
+    }
+
+
+ENDPOINTS: dict[str, Callable[..., Payload]] = {
+    "rankings": rankings_payload,
+    "weekly-points": weekly_points_payload,
+    "activity-totals": activity_totals_payload,
+    "weekly-series": weekly_series_payload,
+}
+
+API_RESPONSE_CACHE_SIZE = int(os.getenv("API_RESPONSE_CACHE_SIZE", "256"))
+
+# Serialized responses and their ETags, keyed by endpoint, ward, data
+# version and day: stale responses are never served and simply age out
+_responses: LRUCache[tuple[str, str, int, dt.date], tuple[bytes, str]] = (
+    LRUCache(API_RESPONSE_CACHE_SIZE)
+)
+
+
+def _build_response(endpoint: str, tenant: str) -> tuple[bytes, str]:
+    with tenant_scope(tenant):
+        season = SeasonRepository.get_active()
+        game_data = get_game_data(season.id if season else None)
+    payload = ENDPOINTS[endpoint](*game_data, season)
+
+    body = json.dumps(
+        {"ala": tenant, "season": season_payload(season), **payload},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def get_response(endpoint: str, tenant: str) -> tuple[bytes, str]:
+    """Returns the JSON body of an endpoint for a ward and its ETag.
+
+    Raises KeyError for unknown endpoints. Database errors propagate.
+    """
+    if endpoint not in ENDPOINTS:
+        raise KeyError(endpoint)
+
+    key = (endpoint, tenant, get_data_version(tenant), dt.date.today())
+    return _responses.get_or_build(
+        key, lambda: _build_response(endpoint, tenant)
+    )
+
+
+def cached_response_count() -> int:
+    return len(_responses)
@@ -0,0 +1,379 @@
+"""Async variants of the repositories on SQLAlchemy's asyncio engine.
+
+The coroutines run on a single background event loop shared by the whole
+process, so the async connection pool outlives each Streamlit rerun. Unlike
+the sync repositories they let exceptions propagate: Streamlit messages
+cannot be shown from the loop thread, so errors are reported by the sync
+helpers (`load_game_data`) back in the script thread. The current tenant
+of the caller is carried over to the loop, so queries stay scoped to it.
+Reads go to the read replica whenever `database.read_engine` picks it.
+The game data read by the pages is kept in the process-wide snapshot.
+"""
+
+import asyncio
+import contextvars
+import threading
+from collections.abc import Awaitable, Callable, Coroutine, Sequence
+from typing import Any, TypeVar
+
+import streamlit as st
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import database
+from database import (
+    CompiledFormData,
+    StoreOutcome,
+    TasksFormData,
+    YouthFormData,
+    compiled_entry_insert,
+    register_sqlite_pragmas,
+)
+from snapshot import GameRows, SnapshotStore, freeze_game_data
+from tenancy import (
+    bump_data_version,
+    get_current_tenant,
+)
+from utils import handle_database_operation
+
+T = TypeVar("T")
+
+GameData = tuple[
+    Sequence[YouthFormData],
+    Sequence[TasksFormData],
+    Sequence[CompiledFormData],
+]
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_async_engines: dict[str, AsyncEngine] = {}
+
+
+def async_database_url(url: URL | str) -> URL:
+    """Maps a sync database URL to the asyncio driver of its backend"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        # asyncpg names libpq's sslmode parameter ssl
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    raise ValueError(f"Banco de dados sem suporte a asyncio: {backend}")
+
+
+def get_async_engine(sync_engine: Engine | None = None) -> AsyncEngine:
+    """Returns the async engine pointing at the same database as a sync
+    engine, the primary by default, creating it on first use"""
+    url = async_database_url((sync_engine or database.engine).url)
+    key = url.render_as_string(hide_password=False)
+    if key not in _async_engines:
+        async_engine = create_async_engine(url)
+        if url.get_backend_name() == "sqlite":
+            register_sqlite_pragmas(async_engine.sync_engine)
+        _async_engines[key] = async_engine
+    return _async_engines[key]
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="async-database", daemon=True
+            ).start()
+    return _loop
+
+
+async def _in_context[T](
+    context: contextvars.Context, coroutine: Coroutine[Any, Any, T]
+) -> T:
+    for variable, value in context.items():
+        variable.set(value)
+    return await coroutine
+
+
+def run_async[T](coroutine: Coroutine[Any, Any, T]) -> T:
+    """Runs a coroutine on the shared background loop, in the caller's
+    context so it sees its tenant and trace, and waits for it"""
+    return asyncio.run_coroutine_threadsafe(
+        _in_context(contextvars.copy_context(), coroutine), _event_loop()
+    ).result()
+
+
+async def routed_read[T](
+    operation: Callable[[AsyncEngine], Awaitable[T]],
+) -> T:
+    """Runs a read on the async engine of `database.read_engine()` and
+    again on the primary if the replica fails it"""
+    # Choosing may measure the replica lag, which blocks
+    bind = await asyncio.to_thread(database.read_engine)
+    router = database.replica_router
+    if router is None or bind is not router.replica:
+        return await operation(get_async_engine(bind))
+    try:
+        return await operation(get_async_engine(bind))
+    except OperationalError as e:
+        router.mark_down(e)
+        return await operation(get_async_engine())
+
+
+async def _get_tenant_entry(session: AsyncSession, model, entry_id: int):
+    entry = await session.get(model, entry_id)
+    if entry is None or entry.tenant_id != get_current_tenant():
+        return None
+    return entry
+
+
+class AsyncYouthFormDataRepository:
+    @staticmethod
+    async def update_total_points(
+        youth_id: int, new_total: int
+    ) -> YouthFormData | None:
+        async with AsyncSession(get_async_engine()) as session:
+            entry = await _get_tenant_entry(session, YouthFormData, youth_id)
+            if entry:
+                entry.total_points = new_total
+                session.add(entry)
+                await session.commit()
+                await session.refresh(entry)
+                bump_data_version(table=YouthFormData.__tablename__)
+            return entry
+
+    @staticmethod
+    async def store(
+        name: str, age: int, organization: str, total_points: int
+    ) -> YouthFormData:
+        entry = YouthFormData(
+            name=name,
+            age=age,
+            organization=organization,
+            total_points=total_points,
+            tenant_id=get_current_tenant(),
+        )
+        async with AsyncSession(get_async_engine()) as session:
+            session.add(entry)
+            await session.commit()
+            await session.refresh(entry)
+        bump_data_version(table=YouthFormData.__tablename__)
+        return entry
+
+    @staticmethod
+    async def get_all() -> Sequence[YouthFormData]:
+        statement = select(YouthFormData).where(
+            YouthFormData.tenant_id == get_current_tenant()
+        )
+
+        async def _get_all(bind: AsyncEngine):
+            async with AsyncSession(bind) as session:
+                return (await session.exec(statement)).all()
+
+        return await routed_read(_get_all)
+
+    @staticmethod
+    async def delete(entry_id: int) -> bool:
+        async with AsyncSession(get_async_engine()) as session:
+            entry = await _get_tenant_entry(session, YouthFormData, entry_id)
+            if entry:
+                await session.delete(entry)
+                await session.commit()
+                bump_data_version(table=YouthFormData.__tablename__)
+                return True
+            return False
+
+
+class AsyncTasksFormDataRepository:
+    @staticmethod
+    async def store(
+        tasks: str, points: int, repeatable: bool
+    ) -> TasksFormData:
+        entry = TasksFormData(
+            tasks=tasks,
+            points=points,
+            repeatable=repeatable,
+            tenant_id=get_current_tenant(),
+        )
+        async with AsyncSession(get_async_engine()) as session:
+            session.add(entry)
+            await session.commit()
+            await session.refresh(entry)
+        bump_data_version(table=TasksFormData.__tablename__)
+        return entry
+
+    @staticmethod
+    async def get_all() -> Sequence[TasksFormData]:
+        statement = select(TasksFormData).where(
+            TasksFormData.tenant_id == get_current_tenant()
+        )
+
+        async def _get_all(bind: AsyncEngine):
+            async with AsyncSession(bind) as session:
+                return (await session.exec(statement)).all()
+
+        return await routed_read(_get_all)
+
+    @staticmethod
+    async def delete(entry_id: int) -> bool:
+        async with AsyncSession(get_async_engine()) as session:
+            entry = await _get_tenant_entry(session, TasksFormData, entry_id)
+            if entry:
+                await session.delete(entry)
+                await session.commit()
+                bump_data_version(table=TasksFormData.__tablename__)
+                return True
+            return False
+
+
+class AsyncCompiledFormDataRepository:
+    @staticmethod
+    async def register(
+        youth_id: int,
+        task_id: int,
+        timestamp: float,
+        quantity: int,
+        bonus: int,
+        repeatable: bool = True,
+        idempotency_key: str | None = None,
+        season_id: int | None = None,
+    ) -> tuple[StoreOutcome, CompiledFormData | None]:
+        """Async counterpart of `CompiledFormDataRepository.register`"""
+        statement = compiled_entry_insert(
+            youth_id,
+            task_id,
+            timestamp,
+            quantity,
+            bonus,
+            repeatable,
+            idempotency_key,
+            season_id,
+        )
+        async with AsyncSession(get_async_engine()) as session:
+            entry = (await session.scalars(statement)).first()
+            await session.commit()
+            if entry is not None:
+                await session.refresh(entry)
+                bump_data_version(table=CompiledFormData.__tablename__)
+                return StoreOutcome.CREATED, entry
+
+            if idempotency_key is not None:
+                existing = (
+                    await session.exec(
+                        select(CompiledFormData).where(
+                            CompiledFormData.tenant_id == get_current_tenant(),
+                            CompiledFormData.idempotency_key
+                            == idempotency_key,
+                        )
+                    )
+                ).first()
+                if existing is not None:
+                    return StoreOutcome.REPLAYED, existing
+            return StoreOutcome.DUPLICATE_DAY, None
+
+    @staticmethod
+    async def get_all(
+        season_id: int | None = None,
+    ) -> Sequence[CompiledFormData]:
+        statement = select(CompiledFormData).where(
+            CompiledFormData.tenant_id == get_current_tenant()
+        )
+        if season_id is not None:
+            statement = statement.where(
+                CompiledFormData.season_id == season_id
+            )
+        # In timestamp order, so the columns of the snapshot can be
+        # filtered by time with a binary search
+        statement = statement.order_by(CompiledFormData.timestamp)
+
+        async def _get_all(bind: AsyncEngine):
+            async with AsyncSession(bind) as session:
+                return (await session.exec(statement)).all()
+
+        return await routed_read(_get_all)
+
+    @staticmethod
+    async def delete(entry_id: int) -> bool:
+        async with AsyncSession(get_async_engine()) as session:
+            entry = await _get_tenant_entry(
+                session, CompiledFormData, entry_id
+            )
+            if entry:
+                await session.delete(entry)
+                await session.commit()
+                bump_data_version(table=CompiledFormData.__tablename__)
+                return True
+            return False
+
+
+async def _no_entries() -> Sequence[CompiledFormData]:
+    return []
+
+
+async def fetch_game_data(
+    season_id: int | None = None, with_entries: bool = True
+) -> GameData:
+    """Fetches youths, tasks and, unless told otherwise, the compiled
+    entries of a season concurrently, each on its own pooled connection"""
+    youths, tasks, compiled = await asyncio.gather(
+        AsyncYouthFormDataRepository.get_all(),
+        AsyncTasksFormDataRepository.get_all(),
+        AsyncCompiledFormDataRepository.get_all(season_id)
+        if with_entries
+        else _no_entries(),
+    )
+    return youths, tasks, compiled
+
+
+def _load_game_rows(season_id: int | None, with_entries: bool) -> GameRows:
+    return freeze_game_data(
+        *run_async(fetch_game_data(season_id, with_entries))
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store() -> SnapshotStore:
+    """Returns the snapshot store of the process, starting its refresher
+    on first use"""
+    store = SnapshotStore(_load_game_rows)
+    store.start_refresher()
+    return store
+
+
+def get_game_data(
+    season_id: int | None = None, with_entries: bool = True
+) -> GameRows:
+    """Returns the youths, tasks and the compiled entries of a season from
+    the snapshot shared by the whole process. `with_entries=False` skips
+    the entries, which then come back empty.
+
+    When the snapshot is stale the three tables are loaded concurrently,
+    so the wait is bounded by the slowest of the three queries instead of
+    their sum. A rerun without writes does not query at all. Database
+    errors propagate.
+    """
+    return get_snapshot_store().get(season_id, with_entries).game_data
+
+
+def load_game_data(
+    season_id: int | None = None, with_entries: bool = True
+) -> GameRows:
+    """`get_game_data` for Streamlit pages, which shows database errors to
+    the user and falls back to empty sequences"""
+    result = handle_database_operation(
+        lambda: get_game_data(season_id, with_entries),
+        "busca dos dados da gincana",
+    )
+    return result if result is not None else ([], [], [])
+
+
+def game_data_cache_size() -> int:
+    return len(get_snapshot_store())
+
+
+def clear_game_data_cache() -> None:
+    get_snapshot_store().clear()
@@ -0,0 +1,98 @@
+"""Process-wide memoization of the Plotly figures of the Dashboard.
+
+Building a figure with plotly express or graph objects validates every
+property and is one of the larger CPU costs of a rerun, while the data
+behind it only changes on writes. Figures are therefore kept in a bounded
+LRU cache keyed by chart, tenant, season and the data version the figure
+was built from: a write bumps the version, so stale figures are never
+served and simply age out.
+
+What is kept is the JSON spec of each figure rather than the figure
+itself: an immutable string can be shared by every session without any
+of them changing it.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from tenancy import get_current_tenant
+
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "64"))
+
+
+class LRUCache[K: Hashable, V]:
+    """Thread-safe mapping that evicts the least recently used entry once
+    it holds `maxsize` entries"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(self, key: K, build: Callable[[], V]) -> V:
+        """Returns the cached value of a key, building it on a miss.
+
+        The build runs outside the lock, so a slow figure does not block
+        the other sessions; two sessions missing the same key at once may
+        both build it. None is never cached: it costs nothing to build and
+        may come from data that failed to load.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = build()
+        if value is None:
+            return value
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+figure_cache: LRUCache[tuple, str] = LRUCache(FIGURE_CACHE_SIZE)
+
+
+def _to_spec(figure) -> str | None:
+    if figure is None:
+        return None
+    import plotly.io
+
+    # The figure was validated as it was built
+    return plotly.io.to_json(figure, validate=False)
+
+
+def cached_figure_spec(
+    chart: str,
+    season_id: int | None,
+    data_version: int,
+    build: Callable[[], object],
+) -> str | None:
+    """Returns the JSON spec of the figure of a chart for the current
+    tenant, building the figure only if the data version it was built
+    from changed. None when `build` has no figure to show.
+
+    The data version must be read before loading the data the figure is
+    built from, so a write made in between is never cached under the new
+    version.
+    """
+    key = (chart, get_current_tenant(), season_id, data_version)
+    return figure_cache.get_or_build(key, lambda: _to_spec(build()))
@@ -1,9 +1,28 @@
 import datetime as dt
+import logging
 import os
-from collections.abc import Sequence
-
-from sqlmodel import Field, Session, SQLModel, create_engine, select
-
+import threading
+import time
+from collections.abc import Callable, Sequence
+from enum import StrEnum
+
+from sqlalchemy import Engine, Index, event, func, insert, or_, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import (
+    Field,
+    Session,
+    SQLModel,
+    col,
+    create_engine,
+    delete,
+    select,
+    update,
+)
+
+from replica import ReplicaRouter
+from tenancy import DEFAULT_TENANT, bump_data_version, get_current_tenant
 from utils import handle_database_operation
 
 # Define the model for YouthFormData
@@ -17,6 +36,16 @@ class YouthFormData(SQLModel, table=True):
     age: int
     organization: str
     total_points: int
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+
+
+def get_tenant_entry(session: Session, model, entry_id: int):
+    """Loads a row by primary key, as long as it belongs to the current
+    tenant"""
+    entry = session.get(model, entry_id)
+    if entry is None or entry.tenant_id != get_current_tenant():
+        return None
+    return entry
 
 
 class YouthFormDataRepository:
@@ -24,12 +53,13 @@ class YouthFormDataRepository:
     def update_total_points(youth_id: int, new_total: int):
         def _update_operation():
             with Session(engine) as session:
-                entry = session.get(YouthFormData, youth_id)
+                entry = get_tenant_entry(session, YouthFormData, youth_id)
                 if entry:
                     entry.total_points = new_total
                     session.add(entry)
                     session.commit()
                     session.refresh(entry)
+                    bump_data_version(table=YouthFormData.__tablename__)
                 return entry
 
         return handle_database_operation(
@@ -46,25 +76,29 @@ class YouthFormDataRepository:
                 age=age,
                 organization=organization,
                 total_points=total_points,
+                tenant_id=get_current_tenant(),
             )
             with Session(engine) as session:
                 session.add(entry)
                 session.commit()
                 session.refresh(entry)
+            bump_data_version(table=YouthFormData.__tablename__)
             return entry
 
         return handle_database_operation(_store_operation, "cadastro do jovem")
 
     @staticmethod
     def get_all() -> Sequence[YouthFormData]:
-        def _get_all_operation():
-            with Session(engine) as session:
-                statement = select(YouthFormData)
+        def _get_all_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = select(YouthFormData).where(
+                    YouthFormData.tenant_id == get_current_tenant()
+                )
                 results = session.exec(statement).all()
             return results
 
         result = handle_database_operation(
-            _get_all_operation, "busca dos jovens cadastrados"
+            routed_read(_get_all_operation), "busca dos jovens cadastrados"
         )
         return result if result is not None else []
 
@@ -72,10 +106,11 @@ class YouthFormDataRepository:
     def delete(entry_id: int) -> bool:
         def _delete_operation():
             with Session(engine) as session:
-                entry = session.get(YouthFormData, entry_id)
+                entry = get_tenant_entry(session, YouthFormData, entry_id)
                 if entry:
                     session.delete(entry)
                     session.commit()
+                    bump_data_version(table=YouthFormData.__tablename__)
                     return True
                 return False
 
@@ -91,6 +126,7 @@ class TasksFormData(SQLModel, table=True):
     tasks: str
     points: int
     repeatable: bool
+    tenant_id: str = Field(default=DEFAULT_TENANT)
 
 
 class TasksFormDataRepository:
@@ -100,12 +136,16 @@ class TasksFormDataRepository:
     ) -> TasksFormData | None:
         def _store_operation():
             entry = TasksFormData(
-                tasks=tasks, points=points, repeatable=repeatable
+                tasks=tasks,
+                points=points,
+                repeatable=repeatable,
+                tenant_id=get_current_tenant(),
             )
             with Session(engine) as session:
                 session.add(entry)
                 session.commit()
                 session.refresh(entry)
+            bump_data_version(table=TasksFormData.__tablename__)
             return entry
 
         return handle_database_operation(
@@ -114,14 +154,16 @@ class TasksFormDataRepository:
 
     @staticmethod
     def get_all() -> Sequence[TasksFormData]:
-        def _get_all_operation():
-            with Session(engine) as session:
-                statement = select(TasksFormData)
+        def _get_all_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = select(TasksFormData).where(
+                    TasksFormData.tenant_id == get_current_tenant()
+                )
                 results = session.exec(statement).all()
             return results
 
         result = handle_database_operation(
-            _get_all_operation, "busca das tarefas cadastradas"
+            routed_read(_get_all_operation), "busca das tarefas cadastradas"
         )
         return result if result is not None else []
 
@@ -129,10 +171,11 @@ class TasksFormDataRepository:
     def delete(entry_id: int) -> bool:
         def _delete_operation():
             with Session(engine) as session:
-                entry = session.get(TasksFormData, entry_id)
+                entry = get_tenant_entry(session, TasksFormData, entry_id)
                 if entry:
                     session.delete(entry)
                     session.commit()
+                    bump_data_version(table=TasksFormData.__tablename__)
                     return True
                 return False
 
@@ -142,6 +185,16 @@ class TasksFormDataRepository:
         return result if result is not None else False
 
 
+class Season(SQLModel, table=True):
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    start_date: dt.date
+    end_date: dt.date
+    archived: bool = False
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+
+
 class CompiledFormData(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
     id: int | None = Field(default=None, primary_key=True)
@@ -150,9 +203,224 @@ class CompiledFormData(SQLModel, table=True):
     timestamp: float
     quantity: int
     bonus: int
+    # Added after the first release: existing databases get these columns
+    # from migrations 1 to 4, and any new one needs its own migration
+    idempotency_key: str | None = Field(default=None, unique=True)
+    day_bucket: int | None = None
+    season_id: int | None = Field(default=None, foreign_key="season.id")
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+
+
+class SeasonSummary(SQLModel, table=True):
+    """Totals of one youth in one task over an archived season"""
+
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+    season_id: int = Field(foreign_key="season.id")
+    youth_id: int = Field(foreign_key="youthformdata.id")
+    task_id: int = Field(foreign_key="tasksformdata.id")
+    entries: int
+    quantity: int
+    bonus: int
+    points: int
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job(SQLModel, table=True):
+    """Long admin operation run off the script thread by `jobs`"""
+
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+    kind: str
+    status: str = JobStatus.QUEUED
+    # Fraction of the work done, from 0 to 1
+    progress: float = 0.0
+    message: str | None = None
+    cancel_requested: bool = False
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+    # Machine running the job, and when it last wrote to it
+    owner: str | None = None
+    heartbeat_at: float | None = None
+
+
+class DataChange(SQLModel, table=True):
+    """Write announced by `notifications` to the processes sharing a
+    SQLite file, which cannot LISTEN"""
+
+    __table_args__ = {"extend_existing": True}
+    id: int | None = Field(default=None, primary_key=True)
+    table_name: str | None = None
+    # Process that made the write, which does not apply it again
+    origin: str
+    created_at: float
+    tenant_id: str = Field(default=DEFAULT_TENANT)
+
+
+def declare_index(table, name: str, *columns: str, **kwargs) -> None:
+    """Attaches an index to a table unless it is already there.
+
+    Indexes are declared outside the models so a module reload, which
+    extends the existing tables, does not attach them twice.
+    """
+    if name not in {index.name for index in table.indexes}:
+        Index(name, *(table.c[column] for column in columns), **kwargs)
+
+
+# Non-repeatable tasks get a day bucket and repeatable ones keep it NULL, so
+# the partial index only allows one entry per youth, task and day for the
+# former.
+declare_index(
+    CompiledFormData.__table__,
+    "ix_compiledformdata_non_repeatable_daily",
+    "youth_id",
+    "task_id",
+    "day_bucket",
+    unique=True,
+    sqlite_where=text("day_bucket IS NOT NULL"),
+    postgresql_where=text("day_bucket IS NOT NULL"),
+)
+# Every query is scoped to a tenant, so each index is led by tenant_id and
+# a ward only ever walks its own slice of the tables. The compiled entries
+# one also serves the season scoping of the dashboard.
+declare_index(
+    YouthFormData.__table__, "ix_youthformdata_tenant", "tenant_id", "name"
+)
+declare_index(
+    TasksFormData.__table__, "ix_tasksformdata_tenant", "tenant_id", "tasks"
+)
+declare_index(Season.__table__, "ix_season_tenant", "tenant_id", "start_date")
+declare_index(
+    CompiledFormData.__table__,
+    "ix_compiledformdata_tenant_season",
+    "tenant_id",
+    "season_id",
+    "timestamp",
+)
+declare_index(
+    SeasonSummary.__table__,
+    "ix_seasonsummary_tenant_season",
+    "tenant_id",
+    "season_id",
+)
+declare_index(Job.__table__, "ix_job_tenant", "tenant_id", "created_at")
+
+
+def insert_statement(model: type[SQLModel]):
+    """Returns a dialect specific INSERT that supports ON CONFLICT clauses"""
+    if engine.dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+
+def day_bucket_of(timestamp: float) -> int:
+    """Returns the local calendar day of a timestamp as an ordinal"""
+    return dt.date.fromtimestamp(timestamp).toordinal()
+
+
+def compiled_entry_insert(
+    youth_id: int,
+    task_id: int,
+    timestamp: float,
+    quantity: int,
+    bonus: int,
+    repeatable: bool,
+    idempotency_key: str | None,
+    season_id: int | None = None,
+):
+    """Returns the INSERT ... ON CONFLICT DO NOTHING RETURNING of an entry"""
+    return (
+        insert_statement(CompiledFormData)
+        .values(
+            youth_id=youth_id,
+            task_id=task_id,
+            timestamp=timestamp,
+            quantity=quantity,
+            bonus=bonus,
+            idempotency_key=idempotency_key,
+            day_bucket=None if repeatable else day_bucket_of(timestamp),
+            season_id=season_id,
+            tenant_id=get_current_tenant(),
+        )
+        .on_conflict_do_nothing()
+        .returning(CompiledFormData)
+    )
+
+
+class StoreOutcome(StrEnum):
+    CREATED = "created"
+    # Same idempotency key as an entry that is already stored
+    REPLAYED = "replayed"
+    # Non-repeatable task already registered for the youth on that day
+    DUPLICATE_DAY = "duplicate_day"
 
 
 class CompiledFormDataRepository:
+    @staticmethod
+    def register(
+        youth_id: int,
+        task_id: int,
+        timestamp: float,
+        quantity: int,
+        bonus: int,
+        repeatable: bool = True,
+        idempotency_key: str | None = None,
+        season_id: int | None = None,
+    ) -> tuple[StoreOutcome, CompiledFormData | None] | None:
+        """Registers a compiled entry with a single INSERT ... ON CONFLICT
+        DO NOTHING and reports what happened.
+
+        The unique constraints enforce both the idempotency of submissions
+        and the once-per-day rule of non-repeatable tasks, so no separate
+        read is needed before the write. The entry is None only for
+        DUPLICATE_DAY.
+        """
+
+        def _register_operation():
+            statement = compiled_entry_insert(
+                youth_id,
+                task_id,
+                timestamp,
+                quantity,
+                bonus,
+                repeatable,
+                idempotency_key,
+                season_id,
+            )
+            with Session(engine) as session:
+                entry = session.scalars(statement).first()
+                session.commit()
+                if entry is not None:
+                    session.refresh(entry)
+                    bump_data_version(table=CompiledFormData.__tablename__)
+                    return StoreOutcome.CREATED, entry
+
+                if idempotency_key is not None:
+                    existing = session.exec(
+                        select(CompiledFormData).where(
+                            CompiledFormData.tenant_id == get_current_tenant(),
+                            CompiledFormData.idempotency_key
+                            == idempotency_key,
+                        )
+                    ).first()
+                    if existing is not None:
+                        return StoreOutcome.REPLAYED, existing
+                return StoreOutcome.DUPLICATE_DAY, None
+
+        return handle_database_operation(
+            _register_operation, "registro da tarefa compilada"
+        )
+
     @staticmethod
     def store(
         youth_id: int,
@@ -160,82 +428,439 @@ class CompiledFormDataRepository:
         timestamp: float,
         quantity: int,
         bonus: int,
+        idempotency_key: str | None = None,
+        repeatable: bool = True,
+        season_id: int | None = None,
     ) -> CompiledFormData | None:
+        """Stores a compiled entry.
+
+        Replaying an idempotency key returns the row stored by the first
+        submission. Returns None when nothing could be stored, including a
+        second entry of a non-repeatable task on the same day.
+        """
+        result = CompiledFormDataRepository.register(
+            youth_id,
+            task_id,
+            timestamp,
+            quantity,
+            bonus,
+            repeatable=repeatable,
+            idempotency_key=idempotency_key,
+            season_id=season_id,
+        )
+        return result[1] if result is not None else None
+
+    @staticmethod
+    def get_all(season_id: int | None = None) -> Sequence[CompiledFormData]:
+        """Returns the entries of a season, or every entry when no season
+        is given. The season filter is served by the season_id index."""
+
+        def _get_all_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = select(CompiledFormData).where(
+                    CompiledFormData.tenant_id == get_current_tenant()
+                )
+                if season_id is not None:
+                    statement = statement.where(
+                        CompiledFormData.season_id == season_id
+                    )
+                results = session.exec(statement).all()
+            return results
+
+        result = handle_database_operation(
+            routed_read(_get_all_operation), "busca dos registros de tarefas"
+        )
+        return result if result is not None else []
+
+    @staticmethod
+    def delete(entry_id: int) -> bool:
+        def _delete_operation():
+            with Session(engine) as session:
+                entry = get_tenant_entry(session, CompiledFormData, entry_id)
+                if entry:
+                    session.delete(entry)
+                    session.commit()
+                    bump_data_version(table=CompiledFormData.__tablename__)
+                    return True
+                return False
+
+        result = handle_database_operation(
+            _delete_operation, "exclusão do registro de tarefa"
+        )
+        return result if result is not None else False
+
+
+class SeasonRepository:
+    @staticmethod
+    def store(
+        name: str, start_date: dt.date, end_date: dt.date
+    ) -> Season | None:
+        """Stores a season and attaches to it the entries without a season
+        that were recorded between its start and end dates"""
+
         def _store_operation():
-            entry = CompiledFormData(
-                youth_id=youth_id,
-                task_id=task_id,
-                timestamp=timestamp,
-                quantity=quantity,
-                bonus=bonus,
+            entry = Season(
+                name=name,
+                start_date=start_date,
+                end_date=end_date,
+                tenant_id=get_current_tenant(),
             )
+            start = dt.datetime.combine(start_date, dt.time.min).timestamp()
+            end = dt.datetime.combine(
+                end_date + dt.timedelta(days=1), dt.time.min
+            ).timestamp()
             with Session(engine) as session:
                 session.add(entry)
+                session.flush()
+                session.execute(
+                    update(CompiledFormData)
+                    .where(
+                        CompiledFormData.tenant_id == entry.tenant_id,
+                        col(CompiledFormData.season_id).is_(None),
+                        CompiledFormData.timestamp >= start,
+                        CompiledFormData.timestamp < end,
+                    )
+                    .values(season_id=entry.id)
+                )
                 session.commit()
                 session.refresh(entry)
+            bump_data_version(table=Season.__tablename__)
             return entry
 
         return handle_database_operation(
-            _store_operation, "registro da tarefa compilada"
+            _store_operation, "cadastro da temporada"
+        )
+
+    @staticmethod
+    def get_all() -> Sequence[Season]:
+        def _get_all_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = (
+                    select(Season)
+                    .where(Season.tenant_id == get_current_tenant())
+                    .order_by(col(Season.start_date).desc())
+                )
+                results = session.exec(statement).all()
+            return results
+
+        result = handle_database_operation(
+            routed_read(_get_all_operation), "busca das temporadas"
+        )
+        return result if result is not None else []
+
+    @staticmethod
+    def get_active(today: dt.date | None = None) -> Season | None:
+        """Returns the latest season already started that was not archived.
+
+        A season stays active after its end date until it is archived or a
+        newer one starts, so the final results remain on the dashboard.
+        """
+
+        def _get_active_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = (
+                    select(Season)
+                    .where(
+                        Season.tenant_id == get_current_tenant(),
+                        col(Season.archived).is_(False),
+                        Season.start_date <= (today or dt.date.today()),
+                    )
+                    .order_by(col(Season.start_date).desc())
+                    .limit(1)
+                )
+                return session.exec(statement).first()
+
+        return handle_database_operation(
+            routed_read(_get_active_operation), "busca da temporada ativa"
         )
 
     @staticmethod
-    def get_all() -> Sequence[CompiledFormData]:
-        def _get_all_operation():
+    def archive(season_id: int) -> bool:
+        """Rolls the entries of a season up into `SeasonSummary` rows, one
+        per youth and task, and deletes them.
+
+        Everything happens in a single transaction, so the season is either
+        fully archived or left untouched.
+        """
+
+        def _archive_operation():
             with Session(engine) as session:
-                statement = select(CompiledFormData)
+                season = get_tenant_entry(session, Season, season_id)
+                if season is None or season.archived:
+                    return False
+
+                task_points = func.coalesce(TasksFormData.points, 0)
+                totals = (
+                    select(
+                        CompiledFormData.tenant_id,
+                        CompiledFormData.season_id,
+                        CompiledFormData.youth_id,
+                        CompiledFormData.task_id,
+                        func.count(col(CompiledFormData.id)),
+                        func.sum(CompiledFormData.quantity),
+                        func.sum(CompiledFormData.bonus),
+                        func.sum(
+                            CompiledFormData.quantity * task_points
+                            + CompiledFormData.bonus
+                        ),
+                    )
+                    .outerjoin(
+                        TasksFormData,
+                        col(TasksFormData.id) == CompiledFormData.task_id,
+                    )
+                    .where(CompiledFormData.season_id == season_id)
+                    .group_by(
+                        CompiledFormData.tenant_id,
+                        CompiledFormData.season_id,
+                        CompiledFormData.youth_id,
+                        CompiledFormData.task_id,
+                    )
+                )
+                session.execute(
+                    insert(SeasonSummary).from_select(
+                        [
+                            "tenant_id",
+                            "season_id",
+                            "youth_id",
+                            "task_id",
+                            "entries",
+                            "quantity",
+                            "bonus",
+                            "points",
+                        ],
+                        totals,
+                    )
+                )
+                session.execute(
+                    delete(CompiledFormData).where(
+                        col(CompiledFormData.season_id) == season_id
+                    )
+                )
+                season.archived = True
+                session.add(season)
+                session.commit()
+                bump_data_version(table=Season.__tablename__)
+                return True
+
+        result = handle_database_operation(
+            _archive_operation, "arquivamento da temporada"
+        )
+        return result if result is not None else False
+
+    @staticmethod
+    def get_summaries(season_id: int) -> Sequence[SeasonSummary]:
+        def _get_summaries_operation(bind: Engine):
+            with Session(bind) as session:
+                statement = select(SeasonSummary).where(
+                    SeasonSummary.tenant_id == get_current_tenant(),
+                    SeasonSummary.season_id == season_id,
+                )
                 results = session.exec(statement).all()
             return results
 
         result = handle_database_operation(
-            _get_all_operation, "busca dos registros de tarefas"
+            routed_read(_get_summaries_operation),
+            "busca do resumo da temporada",
         )
         return result if result is not None else []
 
+
+class JobRepository:
+    """Jobs of the current tenant. Job updates do not bump the data
+    version, since no cache is built from them."""
+
     @staticmethod
-    def has_entry_today(youth_id: int, task_id: int) -> bool:
-        """Check if there's already an entry for the same youth and task
-        on the same day"""
+    def create(kind: str, owner: str | None = None) -> Job | None:
+        def _create_operation():
+            now = time.time()
+            entry = Job(
+                kind=kind,
+                created_at=now,
+                tenant_id=get_current_tenant(),
+                owner=owner,
+                heartbeat_at=now,
+            )
+            with Session(engine) as session:
+                session.add(entry)
+                session.commit()
+                session.refresh(entry)
+            return entry
 
-        def _check_operation():
-            today = dt.date.today()
-            today_start = dt.datetime.combine(today, dt.time.min)
-            tomorrow_start = today_start + dt.timedelta(days=1)
+        return handle_database_operation(
+            _create_operation, "criação da tarefa"
+        )
+
+    @staticmethod
+    def get(job_id: int) -> Job | None:
+        def _get_operation():
+            with Session(engine) as session:
+                return get_tenant_entry(session, Job, job_id)
 
-            today_start_timestamp = today_start.timestamp()
-            tomorrow_start_timestamp = tomorrow_start.timestamp()
+        return handle_database_operation(_get_operation, "busca da tarefa")
 
+    @staticmethod
+    def get_recent(limit: int = 10) -> Sequence[Job]:
+        def _get_recent_operation():
             with Session(engine) as session:
-                statement = select(CompiledFormData).where(
-                    CompiledFormData.youth_id == youth_id,
-                    CompiledFormData.task_id == task_id,
-                    CompiledFormData.timestamp >= today_start_timestamp,
-                    CompiledFormData.timestamp < tomorrow_start_timestamp,
+                statement = (
+                    select(Job)
+                    .where(Job.tenant_id == get_current_tenant())
+                    .order_by(col(Job.created_at).desc())
+                    .limit(limit)
                 )
-                result = session.exec(statement).first()
-                return result is not None
+                return session.exec(statement).all()
 
         result = handle_database_operation(
-            _check_operation, "verificação de entrada existente no dia"
+            _get_recent_operation, "busca das tarefas"
+        )
+        return result if result is not None else []
+
+    @staticmethod
+    def update(job_id: int, **values) -> bool:
+        """Updates a job from the machine running it, which also records
+        that the machine is still alive"""
+        values.setdefault("heartbeat_at", time.time())
+
+        def _update_operation():
+            with Session(engine) as session:
+                result = session.execute(
+                    update(Job)
+                    .where(
+                        Job.id == job_id,
+                        Job.tenant_id == get_current_tenant(),
+                    )
+                    .values(**values)
+                )
+                session.commit()
+            return result.rowcount > 0
+
+        result = handle_database_operation(
+            _update_operation, "atualização da tarefa"
         )
         return result if result is not None else False
 
     @staticmethod
-    def delete(entry_id: int) -> bool:
-        def _delete_operation():
+    def request_cancel(job_id: int) -> bool:
+        """Asks a queued or running job to stop, returning False if it is
+        already over"""
+
+        def _request_cancel_operation():
             with Session(engine) as session:
-                entry = session.get(CompiledFormData, entry_id)
-                if entry:
-                    session.delete(entry)
-                    session.commit()
-                    return True
-                return False
+                result = session.execute(
+                    update(Job)
+                    .where(
+                        Job.id == job_id,
+                        Job.tenant_id == get_current_tenant(),
+                        col(Job.status).in_(
+                            [JobStatus.QUEUED, JobStatus.RUNNING]
+                        ),
+                    )
+                    .values(cancel_requested=True)
+                )
+                session.commit()
+            return result.rowcount > 0
 
         result = handle_database_operation(
-            _delete_operation, "exclusão do registro de tarefa"
+            _request_cancel_operation, "cancelamento da tarefa"
         )
         return result if result is not None else False
 
+    @staticmethod
+    def fail_unfinished(message: str, owner: str, stale_before: float) -> int:
+        """Marks as failed the queued and running jobs, of every tenant,
+        that belong to `owner` or were not written to since `stale_before`,
+        returning how many there were. The recent jobs of other machines
+        are still running and left alone."""
+
+        def _fail_unfinished_operation():
+            last_seen = func.coalesce(Job.heartbeat_at, Job.created_at)
+            with Session(engine) as session:
+                result = session.execute(
+                    update(Job)
+                    .where(
+                        col(Job.status).in_(
+                            [JobStatus.QUEUED, JobStatus.RUNNING]
+                        ),
+                        or_(Job.owner == owner, last_seen < stale_before),
+                    )
+                    .values(
+                        status=JobStatus.FAILED,
+                        message=message,
+                        finished_at=time.time(),
+                    )
+                )
+                session.commit()
+            return result.rowcount
+
+        result = handle_database_operation(
+            _fail_unfinished_operation, "limpeza das tarefas"
+        )
+        return result if result is not None else 0
+
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _sqlite_setting(name: str, default: str, allowed: set[str]) -> str:
+    value = os.getenv(name, default).upper()
+    if value not in allowed:
+        logging.warning(f"Ignoring {name}={value!r}, using {default}")
+        return default
+    return value
+
+
+def _sqlite_int_setting(name: str, default: int) -> str:
+    value = os.getenv(name, str(default))
+    try:
+        return str(int(value))
+    except ValueError:
+        logging.warning(f"Ignoring {name}={value!r}, using {default}")
+        return str(default)
+
+
+def sqlite_pragmas() -> dict[str, str]:
+    """Returns the PRAGMAs applied to every new SQLite connection.
+
+    WAL lets readers and a writer work at the same time and the busy
+    timeout makes concurrent writers wait for the lock instead of failing
+    with "database is locked". Each value can be overridden through an
+    environment variable; a malformed one is logged and the default used,
+    so a typo never keeps the app from starting.
+    """
+    return {
+        "journal_mode": _sqlite_setting(
+            "SQLITE_JOURNAL_MODE", "WAL", SQLITE_JOURNAL_MODES
+        ),
+        "synchronous": _sqlite_setting(
+            "SQLITE_SYNCHRONOUS", "NORMAL", SQLITE_SYNCHRONOUS_LEVELS
+        ),
+        "busy_timeout": _sqlite_int_setting("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "mmap_size": _sqlite_int_setting("SQLITE_MMAP_SIZE", 268435456),
+        # Negative values are in KiB, so the default is a 64 MB cache
+        "cache_size": _sqlite_int_setting("SQLITE_CACHE_SIZE", -64000),
+    }
+
+
+def register_sqlite_pragmas(sqlite_engine: Engine) -> None:
+    """Applies `sqlite_pragmas` to every new connection of an engine"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _apply_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_database_engine(url: str) -> Engine:
+    """Creates the engine for a database URL, tuning SQLite connections"""
+    new_engine = create_engine(url)
+    if new_engine.dialect.name == "sqlite":
+        register_sqlite_pragmas(new_engine)
+    return new_engine
+
 
 # Connection strings
 SQLITE_URL = default_db_path
@@ -245,7 +870,7 @@ POSTGRES_URL = os.getenv("POSTGRESCONNECTIONSTRING", "")
 DB_URL = POSTGRES_URL if POSTGRES_URL else SQLITE_URL
 
 try:
-    engine = create_engine(DB_URL)
+    engine = create_database_engine(DB_URL)
     # Create tables
     SQLModel.metadata.create_all(engine)
 except Exception as e:
@@ -256,7 +881,7 @@ except Exception as e:
             f"falling back to SQLite"
         )
         try:
-            engine = create_engine(SQLITE_URL)
+            engine = create_database_engine(SQLITE_URL)
             SQLModel.metadata.create_all(engine)
         except Exception as sqlite_error:
             print(
@@ -273,3 +898,82 @@ except Exception as e:
         # Create a minimal working engine for error handling
         engine = create_engine("sqlite:///:memory:")
         SQLModel.metadata.create_all(engine)
+
+
+# Read replica, see replica.py
+REPLICA_URL = os.getenv("POSTGRESREPLICACONNECTIONSTRING", "")
+replica_router = (
+    ReplicaRouter(create_database_engine(REPLICA_URL)) if REPLICA_URL else None
+)
+
+
+def read_engine() -> Engine:
+    """Returns the engine the reads of the current tenant go to: the
+    replica while it can serve them, the primary otherwise"""
+    if replica_router is None:
+        return engine
+    return replica_router.choose(engine, get_current_tenant())
+
+
+def routed_read[T](operation: Callable[[Engine], T]) -> Callable[[], T]:
+    """Wraps a read so it runs on `read_engine()` and runs again on the
+    primary if the replica fails it"""
+
+    def _routed_operation() -> T:
+        bind = read_engine()
+        if replica_router is None or bind is not replica_router.replica:
+            return operation(bind)
+        try:
+            return operation(bind)
+        except OperationalError as e:
+            replica_router.mark_down(e)
+            return operation(engine)
+
+    return _routed_operation
+
+
+def replica_state() -> dict | None:
+    return replica_router.state() if replica_router is not None else None
+
+
+# Wards the public server answers for, see is_known_tenant
+KNOWN_TENANTS_MAX_AGE_SECONDS = float(
+    os.getenv("KNOWN_TENANTS_MAX_AGE_SECONDS", "30")
+)
+_known_tenants: frozenset[str] = frozenset()
+_known_tenants_loaded_at = float("-inf")
+_known_tenants_lock = threading.Lock()
+
+
+def is_known_tenant(tenant: str) -> bool:
+    """Returns whether a ward exists: the default one, or one with
+    registered youths.
+
+    The public server takes the ward from the URL, so it asks here before
+    building anything for it. The wards are queried at most once every
+    `KNOWN_TENANTS_MAX_AGE_SECONDS`, so made-up wards cost no query most
+    of the time and a new ward is found within that delay. Database
+    errors propagate.
+    """
+    global _known_tenants, _known_tenants_loaded_at
+    if tenant == DEFAULT_TENANT:
+        return True
+    with _known_tenants_lock:
+        if tenant in _known_tenants:
+            return True
+        now = time.monotonic()
+        if now - _known_tenants_loaded_at < KNOWN_TENANTS_MAX_AGE_SECONDS:
+            return False
+        with Session(read_engine()) as session:
+            _known_tenants = frozenset(
+                session.exec(select(YouthFormData.tenant_id).distinct())
+            )
+        _known_tenants_loaded_at = now
+        return tenant in _known_tenants
+
+
+def clear_known_tenants() -> None:
+    global _known_tenants, _known_tenants_loaded_at
+    with _known_tenants_lock:
+        _known_tenants = frozenset()
+        _known_tenants_loaded_at = float("-inf")
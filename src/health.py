@@ -0,0 +1,99 @@
+"""Liveness and readiness of the process for health checks and uptime
+pings.
+
+Neither check renders a page or aggregates any data: liveness only proves
+the process answers, and readiness runs a `SELECT 1` through the shared
+engine with a short timeout and reports the state of the pool, the read
+replica, the caches, the dashboard aggregates and the start-up warm-up.
+The public `/readyz` only answers whether the process is ready; that
+state is shown on the admin Diagnóstico page.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+from sqlalchemy import text
+
+import api
+import database
+from aggregates import aggregates_state
+from async_database import game_data_cache_size
+from cache import figure_cache
+from notifications import listener_state
+from warmup import WarmupState, warmup_status
+
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+
+# Kept apart from the section executor, so a hung database never takes the
+# threads the Dashboard renders with
+_readiness_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="readiness"
+)
+
+
+def liveness() -> dict[str, Any]:
+    return {"status": "ok"}
+
+
+def _ping_database() -> None:
+    with database.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+def pool_state() -> dict[str, Any]:
+    pool = database.engine.pool
+    state: dict[str, Any] = {"class": type(pool).__name__}
+    # Only queue pools keep counters, SQLite in memory uses other pools
+    for counter in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, counter):
+            state[counter] = getattr(pool, counter)()
+    return state
+
+
+def cache_state() -> dict[str, Any]:
+    return {
+        "figures": {
+            "entries": len(figure_cache),
+            "hits": figure_cache.hits,
+            "misses": figure_cache.misses,
+        },
+        "game_data": game_data_cache_size(),
+        "api_responses": api.cached_response_count(),
+    }
+
+
+def readiness(
+    timeout: float = READINESS_TIMEOUT_SECONDS,
+) -> tuple[bool, dict[str, Any]]:
+    """Returns whether the process can serve traffic and why.
+
+    It is ready once the database answers within the timeout and the
+    warm-up is over. A failed warm-up does not hold the process back, its
+    requests are only slower.
+    """
+    try:
+        _readiness_executor.submit(_ping_database).result(timeout=timeout)
+        database_state = {"status": "ok"}
+    except FutureTimeoutError:
+        database_state = {"status": "timeout", "timeout_seconds": timeout}
+    except Exception as e:
+        database_state = {"status": "error", "error": str(e)}
+
+    warmup = warmup_status()
+    ready = database_state["status"] == "ok" and warmup["state"] in (
+        WarmupState.READY,
+        WarmupState.FAILED,
+    )
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "database": database_state,
+        "pool": pool_state(),
+        # The reads fall back to the primary, so it never holds traffic back
+        "replica": database.replica_state(),
+        "notifications": listener_state(),
+        "caches": cache_state(),
+        "aggregates": aggregates_state(),
+        "warmup": warmup,
+    }
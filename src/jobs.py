@@ -0,0 +1,251 @@
+"""Background jobs for long admin operations.
+
+Operations such as recomputing every youth's total points used to run in
+the script thread, blocking the admin's browser, and a page refresh in the
+middle aborted them. They now run as jobs on a small pool of worker threads
+that outlives reruns. Each job is a `Job` row holding its status, progress
+and a cancellation flag, so any session can follow it in the jobs panel
+and ask it to stop. Jobs run in the tenant of the session that submitted
+them, and in the process that did: each job records the machine running
+it, which writes to the row as the job goes on.
+"""
+
+import contextvars
+import logging
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from database import (
+    CompiledFormDataRepository,
+    Job,
+    JobRepository,
+    JobStatus,
+    SeasonRepository,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Progress is written, and the cancellation flag read, at most this often
+JOB_PROGRESS_INTERVAL_SECONDS = 0.5
+# How often the jobs panel refreshes while a job is running
+JOB_PANEL_REFRESH_SECONDS = 2
+# A job not written to for this long is taken as lost with its machine
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+# The machine rather than the process, so a restarted machine recognizes
+# the jobs it was running when it went down
+JOB_OWNER = socket.gethostname()
+
+JOB_STATUS_LABELS = {
+    JobStatus.QUEUED: "Na fila",
+    JobStatus.RUNNING: "Em andamento",
+    JobStatus.SUCCEEDED: "Concluída",
+    JobStatus.FAILED: "Falhou",
+    JobStatus.CANCELLED: "Cancelada",
+}
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation was requested"""
+
+
+class JobContext:
+    """Handle a running job reports its progress through"""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._last_report = 0.0
+
+    def progress(self, fraction: float, message: str | None = None) -> None:
+        """Records the progress of the job and stops it with
+        `JobCancelled` if cancellation was requested. Calls closer than
+        `JOB_PROGRESS_INTERVAL_SECONDS` to the previous one are skipped."""
+        now = time.monotonic()
+        if now - self._last_report < JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+
+        job = JobRepository.get(self.job_id)
+        if job is not None and job.cancel_requested:
+            raise JobCancelled()
+        JobRepository.update(
+            self.job_id, progress=min(max(fraction, 0.0), 1.0), message=message
+        )
+
+
+JobFunction = Callable[[JobContext], str | None]
+
+# Operations that can run as jobs, by kind, with their label
+JOBS: dict[str, tuple[str, JobFunction]] = {}
+
+
+def register_job(
+    kind: str, label: str
+) -> Callable[[JobFunction], JobFunction]:
+    """Registers a function as a job. It receives a `JobContext` and may
+    return a message shown once the job is done."""
+
+    def _register(function: JobFunction) -> JobFunction:
+        JOBS[kind] = (label, function)
+        return function
+
+    return _register
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    """Returns the worker pool shared by every session"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=JOB_WORKERS, thread_name_prefix="job"
+            )
+    return _executor
+
+
+def _run_job(job_id: int, function: JobFunction) -> None:
+    job = JobRepository.get(job_id)
+    if job is None or job.cancel_requested:
+        JobRepository.update(
+            job_id, status=JobStatus.CANCELLED, finished_at=time.time()
+        )
+        return
+
+    JobRepository.update(
+        job_id, status=JobStatus.RUNNING, started_at=time.time()
+    )
+    try:
+        message = function(JobContext(job_id))
+    except JobCancelled:
+        JobRepository.update(
+            job_id, status=JobStatus.CANCELLED, finished_at=time.time()
+        )
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {str(e)}")
+        JobRepository.update(
+            job_id,
+            status=JobStatus.FAILED,
+            message=str(e),
+            finished_at=time.time(),
+        )
+    else:
+        JobRepository.update(
+            job_id,
+            status=JobStatus.SUCCEEDED,
+            progress=1.0,
+            message=message,
+            finished_at=time.time(),
+        )
+
+
+def submit_job(kind: str) -> Job | None:
+    """Queues a job in the current tenant and returns its row, or None if
+    it could not be stored. Raises KeyError for unknown kinds."""
+    _, function = JOBS[kind]
+    job = JobRepository.create(kind, JOB_OWNER)
+    if job is not None:
+        context = contextvars.copy_context()
+        get_job_executor().submit(context.run, _run_job, job.id, function)
+    return job
+
+
+def cancel_job(job_id: int) -> bool:
+    return JobRepository.request_cancel(job_id)
+
+
+def fail_interrupted_jobs() -> int:
+    """Marks as failed the jobs this machine left unfinished when it went
+    down, and those of machines that stopped writing to theirs.
+
+    Jobs only run in the process that queued them, so it must be called at
+    start, before any job is submitted. Other machines may be running jobs
+    right now, which are left alone until `JOB_STALE_SECONDS` pass without
+    any progress.
+    """
+    return JobRepository.fail_unfinished(
+        "Interrompida pelo reinício do app",
+        JOB_OWNER,
+        time.time() - JOB_STALE_SECONDS,
+    )
+
+
+@register_job("recompute_total_points", "Atualizar pontuação total")
+def recompute_total_points(job: JobContext) -> str:
+    """Recomputes the total points of every youth from the entries of the
+    active season"""
+    active_season = SeasonRepository.get_active()
+    compiled_entries = CompiledFormDataRepository.get_all(
+        active_season.id if active_season else None
+    )
+    task_by_id = {t.id: t for t in TasksFormDataRepository.get_all()}
+
+    points_by_youth: dict[int, int] = {}
+    for entry in compiled_entries:
+        task = task_by_id.get(entry.task_id)
+        if task:
+            points_by_youth[entry.youth_id] = (
+                points_by_youth.get(entry.youth_id, 0)
+                + task.points * entry.quantity
+                + entry.bonus
+            )
+
+    youths = [y for y in YouthFormDataRepository.get_all() if y.id]
+    for index, youth in enumerate(youths):
+        job.progress(index / len(youths), youth.name)
+        YouthFormDataRepository.update_total_points(
+            youth.id, points_by_youth.get(youth.id, 0)
+        )
+    return f"Pontuação de {len(youths)} jovens atualizada"
+
+
+def _is_active(job: Job) -> bool:
+    return job.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+def _render_jobs(jobs) -> None:
+    st.subheader("Tarefas em segundo plano")
+    for job in jobs:
+        label = JOBS.get(job.kind, (job.kind, None))[0]
+        status = JOB_STATUS_LABELS.get(job.status, job.status)
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.progress(
+                job.progress,
+                text=f"{label} — {status}"
+                + (f": {job.message}" if job.message else ""),
+            )
+        with col2:
+            if _is_active(job):
+                if job.cancel_requested:
+                    st.caption("Cancelando...")
+                elif st.button("Cancelar", key=f"cancel_job_{job.id}"):
+                    cancel_job(job.id)
+
+
+@st.fragment(run_every=JOB_PANEL_REFRESH_SECONDS)
+def _render_live_jobs(limit: int) -> None:
+    jobs = JobRepository.get_recent(limit)
+    _render_jobs(jobs)
+    if not any(_is_active(job) for job in jobs):
+        # Rerun the whole page, which stops the polling and shows the
+        # results of the finished jobs
+        st.rerun()
+
+
+def render_jobs_panel(limit: int = 5) -> None:
+    """Lists the latest jobs of the tenant. While one is queued or running
+    the list refreshes itself without rerunning the rest of the page."""
+    jobs = JobRepository.get_recent(limit)
+    if any(_is_active(job) for job in jobs):
+        _render_live_jobs(limit)
+    elif jobs:
+        _render_jobs(jobs)
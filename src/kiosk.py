@@ -0,0 +1,210 @@
+"""Static kiosk page of the public leaderboard.
+
+TVs and phones that only watch the ranking do not need a Streamlit session:
+each ward gets a self-contained HTML page with the activity cards, the
+ranking and the charts, written to disk and served by the public server
+with ETag and Last-Modified, so viewers that poll it mostly get a 304.
+
+A page is only rendered again when the data version of its ward changes,
+or on a new day, since the weekly numbers and the countdown depend on the
+date. Streamlit's own static serving cannot be used because it sends every
+HTML file as text/plain.
+"""
+
+import datetime as dt
+import html
+import os
+import tempfile
+import threading
+from importlib.metadata import version
+from pathlib import Path
+
+import sections
+from async_database import get_game_data
+from database import SeasonRepository
+from tenancy import get_data_version, tenant_scope
+
+KIOSK_DIR = Path(
+    os.getenv("KIOSK_DIR", Path(__file__).parent / "static" / "kiosk")
+)
+# How often the page asks the server whether it changed
+KIOSK_REFRESH_SECONDS = int(os.getenv("KIOSK_REFRESH_SECONDS", "60"))
+
+# Read from the package metadata so plotly is only imported when rendering
+PLOTLY_JS = f"plotly-{version('plotly')}.min.js"
+
+KIOSK_ACTIVITIES = [
+    ("Livros de Mórmon", "📖", "Livros de Mórmon entregues"),
+    ("Referências", "📞", "Referências"),
+    ("Lições", "👥", "Lições"),
+    ("Posts", "📱", "Posts nas redes sociais"),
+    ("Noites familiares", "🏠", "Sessões de noite familiar"),
+]
+
+KIOSK_STYLE = """
+body { font-family: sans-serif; margin: 2rem; color: #262730; }
+.cards { display: flex; gap: 1rem; flex-wrap: wrap; }
+.card { flex: 1; min-width: 9rem; padding: 1rem; border-radius: .5rem;
+        background: #f0f2f6; }
+.card .value { font-size: 2rem; font-weight: bold; }
+.card .delta { color: #09ab3b; }
+table { border-collapse: collapse; width: 100%; }
+th, td { padding: .4rem .8rem; border-bottom: 1px solid #e6e9ef;
+         text-align: left; }
+"""
+
+# Data version and day each ward's page was last rendered at
+_published: dict[str, tuple[int, dt.date]] = {}
+# One lock per ward, so a slow ward does not hold up the pages of the
+# others
+_publish_locks: dict[str, threading.Lock] = {}
+_publish_locks_lock = threading.Lock()
+_plotly_js_lock = threading.Lock()
+
+
+def kiosk_path(tenant: str) -> Path:
+    return KIOSK_DIR / f"{tenant}.html"
+
+
+def _publish_lock(tenant: str) -> threading.Lock:
+    with _publish_locks_lock:
+        return _publish_locks.setdefault(tenant, threading.Lock())
+
+
+def publish_plotly_js() -> None:
+    """Writes the plotly bundle the pages load, once per version"""
+    with _plotly_js_lock:
+        plotly_js = KIOSK_DIR / PLOTLY_JS
+        if not plotly_js.exists():
+            from plotly.offline import get_plotlyjs
+
+            write_atomically(plotly_js, get_plotlyjs())
+
+
+def render_kiosk_html(
+    youth_entries, task_entries, compiled_entries, season=None
+) -> str:
+    """Renders the leaderboard as a complete HTML document"""
+    totals, deltas = sections.calculate_task_totals(
+        compiled_entries, task_entries
+    )
+    sorted_youth = sorted(
+        (y for y in youth_entries if y.total_points > 0),
+        key=lambda y: y.total_points,
+        reverse=True,
+    )
+    season_start = season.start_date if season else None
+    season_end = season.end_date if season else None
+    charts = [
+        (
+            "Entregas Semanais de Livros de Mórmon",
+            sections.build_book_deliveries_chart(
+                sections.calculate_weekly_book_deliveries(
+                    compiled_entries, task_entries, season_start
+                )
+            ),
+        ),
+        (
+            "Tarefas Mais Pontuadas",
+            sections.build_task_points_chart(
+                sections.calculate_task_points(compiled_entries, task_entries)
+            ),
+        ),
+        (
+            "Pontuação Total por Organização",
+            sections.build_organization_chart(
+                *sections.calculate_organization_points(youth_entries)
+            ),
+        ),
+    ]
+
+    parts = [
+        "<!DOCTYPE html>",
+        '<html lang="pt-BR"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f'<meta http-equiv="refresh" content="{KIOSK_REFRESH_SECONDS}">',
+        "<title>Painel de Jovens Missionários</title>",
+        f"<style>{KIOSK_STYLE}</style>",
+        f'<script src="{PLOTLY_JS}"></script>',
+        "</head><body>",
+        "<h1>Painel de Jovens Missionários</h1>",
+    ]
+    if season:
+        parts.append(f"<p>Temporada: {html.escape(season.name)}</p>")
+
+    if any(total > 0 for total in totals.values()):
+        parts.append("<h2>Totais das Atividades Missionárias</h2>")
+        parts.append('<div class="cards">')
+        for name, icon, key in KIOSK_ACTIVITIES:
+            delta = (
+                f'<div class="delta">+{deltas[key]} novos</div>'
+                if deltas[key] > 0
+                else ""
+            )
+            parts.append(
+                f'<div class="card"><div>{icon} {name}</div>'
+                f'<div class="value">{totals[key]}</div>{delta}</div>'
+            )
+        parts.append("</div>")
+
+    parts.append("<h2>Ranking dos Jovens por Pontuação Total</h2>")
+    if sorted_youth:
+        parts.append(
+            sections.build_ranking_dataframe(sorted_youth).to_html(
+                index=False, border=0
+            )
+        )
+    else:
+        parts.append("<p>Nenhum jovem cadastrado ainda.</p>")
+
+    for title, chart in charts:
+        if chart is not None:
+            parts.append(f"<h2>{title}</h2>")
+            parts.append(
+                chart.to_html(full_html=False, include_plotlyjs=False)
+            )
+
+    days_remaining = sections.calculate_countdown(season_end)
+    parts.append(
+        f"<hr><p><strong>Ainda faltam {days_remaining} dias para o fim da "
+        "gincana!</strong></p>"
+    )
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def write_atomically(path: Path, content: str) -> None:
+    """Replaces a file in one step, so readers never see it half written"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp"
+    ) as temporary:
+        temporary.write(content)
+    os.replace(temporary.name, path)
+
+
+def publish_kiosk(tenant: str) -> Path:
+    """Renders the page of a ward to disk if its data changed since the
+    last render, and returns its path.
+
+    Only existing wards, see `database.is_known_tenant`, may be published,
+    since every ward gets a file. Database errors propagate and leave the
+    last published page in place.
+    """
+    with _publish_lock(tenant):
+        path = kiosk_path(tenant)
+        freshness = (get_data_version(tenant), dt.date.today())
+        if _published.get(tenant) == freshness and path.exists():
+            return path
+
+        publish_plotly_js()
+        with tenant_scope(tenant):
+            season = SeasonRepository.get_active()
+            youths, tasks, compiled = get_game_data(
+                season.id if season else None
+            )
+            write_atomically(
+                path, render_kiosk_html(youths, tasks, compiled, season)
+            )
+        _published[tenant] = freshness
+        return path
@@ -0,0 +1,37 @@
+"""Entry point of the container: starts the public server of the kiosk
+pages and the JSON API next to the Streamlit app, in the same process so
+both share the data versions that tell them when their output changed.
+The caches are warmed up in the background while Streamlit starts, and
+the admin jobs the previous process left unfinished are marked as failed,
+and the writes of the other machines invalidate the caches of this one.
+Memory tracking, when enabled, starts first so it sees every allocation,
+and the pending schema migrations are applied before anything reads the
+tables."""
+
+from pathlib import Path
+
+from streamlit.web import bootstrap
+
+from jobs import fail_interrupted_jobs
+from memory import start_memory_tracking
+from migrations import migrate
+from notifications import start_change_listener
+from server import start_public_server
+from warmup import start_warmup
+
+DASHBOARD = str(Path(__file__).parent / "Dashboard.py")
+
+
+def main() -> None:
+    start_memory_tracking()
+    migrate()
+    fail_interrupted_jobs()
+    start_change_listener()
+    start_public_server()
+    start_warmup()
+    bootstrap.load_config_options(flag_options={})
+    bootstrap.run(DASHBOARD, False, [], {})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Optional memory accounting of the page runs, built on tracemalloc.
+
+With `MEMORY_TRACKING=1` every page run, Dashboard section and repository
+call records the bytes it allocated at its peak and the bytes it left
+allocated when it was over, and each session the size of its session
+state. A page run is also compared with a tracemalloc snapshot taken at
+its start, at most once every `MEMORY_SNAPSHOT_INTERVAL_SECONDS` per page,
+to find the lines that retained the most. Crossing a threshold logs a
+warning, and the diagnostics page summarizes it all, including the traced
+memory grouped by package, e.g. pandas, plotly or sqlalchemy.
+
+tracemalloc counts the allocations of the whole process, so the numbers of
+a block include whatever other sessions allocated meanwhile, and sections
+running at once share one peak. They are estimates meant to point at the
+culprit, not exact costs. Tracing slows Python allocations down, so it is
+off by default.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from functools import cache
+from pathlib import Path
+
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "0") == "1"
+# Frames kept per allocation; one is enough to group by line
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+MEMORY_PEAK_LOG_MB = float(os.getenv("MEMORY_PEAK_LOG_MB", "50"))
+SESSION_STATE_LOG_MB = float(os.getenv("SESSION_STATE_LOG_MB", "5"))
+MEMORY_SNAPSHOT_INTERVAL_SECONDS = float(
+    os.getenv("MEMORY_SNAPSHOT_INTERVAL_SECONDS", "60")
+)
+MEMORY_TOP_ALLOCATIONS = 15
+# Sessions whose state size is kept, the least recently seen are dropped
+MEMORY_MAX_SESSIONS = 256
+
+PAGE = "Página"
+
+MB = 1024 * 1024
+
+APP_DIR = str(Path(__file__).resolve().parent)
+
+
+@dataclass(slots=True)
+class MemoryStats:
+    """Allocations of one page, section or repository call over its runs"""
+
+    runs: int = 0
+    max_peak: int = 0
+    last_peak: int = 0
+    last_retained: int = 0
+    # Grows run after run when something keeps what it allocated
+    total_retained: int = 0
+
+    def add(self, peak: int, retained: int) -> None:
+        self.runs += 1
+        self.max_peak = max(self.max_peak, peak)
+        self.last_peak = peak
+        self.last_retained = retained
+        self.total_retained += retained
+
+
+@dataclass(slots=True)
+class TracedPeak:
+    """Highest traced memory seen while a block was open"""
+
+    bytes: int
+
+
+@dataclass(slots=True)
+class PageRun:
+    page: str
+    started_bytes: int
+    peak: TracedPeak
+    snapshot: tracemalloc.Snapshot | None = None
+
+
+@dataclass(slots=True)
+class Allocation:
+    location: str
+    size: int
+    count: int
+
+
+@dataclass
+class MemoryReport:
+    stats: dict[tuple[str, str], MemoryStats] = field(default_factory=dict)
+    # Lines that retained the most in the last compared run of each page
+    page_allocations: dict[str, list[Allocation]] = field(default_factory=dict)
+    # Size of the session state and when it was measured, by session
+    sessions: OrderedDict[str, tuple[int, float]] = field(
+        default_factory=OrderedDict
+    )
+    last_snapshot_at: dict[str, float] = field(default_factory=dict)
+
+
+_report = MemoryReport()
+_report_lock = threading.Lock()
+_current_run: ContextVar[PageRun | None] = ContextVar(
+    "current_page_run", default=None
+)
+# Peaks of the page run and of the blocks open around the current one
+_open_peaks: ContextVar[tuple[TracedPeak, ...]] = ContextVar(
+    "open_peaks", default=()
+)
+
+
+def process_rss() -> int | None:
+    """Resident memory of the process, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def start_memory_tracking() -> bool:
+    """Starts tracing allocations if `MEMORY_TRACKING` is on, and tells
+    whether they are traced"""
+    if MEMORY_TRACKING and not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+    return tracemalloc.is_tracing()
+
+
+def record_memory(kind: str, name: str, peak: int, retained: int) -> None:
+    with _report_lock:
+        _report.stats.setdefault((kind, name), MemoryStats()).add(
+            peak, retained
+        )
+    if peak > MEMORY_PEAK_LOG_MB * MB:
+        logging.warning(
+            f"{kind} '{name}' peaked at {peak / MB:.1f} MB "
+            f"and retained {retained / MB:.1f} MB"
+        )
+
+
+def _carry_peak(peaks: tuple[TracedPeak, ...]) -> None:
+    """Carries the traced peak over to the open blocks, before a nested
+    block resets it"""
+    _, peak = tracemalloc.get_traced_memory()
+    for open_peak in peaks:
+        open_peak.bytes = max(open_peak.bytes, peak)
+
+
+@contextmanager
+def tracked(kind: str, name: str):
+    """Records the peak and retained allocations of the block while
+    allocations are traced"""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+
+    started, _ = tracemalloc.get_traced_memory()
+    enclosing = _open_peaks.get()
+    _carry_peak(enclosing)
+    tracemalloc.reset_peak()
+    peak = TracedPeak(started)
+    token = _open_peaks.set((*enclosing, peak))
+    try:
+        yield
+    finally:
+        _open_peaks.reset(token)
+        _carry_peak((peak, *enclosing))
+        current, _ = tracemalloc.get_traced_memory()
+        record_memory(
+            kind, name, max(peak.bytes - started, 0), current - started
+        )
+
+
+@cache
+def _package_of(filename: str) -> str:
+    """Top-level package a source file belongs to, or the app"""
+    filename = os.path.realpath(filename)
+    if filename.startswith(APP_DIR):
+        return "app"
+    for path in sorted(map(os.path.realpath, sys.path), key=len, reverse=True):
+        if filename.startswith(path + os.sep):
+            return Path(filename[len(path) + 1 :]).parts[0].removesuffix(".py")
+    return Path(filename).name
+
+
+def _location(frame: tracemalloc.Frame) -> str:
+    filename = os.path.realpath(frame.filename)
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, APP_DIR)
+    else:
+        filename = f"{_package_of(filename)}/{Path(filename).name}"
+    return f"{filename}:{frame.lineno}"
+
+
+def compare_snapshots(
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    limit: int = MEMORY_TOP_ALLOCATIONS,
+) -> list[Allocation]:
+    """Lines that allocated the most between two snapshots and still hold
+    it"""
+    differences = after.compare_to(before, "lineno")
+    return [
+        Allocation(
+            _location(difference.traceback[0]),
+            difference.size_diff,
+            difference.count_diff,
+        )
+        for difference in differences[:limit]
+        if difference.size_diff > 0
+    ]
+
+
+def memory_by_package() -> list[tuple[str, int]]:
+    """Traced memory grouped by the package that allocated it, largest
+    first"""
+    if not tracemalloc.is_tracing():
+        return []
+    sizes: dict[str, int] = {}
+    for statistic in tracemalloc.take_snapshot().statistics("filename"):
+        package = _package_of(statistic.traceback[0].filename)
+        sizes[package] = sizes.get(package, 0) + statistic.size
+    return sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+
+
+def deep_sizeof(value, seen: set[int] | None = None) -> int:
+    """Approximate bytes held by a value and everything it references"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, dict):
+        size += sum(
+            deep_sizeof(k, seen) + deep_sizeof(v, seen)
+            for k, v in value.items()
+        )
+    elif isinstance(value, list | tuple | set | frozenset):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += deep_sizeof(vars(value), seen)
+    return size
+
+
+def record_session_state(session_id: str, state: dict) -> int:
+    """Measures the state kept by a session between runs"""
+    size = deep_sizeof(state)
+    with _report_lock:
+        _report.sessions[session_id] = (size, time.time())
+        _report.sessions.move_to_end(session_id)
+        while len(_report.sessions) > MEMORY_MAX_SESSIONS:
+            _report.sessions.popitem(last=False)
+    if size > SESSION_STATE_LOG_MB * MB:
+        logging.warning(
+            f"Session {session_id} keeps {size / MB:.1f} MB of state"
+        )
+    return size
+
+
+def start_page_run(page: str) -> PageRun | None:
+    """Starts the accounting of a page run, taking a snapshot if the page
+    was not compared lately"""
+    if not start_memory_tracking():
+        return None
+    now = time.time()
+    snapshot = None
+    with _report_lock:
+        last = _report.last_snapshot_at.get(page, 0.0)
+        if now - last >= MEMORY_SNAPSHOT_INTERVAL_SECONDS:
+            _report.last_snapshot_at[page] = now
+            take_snapshot = True
+        else:
+            take_snapshot = False
+    if take_snapshot:
+        snapshot = tracemalloc.take_snapshot()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    run = PageRun(page, current, TracedPeak(current), snapshot)
+    _current_run.set(run)
+    _open_peaks.set((run.peak,))
+    return run
+
+
+def finish_page_run(
+    session_id: str | None = None, state: dict | None = None
+) -> None:
+    """Records the allocations of the page run and the size of the state
+    its session keeps"""
+    run = _current_run.get()
+    if run is None:
+        return
+    _current_run.set(None)
+    _open_peaks.set(())
+    if not tracemalloc.is_tracing():
+        return
+
+    _carry_peak((run.peak,))
+    current, _ = tracemalloc.get_traced_memory()
+    record_memory(
+        PAGE,
+        run.page,
+        max(run.peak.bytes - run.started_bytes, 0),
+        current - run.started_bytes,
+    )
+    if run.snapshot is not None:
+        allocations = compare_snapshots(
+            run.snapshot, tracemalloc.take_snapshot()
+        )
+        with _report_lock:
+            _report.page_allocations[run.page] = allocations
+    if session_id is not None and state is not None:
+        record_session_state(session_id, state)
+
+
+def memory_report() -> MemoryReport:
+    """Copy of what was recorded so far"""
+    with _report_lock:
+        return MemoryReport(
+            {key: replace(stats) for key, stats in _report.stats.items()},
+            dict(_report.page_allocations),
+            OrderedDict(_report.sessions),
+            dict(_report.last_snapshot_at),
+        )
+
+
+def reset_memory_report() -> None:
+    global _report
+    with _report_lock:
+        _report = MemoryReport()
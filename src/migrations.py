@@ -0,0 +1,450 @@
+"""Versioned schema migrations, safe to apply while the game is live.
+
+`SQLModel.metadata.create_all` only creates the tables that are missing,
+so a column or an index added to a model never reaches a database created
+before it. The changes made to the tables since the first release are
+therefore listed in `MIGRATIONS`, and the versions applied to a database
+are recorded in `schema_migrations`. They are applied by the fly release
+command (`python src/migrations.py`), before the new machines start, and
+again by `main` at start, which is a no-op unless the database lives on a
+volume the release machine does not see.
+
+The steps never lock out writers for long:
+
+- columns are added nullable or with a constant default, which Postgres
+  only records in the catalog, and each `ALTER TABLE` gives up after
+  `MIGRATION_LOCK_TIMEOUT_MS` rather than queueing the writes behind it,
+  trying again up to `MIGRATION_LOCK_RETRIES` times
+- indexes are built with `CREATE INDEX CONCURRENTLY` on Postgres, outside
+  any transaction; an index a failed build left invalid is dropped and
+  built again
+- derived columns are backfilled `MIGRATION_BATCH_SIZE` rows at a time,
+  each batch in its own short transaction, pausing
+  `MIGRATION_BATCH_PAUSE_SECONDS` between batches
+
+Every step is idempotent, and a migration is recorded once all its steps
+succeeded, so a migration that failed halfway, or that `create_all`
+already covered on a new database, is simply run again. Only one process
+migrates a Postgres database at a time.
+"""
+
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Engine,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Row,
+    Select,
+    String,
+    Table,
+    bindparam,
+    false,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+import database
+from aggregates import create_aggregates
+from database import (
+    CompiledFormData,
+    DataChange,
+    Job,
+    Season,
+    SeasonSummary,
+    TasksFormData,
+    YouthFormData,
+    day_bucket_of,
+)
+from tenancy import DEFAULT_TENANT
+
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+MIGRATION_BATCH_PAUSE_SECONDS = float(
+    os.getenv("MIGRATION_BATCH_PAUSE_SECONDS", "0.1")
+)
+MIGRATION_LOCK_TIMEOUT_MS = int(os.getenv("MIGRATION_LOCK_TIMEOUT_MS", "2000"))
+MIGRATION_LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "10"))
+
+# Key of the advisory lock held by the process migrating a Postgres
+# database
+MIGRATION_ADVISORY_LOCK = 727_050
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+
+def is_postgres(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def add_column(
+    engine: Engine, table: Table, name: str, definition: str
+) -> bool:
+    """Adds a column unless the table already has it. The definition must
+    be nullable or have a constant default, so no row is rewritten."""
+    for attempt in range(1, MIGRATION_LOCK_RETRIES + 1):
+        try:
+            with engine.begin() as connection:
+                columns = inspect(connection).get_columns(table.name)
+                if name in {column["name"] for column in columns}:
+                    return False
+                if is_postgres(engine):
+                    connection.exec_driver_sql(
+                        f"SET LOCAL lock_timeout = {MIGRATION_LOCK_TIMEOUT_MS}"
+                    )
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {name} {definition}"
+                )
+            return True
+        except OperationalError as e:
+            # The lock timeout expired behind a long transaction
+            if attempt == MIGRATION_LOCK_RETRIES:
+                raise
+            logging.warning(
+                f"Adding {table.name}.{name} waited too long for its lock "
+                f"({e.orig}), trying again"
+            )
+            time.sleep(attempt)
+    return False
+
+
+def index_statement(index: Index, engine: Engine) -> str:
+    """CREATE INDEX statement of a declared index, concurrent on
+    Postgres"""
+    statement = str(
+        CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect)
+    )
+    if is_postgres(engine):
+        statement = statement.replace(
+            "INDEX IF NOT EXISTS", "INDEX CONCURRENTLY IF NOT EXISTS", 1
+        )
+    return statement
+
+
+def drop_invalid_index(connection: Connection, name: str) -> None:
+    """Drops an index a failed concurrent build left behind, which `IF NOT
+    EXISTS` would otherwise take for a finished one"""
+    invalid = connection.execute(
+        text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = "
+            "pg_index.indexrelid WHERE pg_class.relname = :name "
+            "AND NOT pg_index.indisvalid"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        logging.warning(f"Dropping the invalid index {name}")
+        connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def has_unique_constraint(
+    connection: Connection, table: Table, columns: Sequence[str]
+) -> bool:
+    constraints = inspect(connection).get_unique_constraints(table.name)
+    return any(
+        constraint["column_names"] == list(columns)
+        for constraint in constraints
+    )
+
+
+def create_index(engine: Engine, index: Index) -> None:
+    """Builds an index declared on a model if it is missing. On Postgres
+    the build runs outside any transaction, as CONCURRENTLY requires."""
+    columns = [column.name for column in index.columns]
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        if index.unique and has_unique_constraint(
+            connection, index.table, columns
+        ):
+            return
+        if is_postgres(engine):
+            drop_invalid_index(connection, index.name)
+        connection.exec_driver_sql(index_statement(index, engine))
+
+
+def declared_index(table: Table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+def backfill(
+    engine: Engine,
+    batch: Callable[[int], Select],
+    apply: Callable[[Connection, Sequence[Row]], None],
+    batch_size: int | None = None,
+) -> int:
+    """Fills a derived column in batches of rows ordered by id.
+
+    `batch(last_id)` selects the next rows to fill, `id` first, and
+    `apply` writes their values. Each batch is committed on its own, so
+    the writers only ever wait for one batch. Returns the number of
+    batches.
+    """
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    last_id, batches = 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(batch(last_id).limit(batch_size)).all()
+            if not rows:
+                return batches
+            apply(connection, rows)
+        batches += 1
+        last_id = rows[-1].id
+        logging.info(f"Backfilled {batches} batches, up to id {last_id}")
+        time.sleep(MIGRATION_BATCH_PAUSE_SECONDS)
+
+
+def create_tables(engine: Engine, *models: type[SQLModel]) -> None:
+    SQLModel.metadata.create_all(
+        engine, tables=[model.__table__ for model in models]
+    )
+
+
+def add_idempotency_key(engine: Engine) -> None:
+    table = CompiledFormData.__table__
+    add_column(engine, table, "idempotency_key", "VARCHAR")
+    # Named as Postgres names the constraint of create_all, and declared on
+    # a copy of the table so create_all does not build it as well
+    copy = table.to_metadata(MetaData())
+    create_index(
+        engine,
+        Index(
+            "compiledformdata_idempotency_key_key",
+            copy.c.idempotency_key,
+            unique=True,
+        ),
+    )
+
+
+def _select_day_buckets(last_id: int) -> Select:
+    compiled = CompiledFormData.__table__
+    tasks = TasksFormData.__table__
+    return (
+        select(
+            compiled.c.id,
+            compiled.c.youth_id,
+            compiled.c.task_id,
+            compiled.c.timestamp,
+        )
+        .join(tasks, tasks.c.id == compiled.c.task_id)
+        .where(
+            tasks.c.repeatable == false(),
+            compiled.c.day_bucket.is_(None),
+            compiled.c.id > last_id,
+        )
+        .order_by(compiled.c.id)
+    )
+
+
+def _apply_day_buckets(connection: Connection, rows: Sequence[Row]) -> None:
+    """Sets the day bucket of non-repeatable entries. Extra entries of a
+    youth, task and day recorded before the rule existed keep no bucket,
+    so the unique index can still be built."""
+    compiled = CompiledFormData.__table__
+    buckets = {row.id: day_bucket_of(row.timestamp) for row in rows}
+    taken = set(
+        connection.execute(
+            select(
+                compiled.c.youth_id, compiled.c.task_id, compiled.c.day_bucket
+            ).where(
+                compiled.c.day_bucket.in_(bindparam("days", expanding=True))
+            ),
+            {"days": sorted(set(buckets.values()))},
+        ).tuples()
+    )
+    values = []
+    for row in rows:
+        key = (row.youth_id, row.task_id, buckets[row.id])
+        if key not in taken:
+            taken.add(key)
+            values.append({"entry_id": row.id, "bucket": buckets[row.id]})
+    if values:
+        connection.execute(
+            update(compiled)
+            .where(compiled.c.id == bindparam("entry_id"))
+            .values(day_bucket=bindparam("bucket")),
+            values,
+        )
+
+
+def add_day_bucket(engine: Engine) -> None:
+    table = CompiledFormData.__table__
+    add_column(engine, table, "day_bucket", "INTEGER")
+    backfill(engine, _select_day_buckets, _apply_day_buckets)
+    create_index(
+        engine,
+        declared_index(table, "ix_compiledformdata_non_repeatable_daily"),
+    )
+
+
+def add_seasons(engine: Engine) -> None:
+    create_tables(engine, Season, SeasonSummary)
+    add_column(
+        engine,
+        CompiledFormData.__table__,
+        "season_id",
+        "INTEGER REFERENCES season (id)",
+    )
+
+
+def add_tenants(engine: Engine) -> None:
+    # A constant default fills the existing rows without rewriting them
+    for model in (
+        YouthFormData,
+        TasksFormData,
+        CompiledFormData,
+        Season,
+        SeasonSummary,
+    ):
+        add_column(
+            engine,
+            model.__table__,
+            "tenant_id",
+            f"VARCHAR NOT NULL DEFAULT '{DEFAULT_TENANT}'",
+        )
+    for model, name in (
+        (YouthFormData, "ix_youthformdata_tenant"),
+        (TasksFormData, "ix_tasksformdata_tenant"),
+        (Season, "ix_season_tenant"),
+        (CompiledFormData, "ix_compiledformdata_tenant_season"),
+        (SeasonSummary, "ix_seasonsummary_tenant_season"),
+    ):
+        create_index(engine, declared_index(model.__table__, name))
+
+
+def add_jobs(engine: Engine) -> None:
+    create_tables(engine, Job)
+    create_index(engine, declared_index(Job.__table__, "ix_job_tenant"))
+
+
+def add_data_changes(engine: Engine) -> None:
+    create_tables(engine, DataChange)
+
+
+def add_job_owners(engine: Engine) -> None:
+    table = Job.__table__
+    add_column(engine, table, "owner", "VARCHAR")
+    add_column(engine, table, "heartbeat_at", "FLOAT")
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Engine], None]
+
+
+# Append only: a released migration is never edited nor renumbered
+MIGRATIONS = (
+    Migration(1, "compiled entry idempotency key", add_idempotency_key),
+    Migration(2, "non-repeatable daily bucket", add_day_bucket),
+    Migration(3, "seasons", add_seasons),
+    Migration(4, "tenants", add_tenants),
+    Migration(5, "jobs", add_jobs),
+    Migration(6, "data changes", add_data_changes),
+    Migration(7, "dashboard aggregates", create_aggregates),
+    Migration(8, "job owners", add_job_owners),
+)
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    migration_metadata.create_all(engine)
+    with engine.connect() as connection:
+        return set(
+            connection.execute(select(schema_migrations.c.version)).scalars()
+        )
+
+
+def pending_migrations(engine: Engine | None = None) -> list[Migration]:
+    applied = applied_versions(engine or database.engine)
+    return [
+        migration
+        for migration in MIGRATIONS
+        if migration.version not in applied
+    ]
+
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[None]:
+    """Holds a Postgres advisory lock, so concurrent deploys or machines
+    starting together migrate one after the other"""
+    if not is_postgres(engine):
+        yield
+        return
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        key = {"key": MIGRATION_ADVISORY_LOCK}
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), key)
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), key)
+
+
+def migrate(engine: Engine | None = None) -> list[int]:
+    """Applies the pending migrations in order, returning their versions"""
+    engine = engine or database.engine
+    applied: list[int] = []
+    with migration_lock(engine):
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                continue
+            logging.info(
+                f"Applying migration {migration.version}: {migration.name}"
+            )
+            started = time.perf_counter()
+            migration.apply(engine)
+            with engine.begin() as connection:
+                connection.execute(
+                    schema_migrations.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        applied_at=time.time(),
+                    )
+                )
+            applied.append(migration.version)
+            logging.info(
+                f"Applied migration {migration.version} in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+    return applied
+
+
+def main() -> int:
+    """Release command: migrates the configured database"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if database.POSTGRES_URL and not is_postgres(database.engine):
+        # database fell back to SQLite, which must not pass for a release
+        logging.error("PostgreSQL is configured but could not be reached")
+        return 1
+    applied = migrate()
+    logging.info(f"{len(applied)} migrations applied")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
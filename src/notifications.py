@@ -0,0 +1,243 @@
+"""Invalidation of the caches of every process after a write.
+
+Each process keys its caches (figures, snapshots, kiosk pages, API
+responses, the name index) by the data versions it keeps per ward, which
+only its own writes bump. With several machines, a write made on one would
+leave the others stale until their caches age out.
+
+Once `start_change_listener` runs, every write made by the process is
+published with its ward and table, and the writes published by the other
+processes bump the data version of their ward here too. The snapshot
+refresher wakes up on the bump, so the new points are loaded within about
+a second without polling the tables themselves:
+
+- on Postgres the writes are sent with `NOTIFY` on `NOTIFY_CHANNEL`, and a
+  dedicated connection `LISTEN`s to it
+- SQLite cannot notify, so the writes are appended to the small
+  `DataChange` table, which is polled for new rows every
+  `NOTIFY_POLL_SECONDS`; rows older than `NOTIFY_RETENTION_SECONDS` are
+  pruned
+
+A process ignores what it published itself. Notifications sent while the
+listener was reconnecting are lost, and the periodic refresh of the
+snapshots picks those writes up instead.
+"""
+
+import json
+import logging
+import os
+import secrets
+import select as io_select
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from sqlalchemy import Engine, create_engine, func, text
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, col, delete, select
+
+import database
+from database import DataChange
+from tenancy import bump_data_version, on_data_change
+
+NOTIFY_CHANNEL = "data_changes"
+NOTIFY_POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "0.5"))
+NOTIFY_RETENTION_SECONDS = float(os.getenv("NOTIFY_RETENTION_SECONDS", "3600"))
+# Wait before listening again after the connection failed
+NOTIFY_RECONNECT_SECONDS = 5
+
+ORIGIN = f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}"
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeNotice:
+    tenant: str
+    table: str | None
+    origin: str
+
+    def to_payload(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ChangeNotice":
+        return cls(**json.loads(payload))
+
+
+def uses_notify(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def publish_change(tenant: str, table: str | None = None) -> None:
+    """Tells the other processes a ward's table changed. A failure is only
+    logged: the write itself already succeeded."""
+    notice = ChangeNotice(tenant, table, ORIGIN)
+    engine = database.engine
+    try:
+        if uses_notify(engine):
+            with engine.connect() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {
+                        "channel": NOTIFY_CHANNEL,
+                        "payload": notice.to_payload(),
+                    },
+                )
+                connection.commit()
+        else:
+            with Session(engine) as session:
+                session.add(
+                    DataChange(
+                        table_name=table,
+                        origin=notice.origin,
+                        created_at=time.time(),
+                        tenant_id=tenant,
+                    )
+                )
+                session.commit()
+    except Exception as e:
+        logging.error(f"Publishing the change of {tenant}/{table} failed: {e}")
+
+
+class ChangeListener:
+    """Applies the writes published by the other processes"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.received = 0
+        self.error: str | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_id: int | None = None
+        self._pruned_at = 0.0
+
+    @property
+    def mode(self) -> str:
+        return "notify" if uses_notify(self.engine) else "poll"
+
+    def apply(self, notice: ChangeNotice) -> bool:
+        """Bumps the data version of the ward of a write made elsewhere"""
+        if notice.origin == ORIGIN:
+            return False
+        bump_data_version(notice.tenant, notice.table, publish=False)
+        self.received += 1
+        return True
+
+    def drain(self, dbapi_connection) -> None:
+        """Applies the notifications a psycopg2 connection received"""
+        dbapi_connection.poll()
+        while dbapi_connection.notifies:
+            notify = dbapi_connection.notifies.pop(0)
+            try:
+                self.apply(ChangeNotice.from_payload(notify.payload))
+            except (TypeError, ValueError) as e:
+                logging.error(f"Ignoring notification {notify.payload}: {e}")
+
+    def listen(self) -> None:
+        """Waits for notifications on a connection of its own, outside the
+        pool of the pages"""
+        listen_engine = create_engine(self.engine.url, poolclass=NullPool)
+        connection = listen_engine.raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            self.error = None
+            while not self._stopped.is_set():
+                readable, _, _ = io_select.select(
+                    [dbapi_connection], [], [], NOTIFY_POLL_SECONDS
+                )
+                if readable:
+                    self.drain(dbapi_connection)
+        finally:
+            connection.close()
+            listen_engine.dispose()
+
+    def poll(self) -> None:
+        """Applies the rows appended since the last poll and prunes the old
+        ones"""
+        with Session(self.engine) as session:
+            if self._last_id is None:
+                # Only writes made from now on are of interest
+                self._last_id = session.exec(
+                    select(func.coalesce(func.max(DataChange.id), 0))
+                ).one()
+                return
+            changes = session.exec(
+                select(DataChange)
+                .where(col(DataChange.id) > self._last_id)
+                .order_by(col(DataChange.id))
+            ).all()
+            for change in changes:
+                self.apply(
+                    ChangeNotice(
+                        change.tenant_id, change.table_name, change.origin
+                    )
+                )
+                self._last_id = change.id
+            now = time.time()
+            if now - self._pruned_at >= NOTIFY_RETENTION_SECONDS / 10:
+                self._pruned_at = now
+                session.execute(
+                    delete(DataChange).where(
+                        col(DataChange.created_at)
+                        < now - NOTIFY_RETENTION_SECONDS
+                    )
+                )
+                session.commit()
+        self.error = None
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if uses_notify(self.engine):
+                    self.listen()
+                else:
+                    self.poll()
+                    self._stopped.wait(NOTIFY_POLL_SECONDS)
+            except Exception as e:
+                self.error = str(e)
+                logging.error(f"Listening to the changes failed: {e}")
+                self._stopped.wait(NOTIFY_RECONNECT_SECONDS)
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(
+            target=self.run, name="change-listener", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "received": self.received,
+            "error": self.error,
+        }
+
+
+_listener: ChangeListener | None = None
+_listener_lock = threading.Lock()
+
+
+def start_change_listener() -> ChangeListener:
+    """Publishes the writes of this process and applies the ones of the
+    others, from a background thread"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            on_data_change(publish_change)
+            _listener = ChangeListener(database.engine)
+            _listener.start()
+    return _listener
+
+
+def listener_state() -> dict[str, Any] | None:
+    return _listener.state() if _listener is not None else None
@@ -1,19 +1,27 @@
-import pandas as pd
+import datetime as dt
+
 import streamlit as st
 
 from database import (
-    CompiledFormDataRepository,
+    SeasonRepository,
     TasksFormDataRepository,
     YouthFormDataRepository,
 )
-from utils import check_password
+from jobs import render_jobs_panel, submit_job
+from profiling import render_page_profile, start_page_profile
+from utils import check_password, select_tenant
 
 st.set_page_config(page_title="Dados dos Jovens e Tarefas", page_icon="📁")
+select_tenant()
 
 
 if not check_password():
     st.stop()
+start_page_profile("Dados da Gincana")
 
+# Only loaded once the password was accepted, so the login screen stays
+# light
+import pandas as pd  # noqa: E402
 
 st.title("Cadastro de Jovens")
 
@@ -40,23 +48,10 @@ with col1:
     st.header("Cadastros Salvos")
 with col2:
     if st.button("Atualizar Pontuação Total"):
-        compiled_entries = CompiledFormDataRepository.get_all()
-
-        task_by_id = {t.id: t for t in TasksFormDataRepository.get_all()}
-        for youth in YouthFormDataRepository.get_all():
-            total_points = 0
-            for entry in compiled_entries:
-                if entry.youth_id == youth.id:
-                    task = task_by_id.get(entry.task_id)
-                    if task:
-                        total_points += (
-                            task.points * entry.quantity + entry.bonus
-                        )
-            if youth.id:
-                YouthFormDataRepository.update_total_points(
-                    youth.id, total_points
-                )
-        st.rerun()
+        # Runs in the background, so it goes on if the page is reloaded
+        if submit_job("recompute_total_points") is not None:
+            st.toast("Atualização da pontuação iniciada!")
+render_jobs_panel()
 entries = YouthFormDataRepository.get_all()
 if entries:
     df = pd.DataFrame(
@@ -108,3 +103,66 @@ if task_entries:
     st.dataframe(df_tasks, hide_index=True)
 else:
     st.info("Nenhuma tarefa salva ainda.")
+
+
+st.title("Temporadas")
+
+
+with st.expander("Adicionar Temporada", expanded=False):
+    with st.form("season_entry_form"):
+        season_name = st.text_input("Nome da Temporada")
+        start_date = st.date_input("Início", format="DD/MM/YYYY")
+        end_date = st.date_input("Fim", format="DD/MM/YYYY")
+        submitted_season = st.form_submit_button("Adicionar Temporada")
+
+        if submitted_season:
+            if end_date < start_date:
+                st.error("❌ O fim da temporada deve ser depois do início.")
+            else:
+                result = SeasonRepository.store(
+                    season_name, start_date, end_date
+                )
+                if result is not None:
+                    st.success("Temporada adicionada!")
+                # Error message is handled by the repository method
+
+
+st.header("Temporadas Salvas")
+seasons = SeasonRepository.get_all()
+if seasons:
+    df_seasons = pd.DataFrame(
+        [
+            {
+                "Temporada": s.name,
+                "Início": s.start_date.strftime("%d/%m/%Y"),
+                "Fim": s.end_date.strftime("%d/%m/%Y"),
+                "Arquivada": "Sim" if s.archived else "Não",
+            }
+            for s in seasons
+        ]
+    )
+    st.dataframe(df_seasons, hide_index=True)
+
+    # Only seasons that are over can be archived
+    closed_seasons = {
+        s.id: s.name
+        for s in seasons
+        if not s.archived and s.end_date < dt.date.today()
+    }
+    if closed_seasons:
+        season_to_archive = st.selectbox(
+            "Temporada encerrada",
+            options=list(closed_seasons.keys()),
+            format_func=lambda x: closed_seasons[x],
+        )
+        if st.button("Arquivar Temporada"):
+            if SeasonRepository.archive(season_to_archive):
+                st.success(
+                    "Temporada arquivada! Os registros foram resumidos "
+                    "por jovem e tarefa."
+                )
+                st.rerun()
+else:
+    st.info("Nenhuma temporada salva ainda.")
+
+render_page_profile()
@@ -1,57 +1,95 @@
 import time
 from datetime import datetime
 
-import pandas as pd
 import streamlit as st
 
 from database import (
     CompiledFormDataRepository,
+    SeasonRepository,
+    StoreOutcome,
     TasksFormDataRepository,
     YouthFormDataRepository,
 )
-from utils import check_password
+from profiling import render_page_profile, start_page_profile
+from search import SEARCH_RESULTS_LIMIT, get_youth_index
+from utils import (
+    check_password,
+    get_idempotency_key,
+    reset_idempotency_key,
+    select_tenant,
+)
 
 st.set_page_config(page_title="Registros das Tarefas", page_icon="📝")
+select_tenant()
 
 
 if not check_password():
     st.stop()
+start_page_profile("Registro das Tarefas")
 
+# Only loaded once the password was accepted, so the login screen stays
+# light
+import pandas as pd  # noqa: E402
 
 st.title("Registrar Dados Compilados")
 
+# Entries are registered in, and listed from, the active season only
+active_season = SeasonRepository.get_active()
+season_id = active_season.id if active_season else None
+if active_season:
+    st.caption(f"Temporada: {active_season.name}")
+
 
 def refresh_youth_and_task_entries():
-    youth_entries = YouthFormDataRepository.get_all()
+    youth_index = get_youth_index()
     task_entries = TasksFormDataRepository.get_all()
-    youth_options = {y.id: y.name for y in youth_entries}
-    youth_org_options = {y.id: y.organization for y in youth_entries}
     task_options = {t.id: t.tasks for t in task_entries}
-    return (
-        youth_entries,
-        task_entries,
-        youth_options,
-        youth_org_options,
-        task_options,
-    )
+    return youth_index, task_entries, task_options
 
 
-(
-    youth_entries,
-    task_entries,
-    youth_options,
-    youth_org_options,
-    task_options,
-) = refresh_youth_and_task_entries()
+youth_index, task_entries, task_options = refresh_youth_and_task_entries()
 task_by_id = {t.id: t for t in task_entries}
 
-with st.form("compiled_form"):
+
+def get_name_by_id(id_):
+    youth = youth_index.get(id_)
+    return youth.name if youth else str(id_)
+
+
+def get_organization_by_id(id_):
+    youth = youth_index.get(id_)
+    return youth.organization if youth else str(id_)
+
+
+# The search runs on the server, so only its best matches are sent to the
+# browser as options of the picker. It stays outside the form so the
+# options follow what was typed.
+youth_query = st.text_input(
+    "Buscar Jovem",
+    placeholder="Digite parte do nome e pressione Enter",
+)
+youth_matches = youth_index.search(youth_query, SEARCH_RESULTS_LIMIT)
+if youth_query and not youth_matches:
+    st.warning("Nenhum jovem encontrado com esse nome.")
+elif len(youth_matches) < len(youth_index):
+    st.caption(
+        f"Mostrando {len(youth_matches)} de {len(youth_index)} jovens. "
+        "Digite para encontrar os demais."
+    )
+
+# The idempotency key is minted when the form is rendered and the form is
+# named after it, so every submission of this form instance carries the
+# same key, even one arriving after the first was stored. It only changes
+# once a success renders a new form.
+form_idempotency_key = get_idempotency_key("compiled_form")
+
+with st.form(f"compiled_form_{form_idempotency_key}"):
     # Get selected task to determine if it's repeatable
     # (outside form for reactivity)
     selected_youth_id = st.selectbox(
         "Selecionar Jovem",
-        options=list(youth_options.keys()),
-        format_func=lambda x: youth_options[x] if x in youth_options else "",
+        options=[youth.id for youth in youth_matches],
+        format_func=get_name_by_id,
     )
     selected_task_id = st.selectbox(
         "Selecionar Tarefa",
@@ -71,34 +109,42 @@ with st.form("compiled_form"):
     submitted = st.form_submit_button("Registrar Entrada")
 
     if submitted and selected_youth_id and selected_task_id:
-        has_entry_today = CompiledFormDataRepository.has_entry_today(
-            selected_youth_id, selected_task_id
-        )
-        # Validate non-repeatable tasks
-        # Check if there's already an entry today for this youth and task
-        if not is_repeatable and has_entry_today:
-            st.error(
-                "❌ Esta tarefa não é repetível e já foi registrada hoje "
-                "para este jovem. Apenas uma entrada por semana é permitida."
-            )
         # Check if the task is not repeatable but the quantity is more than 1
-        elif not is_repeatable and quantity > 1:
+        if not is_repeatable and quantity > 1:
             st.error(
                 "❌ Esta tarefa não é repetível. "
                 "Apenas uma entrada por semana é permitida."
             )
         else:
-            # For repeatable tasks, proceed normally
-            result = CompiledFormDataRepository.store(
+            # The once-per-day rule of non-repeatable tasks is enforced by
+            # the database in the same statement that stores the entry
+            result = CompiledFormDataRepository.register(
                 youth_id=selected_youth_id,
                 task_id=selected_task_id,
                 timestamp=time.time(),
                 quantity=quantity,
                 bonus=bonus,
+                repeatable=is_repeatable,
+                idempotency_key=form_idempotency_key,
+                season_id=season_id,
             )
-            if result is not None:
+            outcome = result[0] if result is not None else None
+            if outcome is StoreOutcome.DUPLICATE_DAY:
+                st.error(
+                    "❌ Esta tarefa não é repetível e já foi registrada hoje "
+                    "para este jovem. Apenas uma entrada por semana é "
+                    "permitida."
+                )
+            elif outcome is StoreOutcome.REPLAYED:
+                # The first submission already updated the total points
+                reset_idempotency_key("compiled_form")
+                st.rerun()
+            elif outcome is StoreOutcome.CREATED:
+                reset_idempotency_key("compiled_form")
                 # Recalculate total points for the selected youth
-                compiled_entries = CompiledFormDataRepository.get_all()
+                compiled_entries = CompiledFormDataRepository.get_all(
+                    season_id
+                )
                 total_points = 0
                 for entry in compiled_entries:
                     if entry.youth_id == selected_youth_id:
@@ -121,15 +167,9 @@ with st.form("compiled_form"):
 
 # Display stored compiled entries
 st.header("Entradas Compiladas Salvas")
-compiled_entries = CompiledFormDataRepository.get_all()
+compiled_entries = CompiledFormDataRepository.get_all(season_id)
 if compiled_entries:
 
-    def get_name_by_id(id_):
-        return youth_options.get(id_, str(id_))
-
-    def get_organization_by_id(id_):
-        return youth_org_options.get(id_, str(id_))
-
     def get_task_by_id(id_):
         return task_options.get(id_, str(id_))
 
@@ -158,3 +198,5 @@ if compiled_entries:
     st.dataframe(df_compiled, hide_index=True)
 else:
     st.info("Nenhuma entrada compilada salva ainda.")
+
+render_page_profile()
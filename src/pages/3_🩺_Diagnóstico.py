@@ -0,0 +1,158 @@
+import datetime as dt
+import tracemalloc
+
+import streamlit as st
+
+from health import cache_state, readiness
+from memory import (
+    MB,
+    MEMORY_PEAK_LOG_MB,
+    SESSION_STATE_LOG_MB,
+    memory_by_package,
+    memory_report,
+    process_rss,
+)
+from utils import check_password, select_tenant
+
+st.set_page_config(page_title="Diagnóstico", page_icon="🩺")
+select_tenant()
+
+
+if not check_password():
+    st.stop()
+
+
+def megabytes(size):
+    return round(size / MB, 2)
+
+
+st.title("Diagnóstico de Memória")
+
+tracing = tracemalloc.is_tracing()
+traced, traced_peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+rss = process_rss()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Memória do processo", f"{megabytes(rss)} MB" if rss else "—")
+col2.metric("Rastreada agora", f"{megabytes(traced)} MB" if tracing else "—")
+col3.metric(
+    "Pico rastreado", f"{megabytes(traced_peak)} MB" if tracing else "—"
+)
+
+caches = cache_state()
+st.caption(
+    f"Gráficos em cache: {caches['figures']['entries']} · "
+    f"Dados do jogo em memória: {caches['game_data']} · "
+    f"Respostas da API em cache: {caches['api_responses']}"
+)
+
+st.header("Prontidão do Processo")
+ready, readiness_state = readiness()
+st.caption(
+    "Detalhes da verificação `/readyz`, que na porta pública só responde "
+    "se o processo está pronto."
+)
+if ready:
+    st.success("Pronto para atender")
+else:
+    st.warning("Ainda não está pronto")
+st.json(readiness_state, expanded=False)
+
+if not tracing:
+    st.info(
+        "O rastreamento de memória está desligado. Defina a variável de "
+        "ambiente MEMORY_TRACKING=1 e reinicie o app para medir cada "
+        "página, seção e consulta."
+    )
+    st.stop()
+
+report = memory_report()
+
+st.header("Páginas, Seções e Consultas")
+st.caption(
+    "Pico e memória retida por execução. Um aviso é registrado no log "
+    f"quando um pico passa de {MEMORY_PEAK_LOG_MB:g} MB."
+)
+if report.stats:
+    st.dataframe(
+        [
+            {
+                "Tipo": kind,
+                "Nome": name,
+                "Execuções": stats.runs,
+                "Pico máximo (MB)": megabytes(stats.max_peak),
+                "Último pico (MB)": megabytes(stats.last_peak),
+                "Retido na última (MB)": megabytes(stats.last_retained),
+                "Retido acumulado (MB)": megabytes(stats.total_retained),
+            }
+            for (kind, name), stats in sorted(
+                report.stats.items(),
+                key=lambda item: item[1].max_peak,
+                reverse=True,
+            )
+        ],
+        hide_index=True,
+    )
+else:
+    st.info("Nenhuma página executada desde que o rastreamento começou.")
+
+st.header("Maiores Alocações Retidas por Página")
+if report.page_allocations:
+    for page, allocations in sorted(report.page_allocations.items()):
+        st.subheader(page)
+        st.dataframe(
+            [
+                {
+                    "Linha": allocation.location,
+                    "Retido (KB)": round(allocation.size / 1024, 1),
+                    "Objetos": allocation.count,
+                }
+                for allocation in allocations
+            ],
+            hide_index=True,
+        )
+else:
+    st.info("Nenhuma execução comparada ainda.")
+
+st.header("Estado das Sessões")
+st.caption(
+    "Tamanho do estado guardado por sessão entre execuções. Um aviso é "
+    f"registrado no log acima de {SESSION_STATE_LOG_MB:g} MB."
+)
+if report.sessions:
+    sizes = [size for size, _ in report.sessions.values()]
+    st.metric(
+        f"{len(sizes)} sessões",
+        f"{megabytes(sum(sizes))} MB",
+        help=f"Maior sessão: {megabytes(max(sizes))} MB",
+    )
+    st.dataframe(
+        [
+            {
+                "Sessão": session_id,
+                "Estado (KB)": round(size / 1024, 1),
+                "Medido em": dt.datetime.fromtimestamp(measured_at).strftime(
+                    "%d/%m/%Y %H:%M:%S"
+                ),
+            }
+            for session_id, (size, measured_at) in sorted(
+                report.sessions.items(),
+                key=lambda item: item[1][0],
+                reverse=True,
+            )[:10]
+        ],
+        hide_index=True,
+    )
+else:
+    st.info("Nenhuma sessão medida ainda.")
+
+st.header("Memória por Pacote")
+if st.button("Medir memória por pacote"):
+    # Takes a snapshot of every traced allocation, so it only runs on demand
+    st.dataframe(
+        [
+            {"Pacote": package, "Memória (MB)": megabytes(size)}
+            for package, size in memory_by_package()
+        ],
+        hide_index=True,
+    )
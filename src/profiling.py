@@ -0,0 +1,473 @@
+"""On-demand profiling of a page run.
+
+An authenticated session opening a page with `?profile=1` runs it under a
+stack sampler, and with `?profile=cprofile` under cProfile. At the bottom
+of the page a report shows the slowest functions, the time spent in each
+repository call and in each Dashboard section, and offers the profile for
+download: a speedscope file and folded stacks for flame graphs when
+sampling, a pstats dump with cProfile. Everything runs in process, so it
+works in a local run as well as in production.
+
+The sampler follows the script thread and the section threads while they
+work for the profiled run. cProfile hooks into the whole interpreter, so
+it records every thread, those of other sessions included, and only one
+cProfile can run at a time in the process: a run asking for it while
+another holds it is sampled instead. Both stop by themselves after
+`PROFILE_MAX_SECONDS`, in case the run never reaches its report.
+"""
+
+import cProfile
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from memory import finish_page_run, start_page_run, tracked
+from tenancy import get_current_tenant
+from tracing import finish_trace, start_trace, traced
+
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_SAMPLE_INTERVAL_SECONDS = (
+    float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+)
+# The sampler and cProfile stop by themselves after this long, in case the
+# page never reached its report, e.g. after st.rerun or st.stop
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_TOP_FUNCTIONS = 25
+
+# Kinds of timings recorded while a profile runs
+REPOSITORY = "Repositório"
+SECTION = "Seção"
+COMPUTATION = "Cálculo"
+
+# Frames outside this directory are dropped from the root of the stacks,
+# so they start at the page instead of Streamlit's script runner
+APP_DIR = str(Path(__file__).resolve().parent)
+
+
+# Held while a cProfile runs, the interpreter allowing a single one
+_cprofile_lock = threading.Lock()
+
+
+class ProfileMode(StrEnum):
+    SAMPLING = "1"
+    CPROFILE = "cprofile"
+
+
+@dataclass(frozen=True, slots=True)
+class FunctionStat:
+    function: str
+    calls: int | None
+    self_seconds: float
+    total_seconds: float
+
+
+def _frame_name(code) -> str:
+    return (
+        f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler:
+    """Samples the stacks of a set of threads at a fixed interval"""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        # Stacks, root first, counted per thread name
+        self.samples: dict[str, Counter[tuple]] = {}
+        self._threads: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def follow(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads[thread_id] += 1
+
+    def unfollow(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopped.wait(self.interval):
+            if time.monotonic() > deadline:
+                return
+            self.sample()
+
+    def sample(self) -> None:
+        with self._lock:
+            followed = list(self._threads)
+        frames = sys._current_frames()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id in followed:
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            # Skip the frames of the runner or the pool the thread is in
+            first = next(
+                (
+                    i
+                    for i, code in enumerate(stack)
+                    if code.co_filename.startswith(APP_DIR)
+                ),
+                0,
+            )
+            key = tuple(_frame_name(code) for code in stack[first:])
+            thread_name = names.get(thread_id, str(thread_id))
+            self.samples.setdefault(thread_name, Counter())[key] += 1
+
+    def top_functions(self) -> list[FunctionStat]:
+        self_samples: Counter[str] = Counter()
+        total_samples: Counter[str] = Counter()
+        for stacks in self.samples.values():
+            for stack, count in stacks.items():
+                if stack:
+                    self_samples[stack[-1]] += count
+                for name in set(stack):
+                    total_samples[name] += count
+        return [
+            FunctionStat(
+                name,
+                None,
+                self_samples[name] * self.interval,
+                count * self.interval,
+            )
+            for name, count in total_samples.most_common()
+        ]
+
+    def folded(self) -> str:
+        """Stacks in the folded format of flamegraph.pl and speedscope"""
+        return "".join(
+            ";".join((thread_name, *stack)) + f" {count}\n"
+            for thread_name, stacks in sorted(self.samples.items())
+            for stack, count in stacks.items()
+        )
+
+    def speedscope(self, name: str) -> dict:
+        """The samples in speedscope's file format, one profile per
+        thread"""
+        frames: dict[str, int] = {}
+        profiles = []
+        for thread_name, stacks in sorted(self.samples.items()):
+            samples = []
+            weights = []
+            for stack, count in stacks.items():
+                samples.append(
+                    [frames.setdefault(frame, len(frames)) for frame in stack]
+                )
+                weights.append(count * self.interval)
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "youth-missionary-game",
+            "shared": {"frames": [{"name": frame} for frame in frames]},
+            "profiles": profiles,
+        }
+
+
+class PageProfile:
+    """Profile of one page run and the timings recorded during it"""
+
+    def __init__(self, page: str, mode: ProfileMode):
+        self.page = page
+        self.mode = mode
+        self.elapsed = 0.0
+        # Call count and seconds by kind and name
+        self.timings: dict[tuple[str, str], list] = {}
+        self.sampler: StackSampler | None = None
+        self.profiler: cProfile.Profile | None = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self._profiler_timer: threading.Timer | None = None
+
+    def start(self) -> None:
+        """Starts profiling the run. cProfile falls back to sampling, and
+        the mode changes to say so, while another cProfile runs."""
+        self._started = time.perf_counter()
+        if self.mode is ProfileMode.CPROFILE and self._start_profiler():
+            return
+        self.mode = ProfileMode.SAMPLING
+        self.sampler = StackSampler(
+            PROFILE_SAMPLE_INTERVAL_SECONDS, PROFILE_MAX_SECONDS
+        )
+        self.sampler.follow(threading.get_ident())
+        self.sampler.start()
+
+    def _start_profiler(self) -> bool:
+        if not _cprofile_lock.acquire(blocking=False):
+            return False
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool, e.g. a debugger or coverage
+            _cprofile_lock.release()
+            return False
+        self.profiler = profiler
+        self._profiler_timer = threading.Timer(
+            PROFILE_MAX_SECONDS, self._stop_profiler
+        )
+        self._profiler_timer.daemon = True
+        self._profiler_timer.start()
+        return True
+
+    def _stop_profiler(self) -> None:
+        """Disables cProfile and lets other runs use it, only once"""
+        with self._lock:
+            if self._profiler_timer is None:
+                return
+            self._profiler_timer.cancel()
+            self._profiler_timer = None
+            self.profiler.disable()
+            _cprofile_lock.release()
+
+    def stop(self) -> None:
+        if self.profiler is not None:
+            self._stop_profiler()
+            self.profiler.create_stats()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        with self._lock:
+            timing = self.timings.setdefault((kind, name), [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+
+    def timings_of(self, kind: str) -> list[tuple[str, int, float]]:
+        """Name, calls and seconds of one kind, slowest first"""
+        return sorted(
+            (
+                (name, calls, seconds)
+                for (timing_kind, name), (
+                    calls,
+                    seconds,
+                ) in self.timings.items()
+                if timing_kind == kind
+            ),
+            key=lambda timing: timing[2],
+            reverse=True,
+        )
+
+    def top_functions(self, limit: int = PROFILE_TOP_FUNCTIONS) -> list:
+        if self.sampler is not None:
+            return self.sampler.top_functions()[:limit]
+        stats = []
+        for (filename, line, function), (
+            _,
+            calls,
+            self_seconds,
+            total_seconds,
+            _,
+        ) in self.profiler.stats.items():
+            stats.append(
+                FunctionStat(
+                    f"{function} ({Path(filename).name}:{line})",
+                    calls,
+                    self_seconds,
+                    total_seconds,
+                )
+            )
+        stats.sort(key=lambda stat: stat.total_seconds, reverse=True)
+        return stats[:limit]
+
+
+_current_profile: ContextVar[PageProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+@contextmanager
+def timed(kind: str, name: str):
+    """Records how long the block took in the profile of the run, if any,
+    what it allocated while memory is tracked, and its span when the run
+    is traced. Blocks on other threads, e.g. sections, are also
+    sampled."""
+    profile = _current_profile.get()
+    with tracked(kind, name), traced(kind, name):
+        if profile is None:
+            yield
+            return
+
+        sampler = profile.sampler
+        thread_id = threading.get_ident()
+        if sampler is not None:
+            sampler.follow(thread_id)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.record(kind, name, time.perf_counter() - started)
+            if sampler is not None:
+                sampler.unfollow(thread_id)
+
+
+def section(name: str):
+    """Times a section of a page"""
+    return timed(SECTION, name)
+
+
+def requested_mode() -> ProfileMode | None:
+    """Profiling mode asked for in the query string, only honored for
+    sessions that entered the admin password"""
+    if st.session_state.get("password_correct") is not True:
+        return None
+    try:
+        return ProfileMode(st.query_params.get(PROFILE_QUERY_PARAM, ""))
+    except ValueError:
+        return None
+
+
+def start_page_profile(page: str) -> PageProfile | None:
+    """Starts the memory accounting and the trace of the rest of the page
+    run if they are enabled, and profiling it if it was requested.
+    `render_page_profile` at the bottom of the page shows the report."""
+    start_page_run(page)
+    start_trace(page, tenant=get_current_tenant())
+    previous = _current_profile.get()
+    if previous is not None:
+        # Left running by a run that never reached its report
+        previous.stop()
+        _current_profile.set(None)
+
+    mode = requested_mode()
+    if mode is None:
+        return None
+    profile = PageProfile(page, mode)
+    _current_profile.set(profile)
+    profile.start()
+    if profile.mode is not mode:
+        st.warning(
+            "Outra execução já está usando o cProfile; esta página será "
+            "perfilada por amostragem."
+        )
+    return profile
+
+
+def profile_functions_table(profile: PageProfile) -> list[dict]:
+    return [
+        {
+            "Função": stat.function,
+            "Chamadas": stat.calls,
+            "Próprio (ms)": round(stat.self_seconds * 1000, 1),
+            "Total (ms)": round(stat.total_seconds * 1000, 1),
+        }
+        for stat in profile.top_functions()
+    ]
+
+
+def profile_timings_table(profile: PageProfile, kind: str) -> list[dict]:
+    return [
+        {
+            "Nome": name,
+            "Chamadas": calls,
+            "Total (ms)": round(seconds * 1000, 1),
+        }
+        for name, calls, seconds in profile.timings_of(kind)
+    ]
+
+
+def render_page_profile() -> None:
+    """Finishes the memory accounting and the trace of the run, then stops
+    its profile and shows the report"""
+    finish_trace()
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        finish_page_run(ctx.session_id, st.session_state.to_dict())
+    else:
+        finish_page_run()
+
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    profile.stop()
+    _current_profile.set(None)
+
+    with st.expander("⏱️ Perfil da página", expanded=True):
+        st.caption(
+            f"{profile.page}: {profile.elapsed * 1000:.0f} ms"
+            + (
+                " (amostragem)"
+                if profile.mode is ProfileMode.SAMPLING
+                else " (cProfile, todas as threads)"
+            )
+        )
+        st.subheader("Funções mais lentas")
+        st.dataframe(profile_functions_table(profile), hide_index=True)
+        for kind, title in [
+            (REPOSITORY, "Chamadas ao banco de dados"),
+            (SECTION, "Seções"),
+            (COMPUTATION, "Cálculos em segundo plano"),
+        ]:
+            rows = profile_timings_table(profile, kind)
+            if rows:
+                st.subheader(title)
+                st.dataframe(rows, hide_index=True)
+
+        if profile.sampler is not None:
+            st.download_button(
+                "Baixar perfil (speedscope)",
+                json.dumps(profile.sampler.speedscope(profile.page)),
+                file_name="perfil.speedscope.json",
+                mime="application/json",
+                on_click="ignore",
+            )
+            st.download_button(
+                "Baixar pilhas para flame graph",
+                profile.sampler.folded(),
+                file_name="perfil.folded",
+                mime="text/plain",
+                on_click="ignore",
+            )
+        else:
+            st.download_button(
+                "Baixar perfil (pstats)",
+                # What pstats.Stats.dump_stats writes, readable by
+                # snakeviz or pstats
+                marshal.dumps(profile.profiler.stats),
+                file_name="perfil.prof",
+                mime="application/octet-stream",
+                on_click="ignore",
+            )
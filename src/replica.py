@@ -0,0 +1,137 @@
+"""Routing of the repository reads to a read replica.
+
+With `POSTGRESREPLICACONNECTIONSTRING` set, the reads of the pages, the
+snapshot and the API (`get_all`, the active season, the season summaries)
+go to the replica, so the public Dashboard traffic does not compete with
+the admin writes. Writes, including the reads of a write such as the
+entry an idempotent submission replays, stay on the primary.
+
+A ward that was written to reads from the primary for
+`REPLICA_STICKY_SECONDS` afterwards, so the admin who just saved sees the
+change. It is the whole ward rather than the writing session: the caches
+shared by every session reload right after a write and must not store
+what the replica did not apply yet.
+
+The replica is skipped, and every read goes to the primary, while its
+replay lag is over `REPLICA_MAX_LAG_SECONDS` or for `REPLICA_RETRY_SECONDS`
+after it failed. The lag is measured at most every `REPLICA_CHECK_SECONDS`
+by the read that finds it outdated.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine, text
+
+from tenancy import seconds_since_data_change
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+# A replica that replayed everything it received is not behind, however
+# long ago the last transaction was
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
+)
+
+
+class ReplicaRouter:
+    """Decides whether a read can go to the replica"""
+
+    def __init__(
+        self,
+        replica: Engine,
+        max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+        sticky_seconds: float = REPLICA_STICKY_SECONDS,
+        check_seconds: float = REPLICA_CHECK_SECONDS,
+        retry_seconds: float = REPLICA_RETRY_SECONDS,
+    ):
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self.lag_seconds: float | None = None
+        self.error: str | None = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._checked_at = float("-inf")
+        self._down_until = float("-inf")
+        self._check_lock = threading.Lock()
+
+    def measure_lag(self) -> float:
+        """Seconds the replica is behind the primary"""
+        with self.replica.connect() as connection:
+            if self.replica.dialect.name != "postgresql":
+                connection.execute(text("SELECT 1"))
+                return 0.0
+            lag = connection.execute(POSTGRES_LAG_QUERY).scalar()
+        # NULL when the server is not replaying, i.e. it is not a replica
+        return float(lag or 0.0)
+
+    def check(self) -> None:
+        """Measures the lag again if the last measure is outdated. Only
+        one read measures at a time, the others use the last measure."""
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            self.lag_seconds = self.measure_lag()
+            self.error = None
+            if self.lag_seconds > self.max_lag_seconds:
+                logging.warning(
+                    f"Read replica is {self.lag_seconds:.1f}s behind, "
+                    f"reading from the primary"
+                )
+        except Exception as e:
+            self.mark_down(e)
+        finally:
+            self._check_lock.release()
+
+    def mark_down(self, error: BaseException) -> None:
+        """Sends the reads to the primary until the retry delay is over"""
+        logging.error(
+            f"Read replica failed ({error}), reading from the primary for "
+            f"{self.retry_seconds:g}s"
+        )
+        self.error = str(error)
+        self._down_until = time.monotonic() + self.retry_seconds
+        # Measured again as soon as the delay is over
+        self._checked_at = self._down_until - self.check_seconds
+
+    def available(self) -> bool:
+        return (
+            time.monotonic() >= self._down_until
+            and self.lag_seconds is not None
+            and self.lag_seconds <= self.max_lag_seconds
+        )
+
+    def choose(self, primary: Engine, tenant: str | None = None) -> Engine:
+        """Engine a read of the tenant should use"""
+        if seconds_since_data_change(tenant) < self.sticky_seconds:
+            self.primary_reads += 1
+            return primary
+        self.check()
+        if self.available():
+            self.replica_reads += 1
+            return self.replica
+        self.primary_reads += 1
+        return primary
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "available": self.available(),
+            "lag_seconds": self.lag_seconds,
+            "error": self.error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
@@ -0,0 +1,183 @@
+"""In-memory search over the names of the youths of a ward.
+
+The registration page used to send every youth of the ward to the browser
+as an option of its picker on every rerun. It now sends only the best
+`SEARCH_RESULTS_LIMIT` matches of what was typed, found in a `NameIndex`
+kept by the process for each ward.
+
+Names are compared accent and case insensitively, so "joao" finds "João".
+A name matches when every typed word starts one of its words, e.g.
+"ma sil" finds "Maria da Silva", and names starting with what was typed
+come first. When too few names match that way, names sharing most of the
+trigrams of the query fill the rest, so a typo like "Joao Slva" still
+finds "João Silva".
+
+The index is built again after a write to the youths of the ward, made
+by this process or announced by another one, and, in case an announcement
+was missed, once it is older than `SEARCH_INDEX_MAX_AGE_SECONDS`. Entries,
+seasons and aggregate refreshes leave it alone.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from database import YouthFormData, YouthFormDataRepository
+from profiling import COMPUTATION, timed
+from snapshot import YouthRow
+from tenancy import get_current_tenant, get_table_version
+
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "20"))
+SEARCH_INDEX_MAX_AGE_SECONDS = float(
+    os.getenv("SEARCH_INDEX_MAX_AGE_SECONDS", "30")
+)
+# Share of the trigrams of the query a name needs to be a fuzzy match
+SEARCH_MIN_TRIGRAM_SIMILARITY = 0.5
+YOUTH_TABLE = YouthFormData.__tablename__
+
+
+def normalize(text: str) -> str:
+    """Lowercases the text and strips its accents and extra spaces"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of each word of a normalized text, padded so the start
+    and end of words count too"""
+    return {
+        padded[i : i + 3]
+        for word in text.split()
+        for padded in (f"  {word} ",)
+        for i in range(len(padded) - 2)
+    }
+
+
+class NameIndex:
+    """Youths of a ward, searchable by word prefix and by trigram"""
+
+    def __init__(self, youths: Iterable, version: int = 0):
+        self.version = version
+        self.built_at = time.monotonic()
+        rows = sorted(
+            (
+                YouthRow(y.id, y.name, y.age, y.organization, y.total_points)
+                for y in youths
+            ),
+            key=lambda row: (normalize(row.name), row.id),
+        )
+        self._rows = tuple(rows)
+        self._positions = {row.id: i for i, row in enumerate(rows)}
+        self._names = tuple(normalize(row.name) for row in rows)
+        # Every word of every name, sorted so a prefix is a contiguous range
+        self._words = sorted(
+            (word, i)
+            for i, name in enumerate(self._names)
+            for word in set(name.split())
+        )
+        self._trigrams: dict[str, list[int]] = {}
+        for i, name in enumerate(self._names):
+            for trigram in trigrams(name):
+                self._trigrams.setdefault(trigram, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, youth_id: int) -> YouthRow | None:
+        position = self._positions.get(youth_id)
+        return self._rows[position] if position is not None else None
+
+    def _starting_with(self, prefix: str) -> set[int]:
+        """Positions of the names with a word starting with the prefix"""
+        found = set()
+        start = bisect_left(self._words, (prefix,))
+        for word, position in self._words[start:]:
+            if not word.startswith(prefix):
+                break
+            found.add(position)
+        return found
+
+    def _similar_to(self, query: str) -> list[int]:
+        """Positions of the names sharing enough trigrams with the query,
+        most similar first"""
+        query_trigrams = trigrams(query)
+        shared: dict[int, int] = {}
+        for trigram in query_trigrams:
+            for position in self._trigrams.get(trigram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        needed = SEARCH_MIN_TRIGRAM_SIMILARITY * len(query_trigrams)
+        return sorted(
+            (
+                position
+                for position, count in shared.items()
+                if count >= needed
+            ),
+            key=lambda position: (-shared[position], position),
+        )
+
+    def search(
+        self, query: str, limit: int = SEARCH_RESULTS_LIMIT
+    ) -> list[YouthRow]:
+        """Youths whose name best matches the query, at most `limit`. An
+        empty query lists the first names in alphabetical order."""
+        query = normalize(query)
+        if not query:
+            return list(self._rows[:limit])
+
+        words = query.split()
+        matches = self._starting_with(words[0])
+        for word in words[1:]:
+            matches &= self._starting_with(word)
+        # Names starting with the query first, then alphabetical order
+        positions = sorted(
+            matches,
+            key=lambda position: (
+                not self._names[position].startswith(query),
+                position,
+            ),
+        )
+        if len(positions) < limit:
+            positions += [
+                position
+                for position in self._similar_to(query)
+                if position not in matches
+            ]
+        return [self._rows[position] for position in positions[:limit]]
+
+
+_indexes: dict[str, NameIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_youth_index() -> NameIndex:
+    """Returns the name index of the current ward, building it if the
+    ward's youths changed or the index got old"""
+    tenant = get_current_tenant()
+    index = _indexes.get(tenant)
+    if (
+        index is not None
+        and index.version == get_table_version(YOUTH_TABLE, tenant)
+        and time.monotonic() - index.built_at < SEARCH_INDEX_MAX_AGE_SECONDS
+    ):
+        return index
+
+    # Read before loading, so a write made in between is never stored
+    # under the new version
+    version = get_table_version(YOUTH_TABLE, tenant)
+    youths = YouthFormDataRepository.get_all()
+    with timed(COMPUTATION, "índice de busca dos jovens"):
+        index = NameIndex(youths, version)
+    # An empty ward costs nothing to index and may come from a failed query
+    if index:
+        with _indexes_lock:
+            _indexes[tenant] = index
+    return index
+
+
+def clear_search_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,557 @@
+"""Computations behind each Dashboard section.
+
+The functions here take already loaded rows and never touch Streamlit, so
+the Dashboard can run them on the shared section executor while the script
+thread renders the sections that are already done. pandas and plotly are
+imported by the builders that need them, so a process only pays for them
+once a section actually renders. Entries may be given as rows or as
+`EntryColumns`, which the hot helpers aggregate column by column. The
+`*_from_aggregates` variants compute the same results from the rows of
+the `aggregates` kept by the database.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from columnar import EntryColumns
+from profiling import COMPUTATION, timed
+
+COLOR_YOUNG_MAN, COLOR_YOUNG_WOMAN = ["#1f77b4", "#e75480"]
+
+SECTION_WORKERS = int(os.getenv("DASHBOARD_SECTION_WORKERS", "4"))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_plotting_lock = threading.Lock()
+
+
+def get_section_executor() -> ThreadPoolExecutor:
+    """Returns the bounded thread pool shared by every session"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SECTION_WORKERS, thread_name_prefix="section"
+            )
+    return _executor
+
+
+def _timed_section(fn, /, *args, **kwargs):
+    name = getattr(fn, "__name__", repr(fn))
+    if args and isinstance(args[0], str):
+        # Tells apart the calls of one helper, e.g. the figures built by
+        # cached_figure_spec
+        name = f"{name} {args[0]}"
+    with timed(COMPUTATION, name):
+        return fn(*args, **kwargs)
+
+
+def submit_section(fn, /, *args, **kwargs) -> Future:
+    """Runs a section on the shared executor within the caller's context,
+    so the section sees the tenant, and the profile if any, of the session
+    that submitted it"""
+    context = contextvars.copy_context()
+    return get_section_executor().submit(
+        context.run, _timed_section, fn, *args, **kwargs
+    )
+
+
+def _plotting():
+    """Imports plotly for the chart builders, which run on several section
+    threads at once. plotly only looks pandas up in sys.modules, so a
+    builder importing it while another thread is still importing pandas
+    gets a half-initialized module; pandas is imported first, under a
+    lock."""
+    with _plotting_lock:
+        import pandas  # noqa: F401
+        import plotly.express as px
+        import plotly.graph_objects as go
+    return px, go
+
+
+# Helper function to calculate last Sunday
+def get_last_sunday():
+    today = datetime.now()
+    days_since_sunday = (
+        today.weekday() + 1
+    )  # Monday = 1, Tuesday = 2, ..., Sunday = 7
+    last_sunday = today - timedelta(days=days_since_sunday)
+    # Set to beginning of Sunday
+    return last_sunday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# The specific tasks we want to track with Portuguese display names
+TARGET_TASKS = {
+    "Entregar Livro de Mórmon + foto + relato no grupo": (
+        "Livros de Mórmon entregues"
+    ),
+    "Levar amigo à sacramental": "Pessoas levadas à igreja",
+    "Dar contato (tel/endereço) às Sisteres": "Referências",
+    "Visitar com as Sisteres": "Lições",
+    "Postar mensagem do evangelho nas redes sociais + print": (
+        "Posts nas redes sociais"
+    ),
+    "Fazer noite familiar com pesquisador": "Sessões de noite familiar",
+}
+
+
+# Calculate totals for specific missionary activities
+def calculate_task_totals(compiled_entries, task_entries):
+    task_dict = {t.id: t for t in task_entries}
+    target_tasks = TARGET_TASKS
+
+    # Calculate totals and deltas since last Sunday
+    # (week runs Sunday to Saturday)
+    totals = dict.fromkeys(target_tasks.values(), 0)
+    deltas = dict.fromkeys(target_tasks.values(), 0)
+
+    last_sunday = get_last_sunday()
+    # Week starts on Sunday, not Monday after Sunday
+    sunday_timestamp = last_sunday.timestamp()
+
+    if isinstance(compiled_entries, EntryColumns):
+        display_names = {
+            t.id: target_tasks[t.tasks]
+            for t in task_entries
+            if t.tasks in target_tasks
+        }
+        for sums, since in ((totals, None), (deltas, sunday_timestamp)):
+            quantities = compiled_entries.between(since).sum_by("task_id")
+            for task_id, quantity in quantities.items():
+                if task_id in display_names:
+                    sums[display_names[task_id]] += quantity
+        return totals, deltas
+
+    for entry in compiled_entries:
+        task = task_dict.get(entry.task_id)
+        if task and task.tasks in target_tasks:
+            display_name = target_tasks[task.tasks]
+            totals[display_name] += entry.quantity
+
+            # Count activities since last Sunday (current week)
+            if entry.timestamp >= sunday_timestamp:
+                deltas[display_name] += entry.quantity
+
+    return totals, deltas
+
+
+def calculate_task_totals_from_aggregates(aggregates, task_entries):
+    """`calculate_task_totals` from the task totals and daily quantities"""
+    display_names = {
+        t.id: TARGET_TASKS[t.tasks]
+        for t in task_entries
+        if t.tasks in TARGET_TASKS
+    }
+    totals = dict.fromkeys(TARGET_TASKS.values(), 0)
+    deltas = dict.fromkeys(TARGET_TASKS.values(), 0)
+    sunday = get_last_sunday().toordinal()
+
+    for row in aggregates.task_totals:
+        if row.task_id in display_names:
+            totals[display_names[row.task_id]] += row.quantity
+    for row in aggregates.task_daily_quantities:
+        if row.day >= sunday and row.task_id in display_names:
+            deltas[display_names[row.task_id]] += row.quantity
+    return totals, deltas
+
+
+# Calculate weekly points for each youth
+def calculate_weekly_youth_points(
+    compiled_entries, task_entries, youth_entries
+):
+    """Calculate points earned by each youth this week (Sunday to Saturday)"""
+
+    task_dict = {t.id: t for t in task_entries}
+
+    last_sunday = get_last_sunday()
+    sunday_timestamp = last_sunday.timestamp()
+
+    # Add up the points of each youth before this week (Sunday onwards)
+    # and during it
+    if isinstance(compiled_entries, EntryColumns):
+        task_points = {t.id: t.points for t in task_entries}
+        points_before = compiled_entries.between(
+            end=sunday_timestamp
+        ).points_by("youth_id", task_points)
+        points_this_week = compiled_entries.between(
+            sunday_timestamp
+        ).points_by("youth_id", task_points)
+    else:
+        points_before, points_this_week = {}, {}
+        for entry in compiled_entries:
+            task = task_dict.get(entry.task_id)
+            if task:
+                points = task.points * entry.quantity + entry.bonus
+                sums = (
+                    points_before
+                    if entry.timestamp < sunday_timestamp
+                    else points_this_week
+                )
+                sums[entry.youth_id] = sums.get(entry.youth_id, 0) + points
+
+    return rank_weekly_points(youth_entries, points_before, points_this_week)
+
+
+def calculate_weekly_youth_points_from_aggregates(aggregates, youth_entries):
+    """`calculate_weekly_youth_points` from the daily points of each
+    youth"""
+    sunday = get_last_sunday().toordinal()
+    points_before, points_this_week = {}, {}
+    for row in aggregates.youth_daily_points:
+        sums = points_before if row.day < sunday else points_this_week
+        sums[row.youth_id] = sums.get(row.youth_id, 0) + row.points
+    return rank_weekly_points(youth_entries, points_before, points_this_week)
+
+
+def rank_weekly_points(youth_entries, points_before, points_this_week):
+    """Points of each youth this week, with how many positions the youth
+    moved since last Saturday, from the points of each youth before this
+    week and during it"""
+    youth_dict = {y.id: y for y in youth_entries}
+
+    # Calculate current total points for each youth (all time)
+    current_total_points = {}
+    for youth in youth_entries:
+        current_total_points[youth.id] = {
+            "name": youth.name,
+            "organization": youth.organization,
+            "points": youth.total_points,
+        }
+
+    # Calculate total points as of last Saturday
+    # (excluding this week's entries)
+    last_saturday_points = {}
+    for youth in youth_entries:
+        last_saturday_points[youth.id] = {
+            "name": youth.name,
+            "organization": youth.organization,
+            "points": 0,
+        }
+
+    for youth_id, points in points_before.items():
+        if youth_id in youth_dict:
+            last_saturday_points[youth_id]["points"] += points
+
+    # Create ranking for current totals (position 1 = highest points)
+    current_ranking = sorted(
+        [
+            (youth_id, data["points"])
+            for youth_id, data in current_total_points.items()
+            if data["points"] > 0
+        ],
+        key=lambda x: x[1],
+        reverse=True,
+    )
+    current_positions = {
+        youth_id: idx + 1 for idx, (youth_id, _) in enumerate(current_ranking)
+    }
+
+    # Create ranking for last Saturday (position 1 = highest points)
+    last_saturday_ranking = sorted(
+        [
+            (youth_id, data["points"])
+            for youth_id, data in last_saturday_points.items()
+            if data["points"] > 0
+        ],
+        key=lambda x: x[1],
+        reverse=True,
+    )
+    last_saturday_positions = {
+        youth_id: idx + 1
+        for idx, (youth_id, _) in enumerate(last_saturday_ranking)
+    }
+
+    # Calculate weekly points and position changes
+    weekly_points = {}
+    for youth_id, points in points_this_week.items():
+        youth = youth_dict.get(youth_id)
+        if youth:
+            current_pos = current_positions.get(youth.id, 0)
+            last_saturday_pos = last_saturday_positions.get(youth.id, 0)
+
+            # Calculate delta: negative means moved up (good)
+            # If youth wasn't ranked last Saturday, consider them as
+            # having moved up
+            if last_saturday_pos == 0:
+                delta = (
+                    -(current_pos - len(last_saturday_positions) - 1)
+                    if current_pos > 0
+                    else 0
+                )
+            else:
+                delta = last_saturday_pos - current_pos
+
+            weekly_points[youth.id] = {
+                "name": youth.name,
+                "organization": youth.organization,
+                "points": points,
+                "delta": delta,
+            }
+
+    return weekly_points
+
+
+def get_first_sunday(compiled_entries, season_start=None):
+    """Sunday that opens week 1: the one before the season start, or before
+    the earliest entry when there is no season"""
+    if season_start is not None:
+        earliest_date = datetime.combine(season_start, time.min)
+    else:
+        # Find the earliest entry to establish week 1
+        timestamps = (
+            compiled_entries.timestamp
+            if isinstance(compiled_entries, EntryColumns)
+            else [entry.timestamp for entry in compiled_entries]
+        )
+        earliest_timestamp = min(
+            timestamps, default=datetime.now().timestamp()
+        )
+        earliest_date = datetime.fromtimestamp(earliest_timestamp)
+    return sunday_before(earliest_date)
+
+
+def sunday_before(earliest_date):
+    """Sunday of the first week of a competition starting on a date"""
+    days_since_sunday = earliest_date.weekday() + 1
+    first_sunday = earliest_date - timedelta(days=days_since_sunday)
+    return first_sunday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_week_number(timestamp, first_sunday):
+    """Week of the competition a timestamp belongs to, starting at 1"""
+    days_since_first = (datetime.fromtimestamp(timestamp) - first_sunday).days
+    return (days_since_first // 7) + 1
+
+
+# Calculate weekly "Livros de Mórmon" deliveries
+def calculate_weekly_book_deliveries(
+    compiled_entries, task_entries, season_start=None
+):
+    """Calculate weekly deliveries of 'Livros de Mórmon'
+    since competition start, which is the season start date when given"""
+
+    # Find the "Livros de Mórmon" task
+    book_task = None
+    for task in task_entries:
+        if "Livro de Mórmon" in task.tasks:
+            book_task = task
+            break
+
+    if not book_task:
+        return {}
+
+    # Group deliveries by week
+    weekly_deliveries = {}
+
+    first_sunday = get_first_sunday(compiled_entries, season_start)
+
+    if isinstance(compiled_entries, EntryColumns):
+        compiled_entries = compiled_entries.where_task([book_task.id])
+
+    for entry in compiled_entries:
+        if entry.task_id == book_task.id:
+            week_number = get_week_number(entry.timestamp, first_sunday)
+
+            if week_number not in weekly_deliveries:
+                weekly_deliveries[week_number] = 0
+            weekly_deliveries[week_number] += entry.quantity
+
+    return weekly_deliveries
+
+
+def calculate_weekly_book_deliveries_from_aggregates(
+    aggregates, task_entries, season_start=None
+):
+    """`calculate_weekly_book_deliveries` from the daily quantities of each
+    task"""
+    book_task = next(
+        (task for task in task_entries if "Livro de Mórmon" in task.tasks),
+        None,
+    )
+    if not book_task:
+        return {}
+
+    if season_start is not None:
+        first_sunday = get_first_sunday([], season_start)
+    else:
+        earliest_day = min(
+            (row.day for row in aggregates.task_daily_quantities),
+            default=datetime.now().toordinal(),
+        )
+        first_sunday = sunday_before(
+            datetime.combine(date.fromordinal(earliest_day), time.min)
+        )
+
+    weekly_deliveries = {}
+    for row in aggregates.task_daily_quantities:
+        if row.task_id == book_task.id:
+            week_number = (row.day - first_sunday.toordinal()) // 7 + 1
+            weekly_deliveries[week_number] = (
+                weekly_deliveries.get(week_number, 0) + row.quantity
+            )
+    return weekly_deliveries
+
+
+# Weekly points and activities of the whole competition
+def calculate_weekly_series(compiled_entries, task_entries, season_start=None):
+    """Points and tracked activities of every week of the competition"""
+    task_dict = {t.id: t for t in task_entries}
+    first_sunday = get_first_sunday(compiled_entries, season_start)
+
+    weekly_series = {}
+    for entry in compiled_entries:
+        task = task_dict.get(entry.task_id)
+        if not task:
+            continue
+        week_number = get_week_number(entry.timestamp, first_sunday)
+        week = weekly_series.setdefault(
+            week_number,
+            {
+                "start": first_sunday + timedelta(weeks=week_number - 1),
+                "points": 0,
+                "activities": dict.fromkeys(TARGET_TASKS.values(), 0),
+            },
+        )
+        week["points"] += task.points * entry.quantity + entry.bonus
+        if task.tasks in TARGET_TASKS:
+            week["activities"][TARGET_TASKS[task.tasks]] += entry.quantity
+
+    return dict(sorted(weekly_series.items()))
+
+
+# Calculate days until the end of the season
+def calculate_countdown(end_date=None):
+    """Calculate days remaining until the end date of the season, which
+    defaults to October 31, 2025"""
+    if end_date is None:
+        end_date = datetime(2025, 10, 31)
+    elif not isinstance(end_date, datetime):
+        end_date = datetime.combine(end_date, time.min)
+    current_date = datetime.now()
+    days_remaining = (end_date - current_date).days
+    return max(0, days_remaining)  # Don't show negative days
+
+
+def build_ranking_dataframe(sorted_youth):
+    """Ranking table of youths already ordered by total points"""
+    import pandas as pd
+
+    return pd.DataFrame(
+        [
+            {
+                "Ranking": idx + 1,
+                "Nome": y.name,
+                "Idade": y.age,
+                "Organização": y.organization,
+                "Pontuação Total": y.total_points,
+            }
+            for idx, y in enumerate(sorted_youth)
+        ]
+    )
+
+
+def build_book_deliveries_chart(weekly_books):
+    """Line chart of weekly book deliveries, or None without deliveries"""
+    if not weekly_books:
+        return None
+
+    weeks = sorted(weekly_books.keys())
+    deliveries = [weekly_books[week] for week in weeks]
+    week_labels = [f"Semana {week}" for week in weeks]
+
+    px, _ = _plotting()
+
+    fig = px.line(
+        x=week_labels,
+        y=deliveries,
+        title="Livros de Mórmon Entregues por Semana",
+        labels={"x": "Semana", "y": "Quantidade Entregue"},
+    )
+    fig.update_traces(mode="lines+markers")
+    return fig
+
+
+def calculate_task_points(compiled_entries, task_entries):
+    """Points earned per task, bonus included"""
+    task_dict = {t.id: t for t in task_entries}
+    task_points = {}
+    if isinstance(compiled_entries, EntryColumns):
+        points_by_task = compiled_entries.points_by(
+            "task_id", {t.id: t.points for t in task_entries}
+        )
+        for task_id, points in points_by_task.items():
+            name = task_dict[task_id].tasks
+            task_points[name] = task_points.get(name, 0) + points
+        return task_points
+
+    for entry in compiled_entries:
+        task = task_dict.get(entry.task_id)
+        if task:
+            points = task.points * entry.quantity + entry.bonus
+            task_points[task.tasks] = task_points.get(task.tasks, 0) + points
+    return task_points
+
+
+def calculate_task_points_from_aggregates(aggregates, task_entries):
+    """`calculate_task_points` from the task totals"""
+    names = {t.id: t.tasks for t in task_entries}
+    task_points = {}
+    for row in aggregates.task_totals:
+        if row.task_id in names:
+            name = names[row.task_id]
+            task_points[name] = task_points.get(name, 0) + row.points
+    return task_points
+
+
+def build_task_points_chart(task_points):
+    """Pie chart of points per task, or None without points"""
+    if not task_points:
+        return None
+
+    _, go = _plotting()
+
+    return go.Figure(
+        data=[
+            go.Pie(
+                labels=list(task_points.keys()),
+                values=list(task_points.values()),
+                title="Pontuação por Tarefa",
+            )
+        ]
+    )
+
+
+def calculate_organization_points(youth_entries):
+    """Total points of Rapazes and Moças"""
+    young_man_points = sum(
+        y.total_points for y in youth_entries if y.organization == "Rapazes"
+    )
+    young_woman_points = sum(
+        y.total_points for y in youth_entries if y.organization == "Moças"
+    )
+    return young_man_points, young_woman_points
+
+
+def build_organization_chart(young_man_points, young_woman_points):
+    """Bar chart of points per organization, or None without points"""
+    if young_man_points == 0 and young_woman_points == 0:
+        return None
+
+    _, go = _plotting()
+
+    bar_fig = go.Figure(
+        data=[
+            go.Bar(
+                x=["Rapazes", "Moças"],
+                y=[young_man_points, young_woman_points],
+                marker_color=[COLOR_YOUNG_MAN, COLOR_YOUNG_WOMAN],
+            )
+        ]
+    )
+    bar_fig.update_layout(
+        yaxis_title="Pontuação Total", xaxis_title="Organização"
+    )
+    return bar_fig
@@ -0,0 +1,211 @@
+"""HTTP server of the public, read-only outputs next to the Streamlit app.
+
+It serves the static kiosk pages under `/kiosk/` and the JSON API under
+`/api/`. Every response carries an ETag, so clients that poll it get a
+304 until the data of their ward changes. Health checks and uptime pings
+use `/healthz` and `/readyz`, which never render the Dashboard.
+"""
+
+import email.utils
+import json
+import logging
+import os
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import api
+import health
+import kiosk
+from database import is_known_tenant
+from tenancy import DEFAULT_TENANT, is_valid_tenant
+
+PUBLIC_PORT = int(os.getenv("PUBLIC_PORT", "8081"))
+
+
+class PublicRequestHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/healthz":
+            self._send_health(HTTPStatus.OK, health.liveness(), send_body)
+        elif url.path == "/readyz":
+            ready, _ = health.readiness()
+            # Only the outcome is public: database errors, pool counters and
+            # the rest of the state are shown on the admin Diagnóstico page
+            self._send_health(
+                HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE,
+                {"status": "ready" if ready else "not_ready"},
+                send_body,
+            )
+        elif url.path.startswith("/api/"):
+            self._serve_api(
+                url.path.removeprefix("/api/"), parse_qs(url.query), send_body
+            )
+        elif url.path.startswith("/kiosk/"):
+            self._serve_kiosk(url.path.removeprefix("/kiosk/"), send_body)
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def _serve_api(
+        self, endpoint: str, query: dict[str, list[str]], send_body: bool
+    ) -> None:
+        tenant = query.get("ala", [DEFAULT_TENANT])[0]
+        if endpoint not in api.ENDPOINTS:
+            self._send_json_error(HTTPStatus.NOT_FOUND, "Endpoint inexistente")
+            return
+        if not is_valid_tenant(tenant):
+            self._send_json_error(HTTPStatus.BAD_REQUEST, "Ala inválida")
+            return
+        try:
+            known = is_known_tenant(tenant)
+            if known:
+                body, etag = api.get_response(endpoint, tenant)
+        except Exception as e:
+            logging.error(f"API '{endpoint}' of '{tenant}' failed: {str(e)}")
+            self._send_json_error(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                "Problema temporário com o banco de dados",
+            )
+            return
+        if not known:
+            self._send_json_error(HTTPStatus.NOT_FOUND, "Ala inexistente")
+            return
+
+        self._send(
+            body,
+            etag,
+            {
+                "Content-Type": "application/json; charset=utf-8",
+                "Cache-Control": "no-cache",
+                # Ward websites call the API from the browser
+                "Access-Control-Allow-Origin": "*",
+            },
+            send_body,
+        )
+
+    def _serve_kiosk(self, name: str, send_body: bool) -> None:
+        path = self._resolve_kiosk(name)
+        if path is None or not path.exists():
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        stat = path.stat()
+        if path.suffix == ".js":
+            headers = {
+                "Content-Type": "text/javascript",
+                # The bundle name carries its version, so it never changes
+                "Cache-Control": "public, max-age=31536000",
+            }
+        else:
+            headers = {
+                "Content-Type": "text/html; charset=utf-8",
+                "Cache-Control": "no-cache",
+            }
+        headers["Last-Modified"] = email.utils.formatdate(
+            stat.st_mtime, usegmt=True
+        )
+        self._send(
+            path.read_bytes() if send_body else b"",
+            f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            headers,
+            send_body,
+            content_length=stat.st_size,
+            mtime=int(stat.st_mtime),
+        )
+
+    def _resolve_kiosk(self, name: str) -> Path | None:
+        if name == kiosk.PLOTLY_JS:
+            return kiosk.KIOSK_DIR / kiosk.PLOTLY_JS
+        tenant = name.removesuffix(".html")
+        if not name.endswith(".html") or not is_valid_tenant(tenant):
+            return None
+        try:
+            # Pages of made-up wards would fill the disk
+            if not is_known_tenant(tenant):
+                return None
+            return kiosk.publish_kiosk(tenant)
+        except Exception as e:
+            logging.error(f"Kiosk page of '{tenant}' failed: {str(e)}")
+            # Keep serving the last page that was published
+            return kiosk.kiosk_path(tenant)
+
+    def _send(
+        self,
+        body: bytes,
+        etag: str,
+        headers: dict[str, str],
+        send_body: bool,
+        content_length: int | None = None,
+        mtime: int | None = None,
+    ) -> None:
+        if self._not_modified(etag, mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header(
+            "Content-Length",
+            str(len(body) if content_length is None else content_length),
+        )
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_health(
+        self, status: HTTPStatus, state: dict, send_body: bool
+    ) -> None:
+        body = json.dumps(state, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_json_error(self, status: HTTPStatus, message: str) -> None:
+        body = json.dumps({"error": message}, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _not_modified(self, etag: str, mtime: int | None) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None or mtime is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return mtime <= since.timestamp()
+
+    def log_message(self, format, *args):
+        logging.debug(f"public server: {format % args}")
+
+
+def start_public_server(port: int = PUBLIC_PORT) -> ThreadingHTTPServer:
+    """Starts the public server on a daemon thread"""
+    server = ThreadingHTTPServer(("0.0.0.0", port), PublicRequestHandler)
+    threading.Thread(
+        target=server.serve_forever, name="public-server", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,179 @@
+"""Process-wide snapshot of the game data shared by every session.
+
+The youths and tasks of each ward and season are copied once into
+immutable rows with slots and the compiled entries into `EntryColumns`,
+so every session, the kiosk pages and the API read the same compact copy
+instead of holding ORM objects of their own: memory grows with the data,
+not with the number of sessions.
+
+Pages that only need the youths and tasks, like the Dashboard, which
+reads its sums from the aggregates, ask for a snapshot without entries,
+shared by every season of the ward.
+
+Reads never query while the snapshot matches the data version of its
+ward. A write made by this process bumps the version, so the next read
+loads the data again and the writer sees its own change. A background
+thread refreshes the snapshots as soon as a write is made and, every
+`SNAPSHOT_REFRESH_SECONDS`, also picks up writes made by other machines.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from columnar import EntryColumns
+from tenancy import (
+    get_current_tenant,
+    get_data_version,
+    tenant_scope,
+    wait_for_data_change,
+)
+
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+# Snapshots nobody read for this long are dropped instead of refreshed
+SNAPSHOT_IDLE_SECONDS = float(os.getenv("SNAPSHOT_IDLE_SECONDS", "600"))
+# Writes made within this delay of each other cause a single refresh
+SNAPSHOT_DEBOUNCE_SECONDS = 0.5
+
+
+@dataclass(frozen=True, slots=True)
+class YouthRow:
+    id: int
+    name: str
+    age: int
+    organization: str
+    total_points: int
+
+
+@dataclass(frozen=True, slots=True)
+class TaskRow:
+    id: int
+    tasks: str
+    points: int
+    repeatable: bool
+
+
+GameRows = tuple[tuple[YouthRow, ...], tuple[TaskRow, ...], EntryColumns]
+SnapshotKey = tuple[str, int | None, bool]
+
+
+def freeze_game_data(
+    youth_entries: Sequence, task_entries: Sequence, compiled_entries: Sequence
+) -> GameRows:
+    """Copies the youths and tasks into immutable rows and the compiled
+    entries into columns"""
+    return (
+        tuple(
+            YouthRow(y.id, y.name, y.age, y.organization, y.total_points)
+            for y in youth_entries
+        ),
+        tuple(
+            TaskRow(t.id, t.tasks, t.points, t.repeatable)
+            for t in task_entries
+        ),
+        EntryColumns.from_entries(compiled_entries),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class GameSnapshot:
+    # Data version of the ward the rows were loaded at
+    version: int
+    loaded_at: float
+    game_data: GameRows
+
+
+class SnapshotStore:
+    """Snapshots of every ward and season read in this process"""
+
+    def __init__(
+        self,
+        load: Callable[[int | None, bool], GameRows],
+        refresh_seconds: float = SNAPSHOT_REFRESH_SECONDS,
+        idle_seconds: float = SNAPSHOT_IDLE_SECONDS,
+    ):
+        self.load = load
+        self.refresh_seconds = refresh_seconds
+        self.idle_seconds = idle_seconds
+        # By tenant, season and whether the entries were loaded
+        self._snapshots: dict[SnapshotKey, GameSnapshot] = {}
+        self._last_read: dict[SnapshotKey, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(
+        self, season_id: int | None = None, with_entries: bool = True
+    ) -> GameSnapshot:
+        """Returns the snapshot of the current tenant and a season, loading
+        it if the tenant's data changed since. Without entries, its
+        `EntryColumns` are empty and the season does not matter. Database
+        errors propagate."""
+        key = (
+            get_current_tenant(),
+            season_id if with_entries else None,
+            with_entries,
+        )
+        self._last_read[key] = time.monotonic()
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == get_data_version(
+            key[0]
+        ):
+            return snapshot
+        return self._load(key)
+
+    def _load(self, key: SnapshotKey) -> GameSnapshot:
+        tenant, season_id, with_entries = key
+        with tenant_scope(tenant):
+            # Read before loading, so a write made in between is never
+            # stored under the new version
+            version = get_data_version()
+            snapshot = GameSnapshot(
+                version, time.monotonic(), self.load(season_id, with_entries)
+            )
+        with self._lock:
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def refresh(self) -> None:
+        """Loads again the snapshots whose ward changed or that are older
+        than the refresh interval, and drops the idle ones"""
+        now = time.monotonic()
+        for key, snapshot in list(self._snapshots.items()):
+            if now - self._last_read.get(key, now) > self.idle_seconds:
+                with self._lock:
+                    self._snapshots.pop(key, None)
+                    self._last_read.pop(key, None)
+                continue
+            changed = snapshot.version != get_data_version(key[0])
+            if changed or now - snapshot.loaded_at >= self.refresh_seconds:
+                try:
+                    self._load(key)
+                except Exception as e:
+                    # Readers keep the last snapshot until the next try
+                    logging.error(f"Snapshot refresh of {key} failed: {e}")
+
+    def start_refresher(self) -> threading.Thread:
+        """Refreshes the snapshots on a daemon thread after every write and
+        at least once per refresh interval"""
+
+        def _refresh_forever():
+            while True:
+                if wait_for_data_change(self.refresh_seconds):
+                    time.sleep(SNAPSHOT_DEBOUNCE_SECONDS)
+                self.refresh()
+
+        thread = threading.Thread(
+            target=_refresh_forever, name="snapshot-refresher", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._last_read.clear()
@@ -0,0 +1,122 @@
+"""Tenants (wards) sharing one deployment.
+
+The current tenant lives in a context variable, so every repository call
+made by a script run, and by the section threads started from it, is
+scoped to the ward of that run without passing it around. Each tenant also
+has a data version that is bumped on every write, which keys the caches of
+that tenant only: a busy stake never invalidates the cache of a small ward.
+Background refreshers can wait for any bump with `wait_for_data_change`,
+and `on_data_change` listeners publish the writes to the other processes.
+"""
+
+import os
+import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+
+# Tenants show up in URLs and file names, so only slugs are accepted
+TENANT_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,63}$")
+
+_current_tenant: ContextVar[str] = ContextVar(
+    "current_tenant", default=DEFAULT_TENANT
+)
+
+_data_versions: dict[str, int] = {}
+# Writes per tenant and table, None counting the writes to any table
+_table_versions: dict[tuple[str, str | None], int] = {}
+# When each tenant's data last changed, on the monotonic clock
+_data_changed_at: dict[str, float] = {}
+_data_versions_lock = threading.Lock()
+_data_changed = threading.Condition()
+_change_listeners: list[Callable[[str, str | None], None]] = []
+
+
+def is_valid_tenant(tenant: str) -> bool:
+    return bool(TENANT_PATTERN.match(tenant))
+
+
+def get_current_tenant() -> str:
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant: str) -> None:
+    """Scopes the rest of the current context to a tenant"""
+    if not is_valid_tenant(tenant):
+        raise ValueError(f"Ala inválida: {tenant!r}")
+    _current_tenant.set(tenant)
+
+
+@contextmanager
+def tenant_scope(tenant: str) -> Iterator[None]:
+    """Scopes a block to a tenant, restoring the previous one afterwards"""
+    if not is_valid_tenant(tenant):
+        raise ValueError(f"Ala inválida: {tenant!r}")
+    token = _current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def get_data_version(tenant: str | None = None) -> int:
+    """Returns how many writes this process made to a tenant's data"""
+    return _data_versions.get(tenant or get_current_tenant(), 0)
+
+
+def get_table_version(table: str, tenant: str | None = None) -> int:
+    """Returns how many writes this process made or was notified of to
+    one table of a tenant, for caches built from that table alone"""
+    tenant = tenant or get_current_tenant()
+    return _table_versions.get((tenant, table), 0) + _table_versions.get(
+        (tenant, None), 0
+    )
+
+
+def seconds_since_data_change(tenant: str | None = None) -> float:
+    """Returns how long ago a tenant's data last changed, by a write of
+    this process or one it was notified of, infinity if it never did"""
+    changed_at = _data_changed_at.get(tenant or get_current_tenant())
+    return (
+        float("inf") if changed_at is None else time.monotonic() - changed_at
+    )
+
+
+def on_data_change(listener: Callable[[str, str | None], None]) -> None:
+    """Calls the listener with the tenant and the table of every write
+    made by this process"""
+    _change_listeners.append(listener)
+
+
+def bump_data_version(
+    tenant: str | None = None,
+    table: str | None = None,
+    publish: bool = True,
+) -> int:
+    """Invalidates the caches of a tenant after a write. Writes made by
+    another process are bumped without being published again."""
+    tenant = tenant or get_current_tenant()
+    with _data_versions_lock:
+        _data_versions[tenant] = _data_versions.get(tenant, 0) + 1
+        _table_versions[tenant, table] = (
+            _table_versions.get((tenant, table), 0) + 1
+        )
+        _data_changed_at[tenant] = time.monotonic()
+        version = _data_versions[tenant]
+    with _data_changed:
+        _data_changed.notify_all()
+    if publish:
+        for listener in list(_change_listeners):
+            listener(tenant, table)
+    return version
+
+
+def wait_for_data_change(timeout: float) -> bool:
+    """Blocks until the data of any tenant changes, returning False if the
+    timeout expired first"""
+    with _data_changed:
+        return _data_changed.wait(timeout)
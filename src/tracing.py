@@ -0,0 +1,252 @@
+"""Tracing of a page run, from its sections to the SQL they run.
+
+With `TRACING_EXPORTER` set, every page run is a trace: the run is the
+root span, and each Dashboard section, section computation, repository
+call (named after the operation given to `handle_database_operation`) and
+SQL statement is a span below the one it ran in. Spans follow the run to
+the section threads and to the async database loop, so a slow render
+shows what it waited on, e.g. the ranking section waiting 800 ms on the
+query of the compiled entries.
+
+Spans are modeled after OpenTelemetry's, without depending on it. Traces
+are written once their run finishes: `console` prints each one as an
+indented tree on stderr, `file` appends its spans as JSON lines to
+`TRACING_FILE`. Runs shorter than `TRACING_MIN_DURATION_MS` are dropped.
+"""
+
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import Engine, event
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE = Path(os.getenv("TRACING_FILE", "traces.jsonl"))
+TRACING_MIN_DURATION_MS = float(os.getenv("TRACING_MIN_DURATION_MS", "0"))
+# Longer statements are cut in the span attributes
+TRACING_STATEMENT_LENGTH = 500
+
+EXPORTERS = ("console", "file")
+
+PAGE_RUN = "Página"
+SQL = "SQL"
+
+
+@dataclass(slots=True)
+class Trace:
+    trace_id: str = field(default_factory=lambda: secrets.token_hex(16))
+    spans: list["Span"] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    kind: str
+    trace: Trace
+    parent_id: str | None = None
+    attributes: dict = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    thread: str = field(
+        default_factory=lambda: threading.current_thread().name
+    )
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def end(self, error: BaseException | None = None) -> None:
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.end_ns = time.time_ns()
+        with self.trace.lock:
+            self.trace.spans.append(self)
+
+    def to_dict(self) -> dict:
+        """The span in the shape of OpenTelemetry's JSON export"""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": {"thread.name": self.thread, **self.attributes},
+            "status": (
+                {"code": "ERROR", "message": self.error}
+                if self.error
+                else {"code": "OK"}
+            ),
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar(
+    "current_span", default=None
+)
+_export_lock = threading.Lock()
+_install_lock = threading.Lock()
+_sql_tracing_installed = False
+
+
+def tracing_enabled() -> bool:
+    return TRACING_EXPORTER in EXPORTERS
+
+
+def start_span(
+    kind: str, name: str, attributes: dict | None = None
+) -> Span | None:
+    """Starts a span below the current one, without making it current.
+    Returns None outside a traced run."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, kind, parent.trace, parent.span_id, attributes or {})
+
+
+@contextmanager
+def traced(kind: str, name: str, **attributes):
+    """Runs the block in a span below the current one, if the run is
+    traced"""
+    span = start_span(kind, name, attributes)
+    if span is None:
+        yield None
+        return
+
+    token = _current_span.set(span)
+    error = None
+    try:
+        yield span
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end(error)
+
+
+def start_trace(name: str, **attributes) -> Span | None:
+    """Starts the trace of a page run, when tracing is enabled. The rest
+    of the run, and what it submits to other threads, happens in it until
+    `finish_trace`."""
+    if not tracing_enabled():
+        _current_span.set(None)
+        return None
+    install_sql_tracing()
+    root = Span(name, PAGE_RUN, Trace(), attributes=attributes)
+    _current_span.set(root)
+    return root
+
+
+def finish_trace() -> Trace | None:
+    """Ends the trace of the run and exports it"""
+    root = _current_span.get()
+    if root is None:
+        return None
+    _current_span.set(None)
+    root.end()
+    if root.duration_ms >= TRACING_MIN_DURATION_MS:
+        export_trace(root.trace)
+    return root.trace
+
+
+def format_trace(trace: Trace) -> str:
+    """The spans of a trace as an indented tree, with when each started
+    after the root and how long it took"""
+    with trace.lock:
+        spans = sorted(trace.spans, key=lambda span: span.start_ns)
+    children: dict[str | None, list[Span]] = {}
+    for span in spans:
+        children.setdefault(span.parent_id, []).append(span)
+    roots = [
+        span
+        for span in spans
+        if span.parent_id is None
+        or span.parent_id not in {s.span_id for s in spans}
+    ]
+    start_ns = roots[0].start_ns if roots else 0
+
+    lines = [f"trace {trace.trace_id}"]
+
+    def add(span: Span, depth: int) -> None:
+        label = f"{span.kind} {span.name}"
+        if span.kind == SQL:
+            label = f"{SQL} {span.attributes.get('db.statement', '')[:80]}"
+        lines.append(
+            f"{(span.start_ns - start_ns) / 1e6:>9.1f} ms "
+            f"{span.duration_ms:>9.1f} ms  "
+            f"{'  ' * depth}{label} [{span.thread}]"
+            + (f" ERROR {span.error}" if span.error else "")
+        )
+        for child in children.get(span.span_id, []):
+            add(child, depth + 1)
+
+    for root in roots:
+        add(root, 0)
+    return "\n".join(lines)
+
+
+def export_trace(trace: Trace) -> None:
+    with _export_lock:
+        if TRACING_EXPORTER == "console":
+            sys.stderr.write(format_trace(trace) + "\n")
+            sys.stderr.flush()
+        elif TRACING_EXPORTER == "file":
+            with trace.lock:
+                spans = list(trace.spans)
+            with open(TRACING_FILE, "a", encoding="utf-8") as file:
+                for span in spans:
+                    file.write(json.dumps(span.to_dict()) + "\n")
+
+
+def _before_cursor_execute(
+    connection, cursor, statement, parameters, context, executemany
+):
+    span = start_span(
+        SQL,
+        statement.split(None, 1)[0].upper() if statement else SQL,
+        {
+            "db.system": connection.dialect.name,
+            "db.statement": statement[:TRACING_STATEMENT_LENGTH],
+        },
+    )
+    if span is not None and context is not None:
+        context._tracing_span = span
+
+
+def _after_cursor_execute(
+    connection, cursor, statement, parameters, context, executemany
+):
+    span = getattr(context, "_tracing_span", None)
+    if span is not None:
+        span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_tracing_span", None)
+    if span is not None:
+        span.end(exception_context.original_exception)
+
+
+def install_sql_tracing() -> None:
+    """Traces the statements of every engine, including the sync side of
+    the async ones"""
+    global _sql_tracing_installed
+    with _install_lock:
+        if _sql_tracing_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _sql_tracing_installed = True
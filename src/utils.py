@@ -1,17 +1,41 @@
+import json
 import logging
 import os
 import secrets
+import uuid
 from collections.abc import Callable
 from typing import TypeVar
 
 import streamlit as st
 
+from profiling import REPOSITORY, timed
+from tenancy import (
+    DEFAULT_TENANT,
+    get_current_tenant,
+    is_valid_tenant,
+    set_current_tenant,
+)
+
 T = TypeVar("T")
 
 
+def ward_password(tenant: str) -> str | None:
+    """The password of a ward.
+
+    Each ward can have its own in `AUTH_<WARD>`, with the ward uppercased
+    and its dashes turned into underscores (`AUTH_ALA_CENTRO`). Wards
+    without one share `AUTH`.
+    """
+    if tenant != DEFAULT_TENANT:
+        variable = f"AUTH_{tenant.upper().replace('-', '_')}"
+        if variable in os.environ:
+            return os.environ[variable]
+    return os.environ.get("AUTH")
+
+
 def check_password():
     """Returns `True` if the user entered the correct password."""
-    auth_password = os.environ.get("AUTH")
+    auth_password = ward_password(get_current_tenant())
 
     if auth_password is None:
         st.error(
@@ -56,6 +80,51 @@ def check_password():
         return True
 
 
+def select_tenant() -> str:
+    """Scopes the script run to the ward of the session.
+
+    The ward comes from the `ala` query parameter and is kept in the
+    session state, so it survives navigation between pages, which drops
+    the query string. Anyone can change the parameter, so switching wards
+    asks for the password again, that of the new ward.
+    """
+    requested = st.query_params.get("ala")
+    if requested is not None and is_valid_tenant(requested):
+        previous = st.session_state.get("tenant", DEFAULT_TENANT)
+        if requested != previous:
+            st.session_state.pop("password_correct", None)
+        st.session_state["tenant"] = requested
+    tenant = st.session_state.get("tenant", DEFAULT_TENANT)
+    set_current_tenant(tenant)
+    if tenant != DEFAULT_TENANT:
+        st.sidebar.caption(f"Ala: {tenant}")
+    return tenant
+
+
+def plotly_chart_from_spec(spec: str) -> None:
+    """Renders a Plotly figure serialized with `plotly.io.to_json`, such
+    as the ones cached by `cache.cached_figure_spec`. Each call parses its
+    own copy, so no session changes what the others render."""
+    st.plotly_chart(json.loads(spec), use_container_width=True)
+
+
+def get_idempotency_key(form_key: str) -> str:
+    """Returns the idempotency key of the pending submission of a form.
+
+    The key survives reruns, so a double-click or a retry of the same
+    submission reuses it until `reset_idempotency_key` is called.
+    """
+    state_key = f"{form_key}_idempotency_key"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = uuid.uuid4().hex
+    return st.session_state[state_key]
+
+
+def reset_idempotency_key(form_key: str) -> None:
+    """Discards the idempotency key so the next submission gets a new one."""
+    st.session_state.pop(f"{form_key}_idempotency_key", None)
+
+
 def handle_database_operation[T](
     operation: Callable[[], T],
     operation_name: str = "operação do banco de dados",
@@ -71,7 +140,8 @@ def handle_database_operation[T](
         The result of the operation, or None if an error occurred
     """
     try:
-        return operation()
+        with timed(REPOSITORY, operation_name):
+            return operation()
     except Exception as e:
         # Log the actual error for debugging
         logging.error(
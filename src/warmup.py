@@ -0,0 +1,161 @@
+"""Warm-up of a freshly started process.
+
+Machines are stopped when idle and started again by the next request, so
+without a warm-up the first visitor pays for the first pool connections,
+the imports of pandas and plotly, the queries and every chart at once.
+`start_warmup` does all of that on a background thread as soon as the
+process starts, for every ward with data, and records its progress so the
+health checks can report the process as ready only once it is done. It
+first brings the Dashboard aggregates up to date and starts their
+refresher, which no request ever waits for.
+"""
+
+import contextlib
+import importlib
+import logging
+import os
+import threading
+import time
+from enum import StrEnum
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+import api
+import database
+import sections
+from aggregates import load_dashboard_aggregates, start_aggregate_refresher
+from async_database import get_async_engine, get_game_data, run_async
+from cache import cached_figure_spec
+from database import SeasonRepository, YouthFormData
+from tenancy import DEFAULT_TENANT, get_data_version, tenant_scope
+
+# Connections opened at once in each pool, so the first concurrent queries
+# do not have to connect
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "3"))
+
+# Libraries only imported by the sections that render them
+WARMUP_MODULES = ("pandas", "plotly.express", "plotly.graph_objects")
+
+
+class WarmupState(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    READY = "ready"
+    # The process still serves requests, they are only cold
+    FAILED = "failed"
+
+
+_status = {"state": WarmupState.PENDING, "seconds": None, "error": None}
+_status_lock = threading.Lock()
+
+
+def warmup_status() -> dict:
+    with _status_lock:
+        return dict(_status)
+
+
+def _set_status(**changes) -> None:
+    with _status_lock:
+        _status.update(changes)
+
+
+def open_connections(count: int = WARMUP_CONNECTIONS) -> None:
+    """Opens `count` connections in the sync and the async pools at once,
+    returning them to the pools afterwards"""
+    with contextlib.ExitStack() as stack:
+        for _ in range(count):
+            connection = stack.enter_context(database.engine.connect())
+            connection.execute(text("SELECT 1"))
+
+    async def _open_async_connections():
+        async with contextlib.AsyncExitStack() as stack:
+            for _ in range(count):
+                connection = await stack.enter_async_context(
+                    get_async_engine().connect()
+                )
+                await connection.execute(text("SELECT 1"))
+
+    run_async(_open_async_connections())
+
+
+def known_tenants() -> list[str]:
+    """Returns the default ward and every ward with registered youths"""
+    with Session(database.engine) as session:
+        tenants = session.exec(select(YouthFormData.tenant_id).distinct())
+        return sorted({DEFAULT_TENANT, *tenants})
+
+
+def warm_tenant(tenant: str) -> None:
+    """Loads the youths, tasks and aggregates of a ward and builds its
+    charts and API responses into the caches the Dashboard and the API
+    read from"""
+    with tenant_scope(tenant):
+        season = SeasonRepository.get_active()
+        season_id = season.id if season else None
+        season_start = season.start_date if season else None
+        data_version = get_data_version()
+        youths, tasks, _ = get_game_data(season_id, with_entries=False)
+        aggregates = load_dashboard_aggregates(season_id, data_version)
+
+        # Same keys and builds as the charts of the Dashboard
+        cached_figure_spec(
+            "book_deliveries",
+            season_id,
+            data_version,
+            lambda: sections.build_book_deliveries_chart(
+                sections.calculate_weekly_book_deliveries_from_aggregates(
+                    aggregates, tasks, season_start
+                )
+            ),
+        )
+        cached_figure_spec(
+            "task_points",
+            season_id,
+            data_version,
+            lambda: sections.build_task_points_chart(
+                sections.calculate_task_points_from_aggregates(
+                    aggregates, tasks
+                )
+            ),
+        )
+        cached_figure_spec(
+            "organization",
+            season_id,
+            data_version,
+            lambda: sections.build_organization_chart(
+                *sections.calculate_organization_points(youths)
+            ),
+        )
+
+    for endpoint in api.ENDPOINTS:
+        api.get_response(endpoint, tenant)
+
+
+def warm_up() -> None:
+    """Warms the process up, recording its progress in `warmup_status`"""
+    _set_status(state=WarmupState.RUNNING, seconds=None, error=None)
+    started = time.perf_counter()
+    try:
+        open_connections()
+        start_aggregate_refresher()
+        for module in WARMUP_MODULES:
+            importlib.import_module(module)
+        for tenant in known_tenants():
+            warm_tenant(tenant)
+    except Exception as e:
+        logging.error(f"Warm-up failed: {str(e)}")
+        _set_status(
+            state=WarmupState.FAILED,
+            seconds=time.perf_counter() - started,
+            error=str(e),
+        )
+        return
+    _set_status(state=WarmupState.READY, seconds=time.perf_counter() - started)
+
+
+def start_warmup() -> threading.Thread:
+    """Runs `warm_up` on a daemon thread"""
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
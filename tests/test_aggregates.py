@@ -0,0 +1,271 @@
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlmodel import SQLModel
+from streamlit.testing.v1 import AppTest
+
+import aggregates
+import cache
+import sections
+from aggregates import (
+    AggregateRefresher,
+    DashboardAggregateRepository,
+    create_aggregates,
+    load_dashboard_aggregates,
+    materialized_view_statements,
+    refresh_aggregates,
+    start_aggregate_refresher,
+)
+from database import (
+    CompiledFormDataRepository,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+    create_database_engine,
+)
+from tenancy import get_data_version, tenant_scope
+
+TENANT = "ala-agregada"
+BOOK_TASK = "Entregar Livro de Mórmon + foto + relato no grupo"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file, so the page running on another thread sees the same data
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'aggr.db'}")
+    SQLModel.metadata.create_all(engine)
+    create_aggregates(engine)
+    with patch("database.engine", engine), tenant_scope(TENANT):
+        yield engine
+    refresher = aggregates._refreshers.pop(engine, None)
+    if refresher is not None:
+        refresher.stop()
+
+
+def days_ago(days, hour=12):
+    moment = datetime.now() - timedelta(days=days)
+    return moment.replace(hour=hour, minute=0).timestamp()
+
+
+@pytest.fixture
+def game(engine):
+    """Entries spread over the last weeks, one of them of a deleted
+    task"""
+    ana = YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+    bruno = YouthFormDataRepository.store("Bruno", 16, "Rapazes", 0)
+    book = TasksFormDataRepository.store(BOOK_TASK, 10, True)
+    visit = TasksFormDataRepository.store("Visitar com as Sisteres", 5, True)
+    for youth, task, days, quantity, bonus in (
+        (ana, book, 0, 2, 0),
+        (ana, visit, 3, 1, 5),
+        (bruno, book, 9, 1, 0),
+        (bruno, visit, 16, 3, 0),
+        (ana, book, 16, 1, 2),
+    ):
+        CompiledFormDataRepository.store(
+            youth.id, task.id, days_ago(days, hour=23), quantity, bonus
+        )
+    CompiledFormDataRepository.store(ana.id, 999, days_ago(1), 4, 0)
+    return (
+        YouthFormDataRepository.get_all(),
+        TasksFormDataRepository.get_all(),
+        CompiledFormDataRepository.get_all(),
+    )
+
+
+class TestAggregates:
+    """Test the aggregates give the results of the entries themselves"""
+
+    def test_sections_match_the_entries(self, game):
+        """Test every Dashboard section computes the same from the
+        aggregates as from the entries"""
+        youths, tasks, entries = game
+        refresh_aggregates(aggregates.database.engine)
+        rows = DashboardAggregateRepository.get()
+
+        assert sections.calculate_task_totals_from_aggregates(
+            rows, tasks
+        ) == sections.calculate_task_totals(entries, tasks)
+        assert sections.calculate_weekly_youth_points_from_aggregates(
+            rows, youths
+        ) == sections.calculate_weekly_youth_points(entries, tasks, youths)
+        assert sections.calculate_task_points_from_aggregates(
+            rows, tasks
+        ) == sections.calculate_task_points(entries, tasks)
+        for season_start in (None, date.today() - timedelta(days=30)):
+            assert sections.calculate_weekly_book_deliveries_from_aggregates(
+                rows, tasks, season_start
+            ) == sections.calculate_weekly_book_deliveries(
+                entries, tasks, season_start
+            )
+
+    def test_rows_are_scoped_to_the_ward_and_season(self, game):
+        """Test a ward only reads its own rows, and a season only its
+        entries"""
+        refresh_aggregates(aggregates.database.engine)
+
+        assert DashboardAggregateRepository.get(season_id=1).task_totals == ()
+        with tenant_scope("ala-vizinha"):
+            assert DashboardAggregateRepository.get().task_totals == ()
+        assert {
+            row.season_id
+            for row in DashboardAggregateRepository.get().youth_daily_points
+        } == {0}
+
+    def test_refresh_only_rebuilds_the_given_wards(self, engine):
+        """Test the summary tables of the other wards are left alone"""
+        task = TasksFormDataRepository.store("Visitar", 5, True)
+        youth = YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        CompiledFormDataRepository.store(youth.id, task.id, time.time(), 1, 0)
+        with tenant_scope("ala-vizinha"):
+            other = YouthFormDataRepository.store("Bia", 15, "Moças", 0)
+            CompiledFormDataRepository.store(
+                other.id, task.id, time.time(), 1, 0
+            )
+
+        refresh_aggregates(engine, [TENANT])
+
+        with engine.connect() as connection:
+            tenants = connection.execute(
+                select(aggregates.task_totals.c.tenant_id)
+            ).scalars()
+            assert list(tenants) == [TENANT]
+
+    def test_materialized_views_on_postgres(self):
+        """Test Postgres gets materialized views with literal definitions
+        and unique indexes, refreshed concurrently"""
+        postgres = create_engine("postgresql://localhost/gincana")
+        statements = materialized_view_statements(postgres)
+
+        assert len(statements) == 6
+        assert statements[0].startswith(
+            "CREATE MATERIALIZED VIEW IF NOT EXISTS agg_task_totals AS SELECT"
+        )
+        assert statements[3] == (
+            "CREATE UNIQUE INDEX IF NOT EXISTS agg_youth_daily_points_key "
+            "ON agg_youth_daily_points (tenant_id, season_id, youth_id, day)"
+        )
+        assert not any("%(" in statement for statement in statements)
+
+        engine = MagicMock()
+        engine.dialect.name = "postgresql"
+        refresh_aggregates(engine, [TENANT])
+        connection = (
+            engine.connect().execution_options().__enter__.return_value
+        )
+        assert [
+            call.args[0] for call in connection.exec_driver_sql.call_args_list
+        ] == [
+            f"REFRESH MATERIALIZED VIEW CONCURRENTLY {table.name}"
+            for table in aggregates.AGGREGATE_TABLES
+        ]
+
+
+class TestAggregateRefresher:
+    """Test the aggregates follow the writes"""
+
+    def test_burst_of_writes_is_refreshed_once(self, engine):
+        """Test writes close together cause a single refresh, after which
+        the ward's caches are invalidated"""
+        task = TasksFormDataRepository.store("Visitar", 5, True)
+        youth = YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        refresher = AggregateRefresher(engine, debounce_seconds=0.2)
+        with patch("tenancy._change_listeners", [refresher.mark_dirty]):
+            refresher.start()
+            try:
+                for _ in range(3):
+                    CompiledFormDataRepository.store(
+                        youth.id, task.id, time.time(), 1, 0
+                    )
+                version = get_data_version()
+                deadline = time.monotonic() + 2
+                while refresher.refreshes == 0 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.3)
+            finally:
+                refresher.stop()
+
+        assert refresher.refreshes == 1
+        assert get_data_version() == version + 1
+        (total,) = DashboardAggregateRepository.get().task_totals
+        assert (total.quantity, total.points) == (3, 15)
+
+    def test_failed_refresh_keeps_the_wards(self, engine):
+        """Test the wards of a failed refresh are refreshed next time"""
+        refresher = AggregateRefresher(engine)
+        refresher.mark_dirty(TENANT)
+        refresher.mark_dirty(TENANT, aggregates.AGGREGATES_TABLE)
+
+        with patch(
+            "aggregates.refresh_aggregates", side_effect=RuntimeError("lock")
+        ):
+            with pytest.raises(RuntimeError):
+                refresher.refresh()
+        assert refresher.refresh() == {TENANT}
+        assert refresher.refresh() == set()
+
+    def test_start_catches_up(self, game):
+        """Test starting the refresher refreshes the aggregates, which are
+        then cached until the data version changes"""
+        assert load_dashboard_aggregates(None, -1).task_totals == ()
+
+        start_aggregate_refresher()
+        first = load_dashboard_aggregates(None, get_data_version())
+
+        assert len(first.task_totals) == 2
+        assert load_dashboard_aggregates(None, get_data_version()) is first
+        assert aggregates.aggregates_state()["kind"] == "summary_tables"
+
+    def test_loads_never_refresh(self, game):
+        """Test the Dashboard only reads the aggregates"""
+        with patch("aggregates.refresh_aggregates") as mock_refresh:
+            load_dashboard_aggregates(None, get_data_version())
+
+        mock_refresh.assert_not_called()
+        assert aggregates.aggregates_state() is None
+
+
+class TestDashboardPage:
+    """Test the Dashboard shows the aggregates"""
+
+    def test_totals_come_from_the_aggregates(self, game):
+        """Test the activity cards show the totals of the aggregates"""
+        refresh_aggregates(aggregates.database.engine)
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("Dashboard.py")
+        at.query_params["ala"] = TENANT
+        at.run(timeout=10)
+
+        assert not at.exception
+        books = next(
+            metric
+            for metric in at.metric
+            if "Livros de Mórmon" in metric.label
+        )
+        assert books.value == "4"
+
+    def test_charts_are_rendered_from_their_cached_specs(self, game):
+        """Test every chart of the page comes from a cached JSON spec"""
+        refresh_aggregates(aggregates.database.engine)
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("Dashboard.py")
+        at.query_params["ala"] = TENANT
+        at.run(timeout=10)
+
+        charts = at.get("plotly_chart")
+        cached_data = [
+            json.loads(spec)["data"]
+            for spec in cache.figure_cache._entries.values()
+        ]
+        assert charts
+        assert not at.exception
+        for chart in charts:
+            assert json.loads(chart.proto.spec)["data"] in cached_data
@@ -0,0 +1,85 @@
+import datetime as dt
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import api
+from tenancy import bump_data_version
+
+
+class TestPayloads:
+    """Test the JSON documents of each endpoint"""
+
+    def test_rankings_skip_youths_without_points(self):
+        """Test rankings are ordered and numbered like the dashboard"""
+        youths = [
+            MagicMock(id=1, age=15, organization="Moças", total_points=5),
+            MagicMock(id=2, age=16, organization="Rapazes", total_points=0),
+            MagicMock(id=3, age=14, organization="Rapazes", total_points=9),
+        ]
+        for youth, name in zip(youths, ["Ana", "Davi", "Rui"], strict=True):
+            youth.name = name
+
+        payload = api.rankings_payload(youths, [], [], None)
+
+        assert [(r["position"], r["name"]) for r in payload["rankings"]] == [
+            (1, "Rui"),
+            (2, "Ana"),
+        ]
+
+    def test_season_payload(self):
+        """Test seasons are described by name and ISO dates"""
+        season = MagicMock(
+            start_date=dt.date(2026, 8, 2), end_date=dt.date(2026, 10, 31)
+        )
+        season.name = "2026"
+
+        assert api.season_payload(season) == {
+            "name": "2026",
+            "start_date": "2026-08-02",
+            "end_date": "2026-10-31",
+        }
+        assert api.season_payload(None) is None
+
+
+class TestResponseCache:
+    """Test responses are built once per data version of a ward"""
+
+    @pytest.fixture(autouse=True)
+    def clear_responses(self):
+        api._responses.clear()
+        yield
+        api._responses.clear()
+
+    @patch("api.SeasonRepository.get_active", return_value=None)
+    @patch("api.get_game_data", return_value=([], [], []))
+    def test_response_is_cached_until_data_changes(
+        self, mock_game_data, mock_season
+    ):
+        """Test polling an unchanged ward does not query again"""
+        body, etag = api.get_response("rankings", "ala-cache")
+
+        assert api.get_response("rankings", "ala-cache") == (body, etag)
+        bump_data_version("outra-ala")
+        api.get_response("rankings", "ala-cache")
+        assert mock_game_data.call_count == 1
+
+        bump_data_version("ala-cache")
+        assert api.get_response("rankings", "ala-cache") == (body, etag)
+        assert mock_game_data.call_count == 2
+        assert json.loads(body) == {
+            "ala": "ala-cache",
+            "season": None,
+            "rankings": [],
+        }
+
+    def test_unknown_endpoint(self):
+        """Test unknown endpoints are rejected before any query"""
+        with pytest.raises(KeyError):
+            api.get_response("nada", "ala-cache")
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import plotly.graph_objects as go
+import pytest
+
+import cache
+from tenancy import tenant_scope
+
+
+class TestLRUCache:
+    """Test the bounded cache behind the figure memoization"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that reading an entry keeps it over older ones"""
+        lru = cache.LRUCache(2)
+        lru.get_or_build("a", lambda: 1)
+        lru.get_or_build("b", lambda: 2)
+        lru.get_or_build("a", lambda: 10)  # Hit, "b" is now the oldest
+        lru.get_or_build("c", lambda: 3)
+
+        assert len(lru) == 2
+        assert lru.get_or_build("a", lambda: 10) == 1
+        assert lru.get_or_build("b", lambda: 20) == 20
+        assert (lru.hits, lru.misses) == (2, 4)
+
+    def test_none_is_not_cached(self):
+        """Test that empty charts are built again on the next call"""
+        lru = cache.LRUCache(2)
+        build = MagicMock(return_value=None)
+
+        lru.get_or_build("chart", build)
+        lru.get_or_build("chart", build)
+
+        assert build.call_count == 2
+        assert len(lru) == 0
+
+    def test_clear(self):
+        """Test clearing drops entries and statistics"""
+        lru = cache.LRUCache(2)
+        lru.get_or_build("a", lambda: 1)
+        lru.clear()
+
+        assert len(lru) == 0
+        assert (lru.hits, lru.misses) == (0, 0)
+
+
+class TestCachedFigure:
+    """Test figures are memoized per chart, tenant, season and version"""
+
+    @pytest.fixture(autouse=True)
+    def clear_figures(self):
+        cache.figure_cache.clear()
+        yield
+        cache.figure_cache.clear()
+
+    def test_figure_is_built_once_per_data_version(self):
+        """Test unchanged charts are served from the cache"""
+        build = MagicMock(return_value=go.Figure(go.Bar(x=["a"], y=[1])))
+
+        spec = cache.cached_figure_spec("task_points", None, 1, build)
+        assert cache.cached_figure_spec("task_points", None, 1, build) is spec
+        cache.cached_figure_spec("task_points", None, 2, build)
+        cache.cached_figure_spec("task_points", 7, 2, build)
+        cache.cached_figure_spec("organization", 7, 2, build)
+        with tenant_scope("outra-ala"):
+            cache.cached_figure_spec("organization", 7, 2, build)
+
+        assert build.call_count == 5
+
+    def test_the_serialized_spec_is_cached(self):
+        """Test sessions share the JSON of the figure, not the figure"""
+        figure = go.Figure(go.Bar(x=["a"], y=[1]))
+
+        spec = cache.cached_figure_spec(
+            "organization", None, 1, lambda: figure
+        )
+
+        assert isinstance(spec, str)
+        assert json.loads(spec)["data"][0]["y"] == [1]
+
+    def test_chart_without_figure_is_not_cached(self):
+        """Test a chart with nothing to show gives None"""
+        assert (
+            cache.cached_figure_spec("organization", None, 1, lambda: None)
+            is None
+        )
+        assert len(cache.figure_cache) == 0
@@ -0,0 +1,72 @@
+import os
+import sys
+from types import SimpleNamespace
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from columnar import EntryColumns, EntryView
+
+
+def entries():
+    columns = EntryColumns()
+    columns.append(1, 10, 100.0, 2, 0)
+    columns.append(2, 20, 200.0, 1, 5)
+    columns.append(1, 20, 300.0, 3, 1)
+    return columns
+
+
+class TestEntryColumns:
+    """Test the columnar container of compiled entries"""
+
+    def test_rows_round_trip(self):
+        """Test entries iterate and index as rows"""
+        columns = EntryColumns.from_entries(
+            [
+                SimpleNamespace(
+                    youth_id=1, task_id=10, timestamp=1.5, quantity=2, bonus=0
+                )
+            ]
+        )
+
+        assert len(columns) == 1
+        assert list(columns) == [EntryView(1, 10, 1.5, 2, 0)]
+        assert columns[0].timestamp == 1.5
+
+    def test_memory_is_24_bytes_per_entry(self):
+        """Test a million entries fit in tens of megabytes"""
+        assert entries().nbytes() == 3 * 24
+
+    def test_between_filters_half_open_range(self):
+        """Test the start is included and the end excluded"""
+        columns = entries()
+
+        assert [e.timestamp for e in columns.between(200.0)] == [200.0, 300.0]
+        assert [e.timestamp for e in columns.between(end=200.0)] == [100.0]
+        assert len(columns.between(150.0, 300.0)) == 1
+
+    def test_between_on_unsorted_entries(self):
+        """Test entries appended out of order are scanned"""
+        columns = entries()
+        columns.append(3, 10, 50.0, 1, 0)
+
+        assert sorted(e.youth_id for e in columns.between(end=150.0)) == [
+            1,
+            3,
+        ]
+
+    def test_where_task(self):
+        assert [e.youth_id for e in entries().where_task([20])] == [2, 1]
+
+    def test_group_by_sums(self):
+        """Test quantities and points grouped by a column"""
+        columns = entries()
+
+        assert columns.sum_by("task_id") == {10: 2, 20: 4}
+        assert columns.sum_by("youth_id", "bonus") == {1: 1, 2: 5}
+        # Task 30 is unknown, so its entries are skipped
+        assert columns.points_by("youth_id", {10: 5, 20: 2}) == {
+            1: 10 + 7,
+            2: 7,
+        }
+        assert columns.points_by("youth_id", {10: 5}) == {1: 10}
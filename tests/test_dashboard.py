@@ -11,7 +11,7 @@ import pytest
 from freezegun import freeze_time
 from streamlit.testing.v1 import AppTest
 
-import Dashboard
+import sections
 
 
 class TestDashboardVisualElements:
@@ -70,20 +70,20 @@ class TestDashboardTimeBasedCalculations:
 
         # Test with different days to ensure Sunday-Saturday week calculation
         with freeze_time("2023-01-01 15:30:00"):  # Sunday afternoon
-            result = Dashboard.get_last_sunday()
+            result = sections.get_last_sunday()
             # Should return previous Sunday (2022-12-25) since current day
             # is Sunday
             expected = datetime(2022, 12, 25, 0, 0, 0)
             assert result == expected
 
         with freeze_time("2023-01-02 10:00:00"):  # Monday morning
-            result = Dashboard.get_last_sunday()
+            result = sections.get_last_sunday()
             # Should return yesterday (Sunday 2023-01-01)
             expected = datetime(2023, 1, 1, 0, 0, 0)
             assert result == expected
 
         with freeze_time("2023-01-07 18:00:00"):  # Saturday evening
-            result = Dashboard.get_last_sunday()
+            result = sections.get_last_sunday()
             # Should return start of week (Sunday 2023-01-01)
             expected = datetime(2023, 1, 1, 0, 0, 0)
             assert result == expected
@@ -97,75 +97,67 @@ class TestDashboardTargetTasks:
         without Batismos"""
 
         # Mock data to trigger calculate_task_totals
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-        ):
-            mock_compiled.return_value = []
-            mock_tasks.return_value = []
-
-            # Call the function to ensure it uses the expected mapping
-            totals, deltas = Dashboard.calculate_task_totals()
-
-            # Verify the expected keys exist (6 total, no Batismos)
-            expected_keys = [
-                "Livros de Mórmon entregues",
-                "Pessoas levadas à igreja",
-                "Referências",
-                "Lições",
-                "Posts nas redes sociais",
-                "Sessões de noite familiar",
-            ]
-
-            for key in expected_keys:
-                assert key in totals
-                assert key in deltas
-
-            # Verify no Batismos key
-            assert "Batismos" not in totals
-            assert "Batismos" not in deltas
-
-            # Should have exactly 6 metrics
-            assert len(totals) == 6
-            assert len(deltas) == 6
+        compiled_entries = []
+        task_entries = []
+
+        # Call the function to ensure it uses the expected mapping
+        totals, deltas = sections.calculate_task_totals(
+            compiled_entries,
+            task_entries,
+        )
+
+        # Verify the expected keys exist (6 total, no Batismos)
+        expected_keys = [
+            "Livros de Mórmon entregues",
+            "Pessoas levadas à igreja",
+            "Referências",
+            "Lições",
+            "Posts nas redes sociais",
+            "Sessões de noite familiar",
+        ]
+
+        for key in expected_keys:
+            assert key in totals
+            assert key in deltas
+
+        # Verify no Batismos key
+        assert "Batismos" not in totals
+        assert "Batismos" not in deltas
+
+        # Should have exactly 6 metrics
+        assert len(totals) == 6
+        assert len(deltas) == 6
 
     def test_new_referencias_and_licoes_tasks_in_mapping(self):
         """Test that new Referências and Lições tasks are in the mapping"""
 
         # Check that the calculate_task_totals function includes the new tasks
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-        ):
-            # Mock tasks including the new ones
-            mock_tasks.return_value = [
-                MagicMock(
-                    id=1, tasks="Dar contato (tel/endereço) às Sisteres"
-                ),
-                MagicMock(id=2, tasks="Visitar com as Sisteres"),
-            ]
+        # Mock tasks including the new ones
+        task_entries = [
+            MagicMock(id=1, tasks="Dar contato (tel/endereço) às Sisteres"),
+            MagicMock(id=2, tasks="Visitar com as Sisteres"),
+        ]
 
-            # Mock compiled data for these tasks
-            mock_compiled.return_value = [
-                MagicMock(
-                    task_id=1, quantity=3, timestamp=datetime.now().timestamp()
-                ),
-                MagicMock(
-                    task_id=2, quantity=2, timestamp=datetime.now().timestamp()
-                ),
-            ]
+        # Mock compiled data for these tasks
+        compiled_entries = [
+            MagicMock(
+                task_id=1, quantity=3, timestamp=datetime.now().timestamp()
+            ),
+            MagicMock(
+                task_id=2, quantity=2, timestamp=datetime.now().timestamp()
+            ),
+        ]
 
-            totals, deltas = Dashboard.calculate_task_totals()
+        totals, deltas = sections.calculate_task_totals(
+            compiled_entries,
+            task_entries,
+        )
 
-            # Verify the new metrics are calculated
-            assert totals["Referências"] == 3
-            assert totals["Lições"] == 2
-            assert deltas["Referências"] == 3
-            assert deltas["Lições"] == 2
+        # Verify the new metrics are calculated
+        assert totals["Referências"] == 3
+        assert totals["Lições"] == 2
+        assert deltas["Referências"] == 3
+        assert deltas["Lições"] == 2
 
 
 class TestDashboardDeltaTextFormat:
@@ -206,77 +198,69 @@ class TestDashboardDataProcessing:
         missionary data"""
 
         # Mock realistic missionary activity data
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-        ):
-            # Mock all target tasks
-            mock_tasks.return_value = [
-                MagicMock(
-                    id=1,
-                    tasks="Entregar Livro de Mórmon + foto + relato no grupo",
-                ),
-                MagicMock(id=2, tasks="Levar amigo à sacramental"),
-                MagicMock(
-                    id=3, tasks="Dar contato (tel/endereço) às Sisteres"
+        # Mock all target tasks
+        task_entries = [
+            MagicMock(
+                id=1,
+                tasks="Entregar Livro de Mórmon + foto + relato no grupo",
+            ),
+            MagicMock(id=2, tasks="Levar amigo à sacramental"),
+            MagicMock(id=3, tasks="Dar contato (tel/endereço) às Sisteres"),
+            MagicMock(id=4, tasks="Visitar com as Sisteres"),
+            MagicMock(
+                id=5,
+                tasks=(
+                    "Postar mensagem do evangelho nas redes sociais + print"
                 ),
-                MagicMock(id=4, tasks="Visitar com as Sisteres"),
-                MagicMock(
-                    id=5,
-                    tasks=(
-                        "Postar mensagem do evangelho nas redes sociais "
-                        "+ print"
-                    ),
-                ),
-                MagicMock(id=6, tasks="Fazer noite familiar com pesquisador"),
-            ]
-
-            # Mock compiled data with various timestamps (some this week,
-            # some older)
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
-            )
-            old_timestamp = (
-                last_sunday - timedelta(days=3)
-            ).timestamp()  # Before this week
-            new_timestamp = (
-                last_sunday + timedelta(days=1)
-            ).timestamp()  # This week
-
-            mock_compiled.return_value = [
-                MagicMock(
-                    task_id=1, quantity=5, timestamp=old_timestamp
-                ),  # Old books
-                MagicMock(
-                    task_id=1, quantity=3, timestamp=new_timestamp
-                ),  # New books
-                MagicMock(
-                    task_id=3, quantity=7, timestamp=new_timestamp
-                ),  # New references
-                MagicMock(
-                    task_id=4, quantity=4, timestamp=new_timestamp
-                ),  # New lessons
-                MagicMock(
-                    task_id=5, quantity=12, timestamp=new_timestamp
-                ),  # New posts
-            ]
-
-            totals, deltas = Dashboard.calculate_task_totals()
-
-            # Check totals (all entries)
-            assert totals["Livros de Mórmon entregues"] == 8  # 5 + 3
-            assert totals["Referências"] == 7
-            assert totals["Lições"] == 4
-            assert totals["Posts nas redes sociais"] == 12
-
-            # Check deltas (only this week)
-            assert deltas["Livros de Mórmon entregues"] == 3  # Only new
-            assert deltas["Referências"] == 7
-            assert deltas["Lições"] == 4
-            assert deltas["Posts nas redes sociais"] == 12
+            ),
+            MagicMock(id=6, tasks="Fazer noite familiar com pesquisador"),
+        ]
+
+        # Mock compiled data with various timestamps (some this week,
+        # some older)
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        old_timestamp = (
+            last_sunday - timedelta(days=3)
+        ).timestamp()  # Before this week
+        new_timestamp = (
+            last_sunday + timedelta(days=1)
+        ).timestamp()  # This week
+
+        compiled_entries = [
+            MagicMock(
+                task_id=1, quantity=5, timestamp=old_timestamp
+            ),  # Old books
+            MagicMock(
+                task_id=1, quantity=3, timestamp=new_timestamp
+            ),  # New books
+            MagicMock(
+                task_id=3, quantity=7, timestamp=new_timestamp
+            ),  # New references
+            MagicMock(
+                task_id=4, quantity=4, timestamp=new_timestamp
+            ),  # New lessons
+            MagicMock(
+                task_id=5, quantity=12, timestamp=new_timestamp
+            ),  # New posts
+        ]
+
+        totals, deltas = sections.calculate_task_totals(
+            compiled_entries,
+            task_entries,
+        )
+
+        # Check totals (all entries)
+        assert totals["Livros de Mórmon entregues"] == 8  # 5 + 3
+        assert totals["Referências"] == 7
+        assert totals["Lições"] == 4
+        assert totals["Posts nas redes sociais"] == 12
+
+        # Check deltas (only this week)
+        assert deltas["Livros de Mórmon entregues"] == 3  # Only new
+        assert deltas["Referências"] == 7
+        assert deltas["Lições"] == 4
+        assert deltas["Posts nas redes sociais"] == 12
 
 
 class TestDashboardIntegrationEndToEnd:
@@ -365,10 +349,10 @@ class TestDashboardWeekCalculationEdgeCases:
 
         # Test Saturday night to Sunday morning transition
         with freeze_time("2023-01-07 23:59:59"):  # Saturday 23:59:59
-            saturday_result = Dashboard.get_last_sunday()
+            saturday_result = sections.get_last_sunday()
 
         with freeze_time("2023-01-08 00:00:01"):  # Sunday 00:00:01 (next day)
-            sunday_result = Dashboard.get_last_sunday()
+            sunday_result = sections.get_last_sunday()
 
         # Saturday should point to start of current week (Sunday 2023-01-01)
         expected_week_start = datetime(2023, 1, 1, 0, 0, 0)
@@ -386,7 +370,7 @@ class TestDashboardWeekCalculationEdgeCases:
 
         # Test Wednesday
         with freeze_time("2023-01-04 14:30:00"):  # Wednesday afternoon
-            result = Dashboard.get_last_sunday()
+            result = sections.get_last_sunday()
 
         # Should point to start of current week (Sunday 2023-01-01)
         expected = datetime(2023, 1, 1, 0, 0, 0)
@@ -496,201 +480,188 @@ class TestDashboardNewFeatures:
     def test_calculate_weekly_youth_points_function(self):
         """Test the calculate_weekly_youth_points function"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
-            )
-            this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
-            old_timestamp = (last_sunday - timedelta(days=3)).timestamp()
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
+        old_timestamp = (last_sunday - timedelta(days=3)).timestamp()
 
-            mock_youth.return_value = [
-                MagicMock(
-                    id=1, name="João", organization="Rapazes", total_points=100
-                ),
-                MagicMock(
-                    id=2, name="Maria", organization="Moças", total_points=80
-                ),
-            ]
-
-            # Set the name attribute correctly
-            mock_youth.return_value[0].name = "João"
-            mock_youth.return_value[1].name = "Maria"
-
-            mock_tasks.return_value = [
-                MagicMock(id=1, points=10),
-                MagicMock(id=2, points=15),
-            ]
-
-            mock_compiled.return_value = [
-                MagicMock(
-                    youth_id=1,
-                    task_id=1,
-                    quantity=2,
-                    bonus=5,
-                    timestamp=this_week_timestamp,
-                ),
-                MagicMock(
-                    youth_id=2,
-                    task_id=2,
-                    quantity=1,
-                    bonus=0,
-                    timestamp=this_week_timestamp,
-                ),
-                MagicMock(
-                    youth_id=1,
-                    task_id=1,
-                    quantity=3,
-                    bonus=0,
-                    timestamp=old_timestamp,
-                ),  # Old entry
-            ]
+        youth_entries = [
+            MagicMock(
+                id=1, name="João", organization="Rapazes", total_points=100
+            ),
+            MagicMock(
+                id=2, name="Maria", organization="Moças", total_points=80
+            ),
+        ]
 
-            weekly_points = Dashboard.calculate_weekly_youth_points()
+        # Set the name attribute correctly
+        youth_entries[0].name = "João"
+        youth_entries[1].name = "Maria"
 
-            # João: 2 * 10 + 5 = 25 points this week
-            assert weekly_points[1]["name"] == "João"
-            assert weekly_points[1]["points"] == 25
+        task_entries = [
+            MagicMock(id=1, points=10),
+            MagicMock(id=2, points=15),
+        ]
 
-            # Maria: 1 * 15 + 0 = 15 points this week
-            assert weekly_points[2]["name"] == "Maria"
-            assert weekly_points[2]["points"] == 15
+        compiled_entries = [
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                quantity=2,
+                bonus=5,
+                timestamp=this_week_timestamp,
+            ),
+            MagicMock(
+                youth_id=2,
+                task_id=2,
+                quantity=1,
+                bonus=0,
+                timestamp=this_week_timestamp,
+            ),
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                quantity=3,
+                bonus=0,
+                timestamp=old_timestamp,
+            ),  # Old entry
+        ]
+
+        weekly_points = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+
+        # João: 2 * 10 + 5 = 25 points this week
+        assert weekly_points[1]["name"] == "João"
+        assert weekly_points[1]["points"] == 25
+
+        # Maria: 1 * 15 + 0 = 15 points this week
+        assert weekly_points[2]["name"] == "Maria"
+        assert weekly_points[2]["points"] == 15
 
     def test_top_5_displays_weekly_points_with_total_ranking_order(self):
         """Test that Top 5 shows youth in total points order but displays
         weekly points"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
-            )
-            this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
 
-            # Youth ranked by total points: João(100), Pedro(90), Maria(80)
-            # But weekly points: João(30), Maria(20), Pedro(0)
+        # Youth ranked by total points: João(100), Pedro(90), Maria(80)
+        # But weekly points: João(30), Maria(20), Pedro(0)
 
-            youth1 = MagicMock(
-                id=1, name="João", organization="Rapazes", total_points=100
-            )
-            youth2 = MagicMock(
-                id=2, name="Maria", organization="Moças", total_points=80
-            )
-            youth3 = MagicMock(
-                id=3, name="Pedro", organization="Rapazes", total_points=90
-            )
+        youth1 = MagicMock(
+            id=1, name="João", organization="Rapazes", total_points=100
+        )
+        youth2 = MagicMock(
+            id=2, name="Maria", organization="Moças", total_points=80
+        )
+        youth3 = MagicMock(
+            id=3, name="Pedro", organization="Rapazes", total_points=90
+        )
+
+        # Set the name attributes correctly
+        youth1.name = "João"
+        youth2.name = "Maria"
+        youth3.name = "Pedro"
+
+        youth_entries = [youth1, youth2, youth3]
+
+        task_entries = [
+            MagicMock(id=1, points=10),
+            MagicMock(id=2, points=20),
+        ]
+
+        compiled_entries = [
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                quantity=3,
+                bonus=0,
+                timestamp=this_week_timestamp,
+            ),  # João: 30 pts
+            MagicMock(
+                youth_id=2,
+                task_id=2,
+                quantity=1,
+                bonus=0,
+                timestamp=this_week_timestamp,
+            ),  # Maria: 20 pts
+            # Pedro: 0 points this week
+        ]
 
-            # Set the name attributes correctly
-            youth1.name = "João"
-            youth2.name = "Maria"
-            youth3.name = "Pedro"
-
-            mock_youth.return_value = [youth1, youth2, youth3]
-
-            mock_tasks.return_value = [
-                MagicMock(id=1, points=10),
-                MagicMock(id=2, points=20),
-            ]
-
-            mock_compiled.return_value = [
-                MagicMock(
-                    youth_id=1,
-                    task_id=1,
-                    quantity=3,
-                    bonus=0,
-                    timestamp=this_week_timestamp,
-                ),  # João: 30 pts
-                MagicMock(
-                    youth_id=2,
-                    task_id=2,
-                    quantity=1,
-                    bonus=0,
-                    timestamp=this_week_timestamp,
-                ),  # Maria: 20 pts
-                # Pedro: 0 points this week
-            ]
-
-            weekly_points_data = Dashboard.calculate_weekly_youth_points()
-
-            # Verify weekly points calculation
-            assert weekly_points_data[1]["name"] == "João"
-            assert weekly_points_data[1]["points"] == 30
-
-            assert weekly_points_data[2]["name"] == "Maria"
-            assert weekly_points_data[2]["points"] == 20
+        weekly_points_data = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+
+        # Verify weekly points calculation
+        assert weekly_points_data[1]["name"] == "João"
+        assert weekly_points_data[1]["points"] == 30
+
+        assert weekly_points_data[2]["name"] == "Maria"
+        assert weekly_points_data[2]["points"] == 20
 
     def test_calculate_weekly_book_deliveries_function(self):
         """Test the calculate_weekly_book_deliveries function"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-        ):
-            mock_tasks.return_value = [
-                MagicMock(
-                    id=1,
-                    tasks="Entregar Livro de Mórmon + foto + relato no grupo",
-                ),
-                MagicMock(id=2, tasks="Outras tarefas"),
-            ]
-
-            # Create timestamps for different weeks
-            first_sunday = datetime(2023, 1, 1)  # Week 1 start
-            week1_timestamp = (
-                first_sunday + timedelta(days=2)
-            ).timestamp()  # Tuesday week 1
-            week2_timestamp = (
-                first_sunday + timedelta(days=9)
-            ).timestamp()  # Tuesday week 2
-
-            mock_compiled.return_value = [
-                MagicMock(task_id=1, quantity=3, timestamp=week1_timestamp),
-                MagicMock(task_id=1, quantity=2, timestamp=week1_timestamp),
-                MagicMock(task_id=1, quantity=4, timestamp=week2_timestamp),
-                MagicMock(
-                    task_id=2, quantity=1, timestamp=week1_timestamp
-                ),  # Not a book delivery
-            ]
-
-            weekly_deliveries = Dashboard.calculate_weekly_book_deliveries()
-
-            # Week 1: 3 + 2 = 5 deliveries
-            # Week 2: 4 deliveries
-            assert weekly_deliveries[1] == 5
-            assert weekly_deliveries[2] == 4
+        task_entries = [
+            MagicMock(
+                id=1,
+                tasks="Entregar Livro de Mórmon + foto + relato no grupo",
+            ),
+            MagicMock(id=2, tasks="Outras tarefas"),
+        ]
+
+        # Create timestamps for different weeks
+        first_sunday = datetime(2023, 1, 1)  # Week 1 start
+        week1_timestamp = (
+            first_sunday + timedelta(days=2)
+        ).timestamp()  # Tuesday week 1
+        week2_timestamp = (
+            first_sunday + timedelta(days=9)
+        ).timestamp()  # Tuesday week 2
+
+        compiled_entries = [
+            MagicMock(task_id=1, quantity=3, timestamp=week1_timestamp),
+            MagicMock(task_id=1, quantity=2, timestamp=week1_timestamp),
+            MagicMock(task_id=1, quantity=4, timestamp=week2_timestamp),
+            MagicMock(
+                task_id=2, quantity=1, timestamp=week1_timestamp
+            ),  # Not a book delivery
+        ]
+
+        weekly_deliveries = sections.calculate_weekly_book_deliveries(
+            compiled_entries,
+            task_entries,
+        )
+
+        # Week 1: 3 + 2 = 5 deliveries
+        # Week 2: 4 deliveries
+        assert weekly_deliveries[1] == 5
+        assert weekly_deliveries[2] == 4
 
     def test_calculate_countdown_function(self):
         """Test the calculate_countdown function"""
 
         # Test with a date before the end
         with freeze_time("2025-10-01"):
-            days = Dashboard.calculate_countdown()
+            days = sections.calculate_countdown()
             assert (
                 days == 30
             )  # October has 31 days, so Oct 1 to Oct 31 is 30 days
 
         # Test with a date after the end
         with freeze_time("2025-11-01"):
-            days = Dashboard.calculate_countdown()
+            days = sections.calculate_countdown()
             assert days == 0  # Should not show negative days
 
         # Test on the exact end date
         with freeze_time("2025-10-31"):
-            days = Dashboard.calculate_countdown()
+            days = sections.calculate_countdown()
             assert days == 0
 
     def test_dashboard_displays_new_sections(self):
@@ -710,89 +681,82 @@ class TestDashboardNewFeatures:
     def test_dashboard_handles_empty_weekly_data(self):
         """Test dashboard handles cases with no weekly data gracefully"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            # Mock empty data
-            mock_youth.return_value = []
-            mock_tasks.return_value = []
-            mock_compiled.return_value = []
+        # Mock empty data
+        youth_entries = []
+        task_entries = []
+        compiled_entries = []
 
-            # Should not raise exceptions
-            weekly_points = Dashboard.calculate_weekly_youth_points()
-            weekly_books = Dashboard.calculate_weekly_book_deliveries()
-            countdown = Dashboard.calculate_countdown()
+        # Should not raise exceptions
+        weekly_points = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+        weekly_books = sections.calculate_weekly_book_deliveries(
+            compiled_entries,
+            task_entries,
+        )
+        countdown = sections.calculate_countdown()
 
-            assert weekly_points == {}
-            assert weekly_books == {}
-            assert countdown >= 0
+        assert weekly_points == {}
+        assert weekly_books == {}
+        assert countdown >= 0
 
     def test_leaderboard_top_5_limit(self):
         """Test that leaderboard correctly limits to top 5 youth"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
+
+        # Create 7 youth with different weekly points
+        youth_mocks = []
+        for i in range(1, 8):
+            youth = MagicMock(
+                id=i,
+                name=f"Youth{i}",
+                organization="Rapazes",
+                total_points=100 - i,
+            )
+            youth_mocks.append(youth)
+
+        youth_entries = youth_mocks
+
+        task_entries = [MagicMock(id=1, points=10)]
+
+        # Give different weekly points: Youth1=70, Youth2=60, ...,
+        # Youth7=10
+        compiled_entries = [
+            MagicMock(
+                youth_id=i,
+                task_id=1,
+                quantity=8 - i,
+                bonus=0,
+                timestamp=this_week_timestamp,
+            )
+            for i in range(1, 8)
+        ]
+
+        weekly_points_data = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+
+        # Should have all 7 youth with weekly points
+        assert len(weekly_points_data) == 7
+
+        # The Top 5 should be based on total points ranking
+        # (Youth1-Youth5), not weekly points
+        top_5 = youth_entries[:5]  # First 5 by total points
+        for i, youth in enumerate(top_5):
+            expected_weekly_points = 70 - (
+                i * 10
+            )  # Youth1=70, Youth2=60, etc.
+            assert (
+                weekly_points_data[youth.id]["points"]
+                == expected_weekly_points
             )
-            this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
-
-            # Create 7 youth with different weekly points
-            youth_mocks = []
-            for i in range(1, 8):
-                youth = MagicMock(
-                    id=i,
-                    name=f"Youth{i}",
-                    organization="Rapazes",
-                    total_points=100 - i,
-                )
-                youth_mocks.append(youth)
-
-            mock_youth.return_value = youth_mocks
-
-            mock_tasks.return_value = [MagicMock(id=1, points=10)]
-
-            # Give different weekly points: Youth1=70, Youth2=60, ...,
-            # Youth7=10
-            mock_compiled.return_value = [
-                MagicMock(
-                    youth_id=i,
-                    task_id=1,
-                    quantity=8 - i,
-                    bonus=0,
-                    timestamp=this_week_timestamp,
-                )
-                for i in range(1, 8)
-            ]
-
-            weekly_points_data = Dashboard.calculate_weekly_youth_points()
-
-            # Should have all 7 youth with weekly points
-            assert len(weekly_points_data) == 7
-
-            # The Top 5 should be based on total points ranking
-            # (Youth1-Youth5), not weekly points
-            youth_entries = [
-                mock_youth.return_value[i] for i in range(5)
-            ]  # First 5 by total points
-            for i, youth in enumerate(youth_entries):
-                expected_weekly_points = 70 - (
-                    i * 10
-                )  # Youth1=70, Youth2=60, etc.
-                assert (
-                    weekly_points_data[youth.id]["points"]
-                    == expected_weekly_points
-                )
 
 
 class TestDashboardUILayoutImprovements:
@@ -802,79 +766,73 @@ class TestDashboardUILayoutImprovements:
         """Test that Top 5 section displays correct layout using
         st.metric format"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
-            )
-            this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
-
-            youth1 = MagicMock()
-            youth1.id = 1
-            youth1.name = "João Silva"
-            youth1.age = 18
-            youth1.organization = "Rapazes"
-            youth1.total_points = 30
-
-            youth2 = MagicMock()
-            youth2.id = 2
-            youth2.name = "Maria Santos"
-            youth2.age = 17
-            youth2.organization = "Moças"
-            youth2.total_points = 20
-
-            mock_youth.return_value = [youth1, youth2]
-
-            task1 = MagicMock()
-            task1.id = 1
-            task1.points = 10
-
-            mock_tasks.return_value = [task1]
-
-            compiled1 = MagicMock()
-            compiled1.youth_id = 1
-            compiled1.task_id = 1
-            compiled1.quantity = 3
-            compiled1.bonus = 0
-            compiled1.timestamp = this_week_timestamp
-
-            compiled2 = MagicMock()
-            compiled2.youth_id = 2
-            compiled2.task_id = 1
-            compiled2.quantity = 2
-            compiled2.bonus = 0
-            compiled2.timestamp = this_week_timestamp
-
-            mock_compiled.return_value = [compiled1, compiled2]
-
-            # Test that the weekly points calculation works correctly with
-            # our mock data
-            weekly_points = Dashboard.calculate_weekly_youth_points()
-
-            # Verify the weekly points calculation works
-            assert 1 in weekly_points
-            assert 2 in weekly_points
-            assert weekly_points[1]["name"] == "João Silva"
-            assert weekly_points[1]["points"] == 30  # 3 * 10 + 0
-            assert weekly_points[2]["name"] == "Maria Santos"
-            assert weekly_points[2]["points"] == 20  # 2 * 10 + 0
-
-            # Test that youth data has all required fields for ranking
-            # table creation
-            youth_entries = mock_youth.return_value
-            for youth in youth_entries:
-                assert hasattr(youth, "name")
-                assert hasattr(youth, "age")
-                assert hasattr(youth, "organization")
-                assert hasattr(youth, "total_points")
-                assert isinstance(youth.age, int)
-                assert isinstance(youth.total_points, int)
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
+
+        youth1 = MagicMock()
+        youth1.id = 1
+        youth1.name = "João Silva"
+        youth1.age = 18
+        youth1.organization = "Rapazes"
+        youth1.total_points = 30
+
+        youth2 = MagicMock()
+        youth2.id = 2
+        youth2.name = "Maria Santos"
+        youth2.age = 17
+        youth2.organization = "Moças"
+        youth2.total_points = 20
+
+        youth_entries = [youth1, youth2]
+
+        task1 = MagicMock()
+        task1.id = 1
+        task1.points = 10
+
+        task_entries = [task1]
+
+        compiled1 = MagicMock()
+        compiled1.youth_id = 1
+        compiled1.task_id = 1
+        compiled1.quantity = 3
+        compiled1.bonus = 0
+        compiled1.timestamp = this_week_timestamp
+
+        compiled2 = MagicMock()
+        compiled2.youth_id = 2
+        compiled2.task_id = 1
+        compiled2.quantity = 2
+        compiled2.bonus = 0
+        compiled2.timestamp = this_week_timestamp
+
+        compiled_entries = [compiled1, compiled2]
+
+        # Test that the weekly points calculation works correctly with
+        # our mock data
+        weekly_points = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+
+        # Verify the weekly points calculation works
+        assert 1 in weekly_points
+        assert 2 in weekly_points
+        assert weekly_points[1]["name"] == "João Silva"
+        assert weekly_points[1]["points"] == 30  # 3 * 10 + 0
+        assert weekly_points[2]["name"] == "Maria Santos"
+        assert weekly_points[2]["points"] == 20  # 2 * 10 + 0
+
+        # Test that youth data has all required fields for ranking
+        # table creation
+        for youth in youth_entries:
+            assert hasattr(youth, "name")
+            assert hasattr(youth, "age")
+            assert hasattr(youth, "organization")
+            assert hasattr(youth, "total_points")
+            assert isinstance(youth.age, int)
+            assert isinstance(youth.total_points, int)
 
     def test_countdown_simple_format(self):
         """Test that countdown is displayed in simple markdown format"""
@@ -901,124 +859,102 @@ class TestDashboardUILayoutImprovements:
     def test_top_5_empty_state_unchanged(self):
         """Test that Top 5 empty state still displays correctly"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            # Mock empty data
-            mock_youth.return_value = []
-            mock_tasks.return_value = []
-            mock_compiled.return_value = []
-
-            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
-            at = AppTest.from_file("Dashboard.py")
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("Dashboard.py")
+        with patch("async_database.load_game_data", return_value=([], [], [])):
             at.run()
 
-            assert not at.exception
+        assert not at.exception
 
-            # Check that empty state info is displayed
-            info_elements = [info.value for info in at.info]
-            assert any(
-                "Nenhum jovem cadastrado ainda." in info
-                for info in info_elements
-            )
+        # Check that empty state info is displayed
+        info_elements = [info.value for info in at.info]
+        assert any(
+            "Nenhum jovem cadastrado ainda." in info for info in info_elements
+        )
 
     def test_top_5_no_weekly_activity_state(self):
         """Test that Top 5 shows correct message when there are youth
         but no weekly activity"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            # Mock youth with total points but no weekly activity
-            mock_youth.return_value = [
-                MagicMock(
-                    id=1,
-                    name="João Silva",
-                    organization="Rapazes",
-                    total_points=100,
-                ),
-                MagicMock(
-                    id=2,
-                    name="Maria Santos",
-                    organization="Moças",
-                    total_points=80,
-                ),
-            ]
-            mock_tasks.return_value = []
-            mock_compiled.return_value = []  # No weekly activity
+        # Mock youth with total points but no weekly activity
+        youth_entries = [
+            MagicMock(
+                id=1,
+                name="João Silva",
+                organization="Rapazes",
+                total_points=100,
+            ),
+            MagicMock(
+                id=2,
+                name="Maria Santos",
+                organization="Moças",
+                total_points=80,
+            ),
+        ]
 
-            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
-            at = AppTest.from_file("Dashboard.py")
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("Dashboard.py")
+        with patch(
+            "async_database.load_game_data",
+            return_value=(youth_entries, [], []),
+        ):
             at.run()
 
-            assert not at.exception
+        assert not at.exception
 
-            # Check that no weekly activity message is displayed
-            info_elements = [info.value for info in at.info]
-            assert any(
-                "Nenhuma pontuação desta semana ainda." in info
-                for info in info_elements
-            )
+        # Check that no weekly activity message is displayed
+        info_elements = [info.value for info in at.info]
+        assert any(
+            "Nenhuma pontuação desta semana ainda." in info
+            for info in info_elements
+        )
 
     def test_top_5_position_indicators_preserved(self):
         """Test that position change indicators are calculated correctly"""
 
-        with (
-            patch(
-                "Dashboard.CompiledFormDataRepository.get_all"
-            ) as mock_compiled,
-            patch("Dashboard.TasksFormDataRepository.get_all") as mock_tasks,
-            patch("Dashboard.YouthFormDataRepository.get_all") as mock_youth,
-        ):
-            current_time = datetime.now()
-            last_sunday = current_time - timedelta(
-                days=current_time.weekday() + 1
-            )
-            this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
-
-            # Mock youth with previous total points (simulating they had
-            # points before this week)
-            mock_youth.return_value = [
-                MagicMock(
-                    id=1,
-                    name="Ana Costa",
-                    organization="Moças",
-                    total_points=50,
-                ),  # Will show improvement
-            ]
-
-            mock_tasks.return_value = [
-                MagicMock(id=1, points=10),
-            ]
-
-            # Ana gained 30 points this week, so she had 20 before
-            # (simulating rank improvement)
-            mock_compiled.return_value = [
-                MagicMock(
-                    youth_id=1,
-                    task_id=1,
-                    quantity=3,
-                    bonus=0,
-                    timestamp=this_week_timestamp,
-                ),  # 30 pts this week
-            ]
-
-            # Test the function directly rather than full UI test
-            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
-            weekly_points = Dashboard.calculate_weekly_youth_points()
-
-            # Check that Ana's weekly points are calculated correctly
-            assert 1 in weekly_points
-            assert weekly_points[1]["points"] == 30
-            assert weekly_points[1]["organization"] == "Moças"
-
-            # Check that delta calculation works (even if 0 in this case)
-            assert "delta" in weekly_points[1]
+        current_time = datetime.now()
+        last_sunday = current_time - timedelta(days=current_time.weekday() + 1)
+        this_week_timestamp = (last_sunday + timedelta(days=1)).timestamp()
+
+        # Mock youth with previous total points (simulating they had
+        # points before this week)
+        youth_entries = [
+            MagicMock(
+                id=1,
+                name="Ana Costa",
+                organization="Moças",
+                total_points=50,
+            ),  # Will show improvement
+        ]
+
+        task_entries = [
+            MagicMock(id=1, points=10),
+        ]
+
+        # Ana gained 30 points this week, so she had 20 before
+        # (simulating rank improvement)
+        compiled_entries = [
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                quantity=3,
+                bonus=0,
+                timestamp=this_week_timestamp,
+            ),  # 30 pts this week
+        ]
+
+        # Test the function directly rather than full UI test
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        weekly_points = sections.calculate_weekly_youth_points(
+            compiled_entries,
+            task_entries,
+            youth_entries,
+        )
+
+        # Check that Ana's weekly points are calculated correctly
+        assert 1 in weekly_points
+        assert weekly_points[1]["points"] == 30
+        assert weekly_points[1]["organization"] == "Moças"
+
+        # Check that delta calculation works (even if 0 in this case)
+        assert "delta" in weekly_points[1]
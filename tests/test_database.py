@@ -1,4 +1,5 @@
 import datetime as dt
+import logging
 import os
 import sys
 from unittest.mock import patch
@@ -12,12 +13,17 @@ from sqlmodel import SQLModel, create_engine
 from database import (
     CompiledFormData,
     CompiledFormDataRepository,
+    SeasonRepository,
+    StoreOutcome,
     TasksFormData,
     TasksFormDataRepository,
     YouthFormData,
     YouthFormDataRepository,
+    clear_known_tenants,
     default_db_path,
+    is_known_tenant,
 )
+from tenancy import DEFAULT_TENANT, get_data_version, tenant_scope
 
 
 class TestYouthFormData:
@@ -210,6 +216,70 @@ class TestDatabaseRepositories:
             assert result.bonus == 5
             assert result.id is not None
 
+    def test_compiled_repository_store_idempotent_replay(self):
+        """Test that replaying an idempotency key returns the first row"""
+        with patch("database.engine", self.test_engine):
+            timestamp = dt.datetime.now().timestamp()
+            first = CompiledFormDataRepository.store(
+                1, 1, timestamp, 2, 0, idempotency_key="abc"
+            )
+            replay = CompiledFormDataRepository.store(
+                1, 1, timestamp + 5, 3, 1, idempotency_key="abc"
+            )
+            other = CompiledFormDataRepository.store(
+                1, 1, timestamp, 2, 0, idempotency_key="def"
+            )
+
+            assert replay.id == first.id
+            assert replay.quantity == 2
+            assert other.id != first.id
+            assert len(CompiledFormDataRepository.get_all()) == 2
+
+    def test_compiled_repository_register_non_repeatable_once_per_day(self):
+        """Test that the unique index rejects a second same-day entry of a
+        non-repeatable task"""
+        with patch("database.engine", self.test_engine):
+            now = dt.datetime.now()
+            yesterday = (now - dt.timedelta(days=1)).timestamp()
+
+            first = CompiledFormDataRepository.register(
+                1, 1, now.timestamp(), 1, 0, repeatable=False
+            )
+            second = CompiledFormDataRepository.register(
+                1, 1, now.timestamp(), 1, 0, repeatable=False
+            )
+            other_day = CompiledFormDataRepository.register(
+                1, 1, yesterday, 1, 0, repeatable=False
+            )
+            other_youth = CompiledFormDataRepository.register(
+                2, 1, now.timestamp(), 1, 0, repeatable=False
+            )
+
+            assert first[0] is StoreOutcome.CREATED
+            assert first[1].day_bucket == now.date().toordinal()
+            assert second == (StoreOutcome.DUPLICATE_DAY, None)
+            assert other_day[0] is StoreOutcome.CREATED
+            assert other_youth[0] is StoreOutcome.CREATED
+            assert len(CompiledFormDataRepository.get_all()) == 3
+
+    def test_compiled_repository_register_repeatable_and_replay(self):
+        """Test that repeatable tasks accept many entries a day and that a
+        replayed key is reported as such"""
+        with patch("database.engine", self.test_engine):
+            timestamp = dt.datetime.now().timestamp()
+            first = CompiledFormDataRepository.register(
+                1, 1, timestamp, 1, 0, idempotency_key="abc"
+            )
+            second = CompiledFormDataRepository.register(1, 1, timestamp, 1, 0)
+            replay = CompiledFormDataRepository.register(
+                1, 1, timestamp, 1, 0, idempotency_key="abc"
+            )
+
+            assert first[1].day_bucket is None
+            assert second[0] is StoreOutcome.CREATED
+            assert replay[0] is StoreOutcome.REPLAYED
+            assert replay[1].id == first[1].id
+
     def test_compiled_repository_get_all_empty(self):
         """Test getting all compiled entries when database is empty"""
         with patch("database.engine", self.test_engine):
@@ -227,34 +297,6 @@ class TestDatabaseRepositories:
             result = CompiledFormDataRepository.get_all()
             assert len(result) == 2
 
-    def test_compiled_repository_has_entry_today_false(self):
-        """Test has_entry_today returns False when no entry exists"""
-        with patch("database.engine", self.test_engine):
-            result = CompiledFormDataRepository.has_entry_today(1, 1)
-            assert result is False
-
-    def test_compiled_repository_has_entry_today_true(self):
-        """Test has_entry_today returns True when entry exists today"""
-        with patch("database.engine", self.test_engine):
-            # Create entry with today's timestamp
-            today_timestamp = dt.datetime.now().timestamp()
-            CompiledFormDataRepository.store(1, 1, today_timestamp, 1, 0)
-
-            result = CompiledFormDataRepository.has_entry_today(1, 1)
-            assert result is True
-
-    def test_compiled_repository_has_entry_today_false_different_day(self):
-        """Test has_entry_today returns False for entries from
-        different days"""
-        with patch("database.engine", self.test_engine):
-            # Create entry with yesterday's timestamp
-            yesterday = dt.datetime.now() - dt.timedelta(days=1)
-            yesterday_timestamp = yesterday.timestamp()
-            CompiledFormDataRepository.store(1, 1, yesterday_timestamp, 1, 0)
-
-            result = CompiledFormDataRepository.has_entry_today(1, 1)
-            assert result is False
-
     def test_compiled_repository_delete_success(self):
         """Test successful compiled entry deletion"""
         with patch("database.engine", self.test_engine):
@@ -277,6 +319,207 @@ class TestDatabaseRepositories:
             assert result is False
 
 
+class TestSeasonRepository:
+    """Test seasons and the season scoping of compiled entries"""
+
+    @pytest.fixture(autouse=True)
+    def setup_test_db(self):
+        """Set up in-memory database for each test"""
+        self.test_engine = create_engine("sqlite:///:memory:")
+        SQLModel.metadata.create_all(self.test_engine)
+
+        with patch("database.engine", self.test_engine):
+            yield
+
+    def test_get_active_season(self):
+        """Test the latest started, non-archived season is the active one"""
+        SeasonRepository.store(
+            "2024", dt.date(2024, 8, 1), dt.date(2024, 10, 31)
+        )
+        current = SeasonRepository.store(
+            "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+        )
+        SeasonRepository.store(
+            "2026", dt.date(2026, 8, 1), dt.date(2026, 10, 31)
+        )
+
+        active = SeasonRepository.get_active(dt.date(2025, 12, 1))
+
+        assert active.id == current.id
+        assert SeasonRepository.get_active(dt.date(2024, 1, 1)) is None
+        assert [s.name for s in SeasonRepository.get_all()] == [
+            "2026",
+            "2025",
+            "2024",
+        ]
+
+    def test_store_adopts_entries_within_its_dates(self):
+        """Test existing entries without season join the matching season"""
+        inside = dt.datetime(2025, 9, 1, 12).timestamp()
+        outside = dt.datetime(2025, 11, 1, 12).timestamp()
+        CompiledFormDataRepository.store(1, 1, inside, 1, 0)
+        CompiledFormDataRepository.store(1, 1, outside, 1, 0)
+
+        season = SeasonRepository.store(
+            "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+        )
+
+        scoped = CompiledFormDataRepository.get_all(season.id)
+        assert [e.timestamp for e in scoped] == [inside]
+        assert len(CompiledFormDataRepository.get_all()) == 2
+
+    def test_register_in_season(self):
+        """Test entries registered with a season are listed by it only"""
+        season = SeasonRepository.store(
+            "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+        )
+        timestamp = dt.datetime.now().timestamp()
+
+        entry = CompiledFormDataRepository.store(
+            1, 1, timestamp, 1, 0, season_id=season.id
+        )
+        CompiledFormDataRepository.store(1, 1, timestamp, 1, 0)
+
+        assert entry.season_id == season.id
+        scoped = CompiledFormDataRepository.get_all(season.id)
+        assert [e.id for e in scoped] == [entry.id]
+
+    def test_archive_rolls_entries_into_summaries(self):
+        """Test archiving keeps per youth and task totals only"""
+        season = SeasonRepository.store(
+            "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+        )
+        task = TasksFormDataRepository.store("Ler", 10, True)
+        timestamp = dt.datetime(2025, 9, 1, 12).timestamp()
+        for quantity, bonus in [(2, 1), (1, 0)]:
+            CompiledFormDataRepository.store(
+                1, task.id, timestamp, quantity, bonus, season_id=season.id
+            )
+        CompiledFormDataRepository.store(2, task.id, timestamp, 1, 0)
+
+        assert SeasonRepository.archive(season.id) is True
+
+        summaries = SeasonRepository.get_summaries(season.id)
+        assert [
+            (s.youth_id, s.task_id, s.entries, s.quantity, s.bonus, s.points)
+            for s in summaries
+        ] == [(1, task.id, 2, 3, 1, 31)]
+        assert CompiledFormDataRepository.get_all(season.id) == []
+        assert len(CompiledFormDataRepository.get_all()) == 1
+        assert SeasonRepository.get_active(dt.date(2025, 9, 1)) is None
+        # Archiving twice, or a missing season, is a no-op
+        assert SeasonRepository.archive(season.id) is False
+        assert SeasonRepository.archive(999) is False
+
+
+class TestTenantScoping:
+    """Test that every repository only sees the current tenant's rows"""
+
+    @pytest.fixture(autouse=True)
+    def setup_test_db(self):
+        """Set up in-memory database for each test"""
+        self.test_engine = create_engine("sqlite:///:memory:")
+        SQLModel.metadata.create_all(self.test_engine)
+
+        with patch("database.engine", self.test_engine):
+            yield
+
+    def test_reads_are_scoped(self):
+        """Test that rows of another tenant are not listed"""
+        timestamp = dt.datetime.now().timestamp()
+        with tenant_scope("ala-norte"):
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            task = TasksFormDataRepository.store("Ler", 10, True)
+            CompiledFormDataRepository.store(
+                youth.id, task.id, timestamp, 1, 0
+            )
+            SeasonRepository.store(
+                "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+            )
+        with tenant_scope("ala-sul"):
+            YouthFormDataRepository.store("João", 16, "Rapazes", 0)
+
+            assert [y.name for y in YouthFormDataRepository.get_all()] == [
+                "João"
+            ]
+            assert TasksFormDataRepository.get_all() == []
+            assert CompiledFormDataRepository.get_all() == []
+            assert SeasonRepository.get_all() == []
+            assert SeasonRepository.get_active() is None
+
+        with tenant_scope("ala-norte"):
+            assert [
+                y.tenant_id for y in YouthFormDataRepository.get_all()
+            ] == ["ala-norte"]
+            assert len(CompiledFormDataRepository.get_all()) == 1
+
+    def test_writes_are_scoped(self):
+        """Test that rows of another tenant cannot be changed"""
+        with tenant_scope("ala-norte"):
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            task = TasksFormDataRepository.store("Ler", 10, True)
+            season = SeasonRepository.store(
+                "2025", dt.date(2025, 8, 1), dt.date(2025, 10, 31)
+            )
+        with tenant_scope("ala-sul"):
+            assert (
+                YouthFormDataRepository.update_total_points(youth.id, 50)
+                is None
+            )
+            assert YouthFormDataRepository.delete(youth.id) is False
+            assert TasksFormDataRepository.delete(task.id) is False
+            assert SeasonRepository.archive(season.id) is False
+        with tenant_scope("ala-norte"):
+            assert YouthFormDataRepository.get_all()[0].total_points == 0
+
+    def test_replay_is_scoped(self):
+        """Test that an idempotency key only replays in its own tenant"""
+        timestamp = dt.datetime.now().timestamp()
+        with tenant_scope("ala-norte"):
+            CompiledFormDataRepository.register(
+                1, 1, timestamp, 1, 0, idempotency_key="abc"
+            )
+        with tenant_scope("ala-sul"):
+            outcome, entry = CompiledFormDataRepository.register(
+                1, 1, timestamp, 1, 0, idempotency_key="abc"
+            )
+
+        assert outcome is StoreOutcome.DUPLICATE_DAY
+        assert entry is None
+
+    def test_writes_bump_tenant_data_version(self):
+        """Test that writes invalidate the caches of their tenant only"""
+        with tenant_scope("ala-versao"):
+            before = get_data_version()
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            YouthFormDataRepository.update_total_points(youth.id, 10)
+            YouthFormDataRepository.delete(youth.id)
+
+            assert get_data_version() == before + 3
+            assert get_data_version("ala-intocada") == 0
+
+    def test_known_tenants(self):
+        """Test that only the default ward and wards with youths exist,
+        and that they are not queried again within the delay"""
+        clear_known_tenants()
+        with tenant_scope("ala-conhecida"):
+            YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+
+        try:
+            assert is_known_tenant(DEFAULT_TENANT)
+            assert is_known_tenant("ala-conhecida")
+            assert not is_known_tenant("ala-inventada")
+
+            with tenant_scope("ala-inventada"):
+                YouthFormDataRepository.store("João", 16, "Rapazes", 0)
+            assert not is_known_tenant("ala-inventada")
+
+            clear_known_tenants()
+            assert is_known_tenant("ala-inventada")
+        finally:
+            clear_known_tenants()
+
+
 class TestDatabaseErrorHandling:
     """Test database error handling scenarios"""
 
@@ -328,14 +571,6 @@ class TestDatabaseErrorHandling:
         assert TasksFormDataRepository.delete(1) is False
         assert CompiledFormDataRepository.delete(1) is False
 
-    @patch("database.handle_database_operation")
-    def test_has_entry_today_error_handling(self, mock_handle):
-        """Test has_entry_today error handling"""
-        mock_handle.return_value = None
-
-        result = CompiledFormDataRepository.has_entry_today(1, 1)
-        assert result is False
-
 
 class TestDatabaseConnection:
     """Test database connection setup and fallback mechanisms"""
@@ -367,6 +602,55 @@ class TestDatabaseConnection:
             assert database.POSTGRES_URL == ""
             assert database.DB_URL == database.SQLITE_URL
 
+    def test_sqlite_engine_applies_pragmas(self, tmp_path):
+        """Test that new SQLite connections use WAL and the busy timeout"""
+        import database
+
+        url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+        with patch.dict(os.environ, {"SQLITE_BUSY_TIMEOUT_MS": "1234"}):
+            engine = database.create_database_engine(url)
+
+        with engine.connect() as connection:
+
+            def pragma(name):
+                return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == 1234
+            assert pragma("cache_size") == -64000
+
+    def test_sqlite_pragmas_ignore_invalid_modes(self):
+        """Test that unknown journal and synchronous modes use defaults"""
+        import database
+
+        with patch.dict(
+            os.environ,
+            {"SQLITE_JOURNAL_MODE": "bogus", "SQLITE_SYNCHRONOUS": "full"},
+        ):
+            pragmas = database.sqlite_pragmas()
+
+        assert pragmas["journal_mode"] == "WAL"
+        assert pragmas["synchronous"] == "FULL"
+
+    def test_sqlite_pragmas_ignore_malformed_numbers(self, caplog):
+        """Test that a malformed number uses the default and is logged
+        instead of failing the import"""
+        import database
+
+        with (
+            patch.dict(
+                os.environ,
+                {"SQLITE_BUSY_TIMEOUT_MS": "5s", "SQLITE_CACHE_SIZE": "-2000"},
+            ),
+            caplog.at_level(logging.WARNING),
+        ):
+            pragmas = database.sqlite_pragmas()
+
+        assert pragmas["busy_timeout"] == "5000"
+        assert pragmas["cache_size"] == "-2000"
+        assert "SQLITE_BUSY_TIMEOUT_MS='5s'" in caplog.text
+
     def test_default_db_path_constant(self):
         """Test that default database path is correct"""
         import database
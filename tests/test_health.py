@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import health
+from warmup import WarmupState
+
+
+class TestReadiness:
+    """Test the readiness check of the process"""
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": WarmupState.READY, "seconds": 1.0},
+    )
+    def test_slow_database_times_out(self, mock_warmup_status):
+        """Test a hung database makes the check fail fast"""
+        release = threading.Event()
+        with patch("health._ping_database", side_effect=release.wait):
+            ready, state = health.readiness(timeout=0.05)
+        release.set()
+
+        assert not ready
+        assert state["database"] == {
+            "status": "timeout",
+            "timeout_seconds": 0.05,
+        }
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": WarmupState.FAILED, "seconds": 1.0},
+    )
+    def test_failed_warm_up_does_not_block_readiness(self, mock_warmup_status):
+        """Test a cold but healthy process still takes traffic"""
+        with patch("health._ping_database"):
+            ready, state = health.readiness()
+
+        assert ready
+        assert state["status"] == "ready"
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": WarmupState.READY, "seconds": 1.0},
+    )
+    def test_state_reports_pool_and_caches(self, mock_warmup_status):
+        """Test the state shown to admins covers the pool and the caches"""
+        with patch("health._ping_database"):
+            _, state = health.readiness()
+
+        assert state["database"] == {"status": "ok"}
+        assert state["pool"]["class"]
+        assert set(state["caches"]) == {
+            "figures",
+            "game_data",
+            "api_responses",
+        }
+        assert state["warmup"]["state"] == WarmupState.READY
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": WarmupState.READY, "seconds": 1.0},
+    )
+    def test_database_error_is_reported(self, mock_warmup_status):
+        """Test a database error is kept in the state instead of raised"""
+        with patch("health._ping_database", side_effect=RuntimeError("db")):
+            ready, state = health.readiness()
+
+        assert not ready
+        assert state["database"] == {"status": "error", "error": "db"}
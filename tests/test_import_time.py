@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+# Add benchmarks directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import import_time
+
+
+class TestImportTimeReport:
+    """Test the import-time report of the page scripts"""
+
+    def test_parses_importtime_output(self):
+        """Test the header is skipped and nesting becomes a depth"""
+        stderr = "\n".join(
+            [
+                "import time: self [us] | cumulative | imported package",
+                "import time:       120 |        120 |     _io",
+                "import time:      1500 |       2000 |   pandas.core",
+                "import time:       300 |       2300 | pandas",
+                "some warning",
+            ]
+        )
+
+        timings = import_time.parse_importtime(stderr)
+
+        assert [t.module for t in timings] == ["_io", "pandas.core", "pandas"]
+        assert [t.depth for t in timings] == [2, 1, 0]
+        assert timings[1].self_us == 1500
+        assert timings[2].cumulative_us == 2300
+
+    def test_report_totals_and_heavy_modules(self):
+        """Test only top level imports count towards the total"""
+        report = import_time.PageReport(
+            "page.py",
+            [
+                import_time.ImportTiming("pandas.core", 1500, 2000, 1),
+                import_time.ImportTiming("pandas", 300, 2300, 0),
+                import_time.ImportTiming("json", 200, 200, 0),
+            ],
+        )
+
+        assert report.total_ms == 2.5
+        assert report.heavy_modules == ["pandas"]
+        assert report.slowest(1)[0].module == "pandas.core"
+
+    def test_head_imports_stop_at_first_statement(self, tmp_path):
+        """Test imports behind the page code are not measured"""
+        script = tmp_path / "page.py"
+        script.write_text(
+            "import json\n"
+            "from utils import check_password\n"
+            "if not check_password():\n"
+            "    pass\n"
+            "import pandas as pd\n"
+        )
+
+        assert import_time.head_imports(script) == (
+            "import json\nfrom utils import check_password"
+        )
+
+    @pytest.mark.parametrize(
+        "script", import_time.PAGES, ids=lambda path: path.name
+    )
+    def test_pages_do_not_load_heavy_modules(self, script):
+        """Test pandas and plotly express stay out of the page imports"""
+        report = import_time.measure_page(script)
+
+        assert report.timings
+        assert report.heavy_modules == []
@@ -12,6 +12,7 @@ from sqlmodel import SQLModel, create_engine
 
 from database import (
     CompiledFormDataRepository,
+    StoreOutcome,
     TasksFormDataRepository,
     YouthFormDataRepository,
 )
@@ -165,26 +166,22 @@ class TestCompleteWorkflow:
             timestamp = time.time()
 
             # Record first completion
-            entry1 = CompiledFormDataRepository.store(
-                youth.id, task.id, timestamp, 1, 0
+            outcome, entry1 = CompiledFormDataRepository.register(
+                youth.id, task.id, timestamp, 1, 0, repeatable=task.repeatable
             )
+            assert outcome == StoreOutcome.CREATED
             assert entry1 is not None
 
-            # Check if entry exists today
-            has_entry = CompiledFormDataRepository.has_entry_today(
-                youth.id, task.id
+            # A second entry for the non-repeatable task on the same day
+            # is refused by the database
+            outcome, entry2 = CompiledFormDataRepository.register(
+                youth.id, task.id, timestamp, 1, 0, repeatable=task.repeatable
             )
-            assert has_entry is True
-
-            # Simulate validation logic from page
-            is_repeatable = task.repeatable
-            quantity = 1
-
-            # Should prevent second entry for non-repeatable task on same day
-            should_allow_entry = not (not is_repeatable and has_entry)
-            assert should_allow_entry is False
+            assert outcome == StoreOutcome.DUPLICATE_DAY
+            assert entry2 is None
 
             # Should prevent quantity > 1 for non-repeatable task
+            is_repeatable = task.repeatable
             quantity = 2
             should_allow_quantity = not (not is_repeatable and quantity > 1)
             assert should_allow_quantity is False
@@ -0,0 +1,189 @@
+import datetime as dt
+import os
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+from streamlit.testing.v1 import AppTest
+
+import jobs
+from database import (
+    CompiledFormDataRepository,
+    JobRepository,
+    JobStatus,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+)
+from tenancy import tenant_scope
+
+FINISHED = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+def wait_for(job_id, timeout=5):
+    """Polls a job until it is over"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = JobRepository.get(job_id)
+        if job.status in FINISHED:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobRunner:
+    """Test the background runner of long admin operations"""
+
+    @pytest.fixture(autouse=True)
+    def setup_test_db(self, tmp_path):
+        """Point the database at a temporary file"""
+        test_engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        SQLModel.metadata.create_all(test_engine)
+
+        with (
+            patch("database.engine", test_engine),
+            patch("jobs.JOB_PROGRESS_INTERVAL_SECONDS", 0),
+            patch.dict(jobs.JOBS),
+        ):
+            yield
+
+    def test_recompute_total_points_job(self):
+        """Test the recompute runs in the background of the tenant"""
+        with tenant_scope("ala-jobs"):
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            idle = YouthFormDataRepository.store("João", 16, "Rapazes", 7)
+            task = TasksFormDataRepository.store("Ler", 10, True)
+            CompiledFormDataRepository.store(
+                youth.id, task.id, dt.datetime.now().timestamp(), 2, 3
+            )
+
+            job = jobs.submit_job("recompute_total_points")
+            finished = wait_for(job.id)
+            totals = {
+                y.id: y.total_points for y in YouthFormDataRepository.get_all()
+            }
+
+        assert finished.status == JobStatus.SUCCEEDED
+        assert finished.progress == 1.0
+        assert finished.message == "Pontuação de 2 jovens atualizada"
+        assert finished.started_at <= finished.finished_at
+        assert totals == {youth.id: 23, idle.id: 0}
+        # Other tenants do not see the job
+        assert JobRepository.get(job.id) is None
+
+    def test_cancellation(self):
+        """Test a running job stops at its next progress report"""
+
+        @jobs.register_job("endless", "Sem fim")
+        def endless(job):
+            while True:
+                job.progress(0.5, "trabalhando")
+                time.sleep(0.01)
+
+        job = jobs.submit_job("endless")
+        # Until its first report the job has no progress to keep
+        while JobRepository.get(job.id).progress == 0:
+            time.sleep(0.01)
+
+        assert jobs.cancel_job(job.id)
+        finished = wait_for(job.id)
+
+        assert finished.status == JobStatus.CANCELLED
+        assert finished.progress == 0.5
+        assert not jobs.cancel_job(job.id)
+
+    def test_failed_job_keeps_the_error(self):
+        """Test an exception marks the job as failed"""
+
+        @jobs.register_job("broken", "Quebrada")
+        def broken(job):
+            raise RuntimeError("sem dados")
+
+        finished = wait_for(jobs.submit_job("broken").id)
+
+        assert finished.status == JobStatus.FAILED
+        assert finished.message == "sem dados"
+
+    def test_unknown_kind(self):
+        with pytest.raises(KeyError):
+            jobs.submit_job("nada")
+
+    def test_interrupted_jobs_are_failed_at_start(self):
+        """Test jobs of a previous process do not stay running forever"""
+        with tenant_scope("ala-reinicio"):
+            job = JobRepository.create(
+                "recompute_total_points", jobs.JOB_OWNER
+            )
+            JobRepository.update(job.id, status=JobStatus.RUNNING)
+
+            assert jobs.fail_interrupted_jobs() == 1
+            job = JobRepository.get(job.id)
+
+        assert job.status == JobStatus.FAILED
+        assert job.finished_at is not None
+
+    def test_jobs_of_other_machines_are_failed_once_stale(self):
+        """Test a start leaves the jobs other machines are running alone,
+        unless those machines stopped writing to them"""
+        running = JobRepository.create("recompute_total_points", "outra")
+        JobRepository.update(running.id, status=JobStatus.RUNNING)
+        lost = JobRepository.create("recompute_total_points", "perdida")
+        JobRepository.update(
+            lost.id,
+            status=JobStatus.RUNNING,
+            heartbeat_at=time.time() - jobs.JOB_STALE_SECONDS - 1,
+        )
+
+        assert jobs.fail_interrupted_jobs() == 1
+        assert JobRepository.get(running.id).status == JobStatus.RUNNING
+        assert JobRepository.get(lost.id).status == JobStatus.FAILED
+
+
+class TestJobsPanel:
+    """Test the jobs on the admin page"""
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_recompute_button_submits_a_job(self):
+        """Test the button queues the job instead of running it inline"""
+        with (
+            patch("utils.check_password", return_value=True),
+            patch("jobs.submit_job") as mock_submit,
+        ):
+            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+            at = AppTest.from_file("pages/1_📁_Dados_da_Gincana.py")
+            at.run(timeout=10)
+            next(
+                b for b in at.button if b.label == "Atualizar Pontuação Total"
+            ).click().run(timeout=10)
+
+        assert not at.exception
+        mock_submit.assert_called_once_with("recompute_total_points")
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_panel_lists_jobs_with_cancel_button(self):
+        """Test running jobs show their progress and can be cancelled"""
+        running = MagicMock(
+            id=7,
+            kind="recompute_total_points",
+            status=JobStatus.RUNNING,
+            progress=0.4,
+            message="Maria",
+            cancel_requested=False,
+        )
+        with (
+            patch("utils.check_password", return_value=True),
+            patch("jobs.JobRepository.get_recent", return_value=[running]),
+            patch("jobs.cancel_job") as mock_cancel,
+        ):
+            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+            at = AppTest.from_file("pages/1_📁_Dados_da_Gincana.py")
+            at.run(timeout=10)
+            at.button(key="cancel_job_7").click().run(timeout=10)
+
+        assert not at.exception
+        assert at.subheader[0].value == "Tarefas em segundo plano"
+        mock_cancel.assert_called_once_with(7)
@@ -0,0 +1,117 @@
+import datetime as dt
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+import kiosk
+from database import (
+    CompiledFormDataRepository,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+)
+from tenancy import bump_data_version, tenant_scope
+
+
+class TestRenderKioskHtml:
+    """Test the static leaderboard page"""
+
+    def test_page_has_cards_ranking_and_charts(self):
+        """Test the page carries every public section"""
+        tasks = [
+            MagicMock(
+                id=1,
+                tasks="Entregar Livro de Mórmon + foto + relato no grupo",
+                points=10,
+            )
+        ]
+        youths = [
+            MagicMock(
+                id=1,
+                age=15,
+                organization="Moças",
+                total_points=30,
+            )
+        ]
+        youths[0].name = "Ana <b>"
+        compiled = [
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                quantity=3,
+                bonus=0,
+                timestamp=dt.datetime.now().timestamp(),
+            )
+        ]
+
+        page = kiosk.render_kiosk_html(youths, tasks, compiled)
+
+        assert page.startswith("<!DOCTYPE html>")
+        assert "📖 Livros de Mórmon" in page
+        assert "Ana &lt;b&gt;" in page
+        assert "Entregas Semanais de Livros de Mórmon" in page
+        assert kiosk.PLOTLY_JS in page
+        assert "dias para o fim da gincana" in page
+
+    def test_empty_page(self):
+        """Test a ward without data still gets a page"""
+        page = kiosk.render_kiosk_html([], [], [])
+
+        assert "Nenhum jovem cadastrado ainda." in page
+        assert "Totais das Atividades" not in page
+
+
+class TestKioskPublishing:
+    """Test pages are rendered to disk only when data changes"""
+
+    @pytest.fixture(autouse=True)
+    def setup_test_db(self, tmp_path):
+        """Point the database and the kiosk directory at temporary paths"""
+        self.kiosk_dir = tmp_path / "kiosk"
+        test_engine = create_engine(f"sqlite:///{tmp_path / 'kiosk.db'}")
+        SQLModel.metadata.create_all(test_engine)
+        kiosk._published.clear()
+
+        with (
+            patch("database.engine", test_engine),
+            patch("kiosk.KIOSK_DIR", self.kiosk_dir),
+        ):
+            yield
+
+    def test_publish_only_when_data_changes(self):
+        """Test the page is rewritten after a write to its ward only"""
+        with tenant_scope("ala-kiosk"):
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            task = TasksFormDataRepository.store("Ler", 10, True)
+            CompiledFormDataRepository.store(
+                youth.id, task.id, dt.datetime.now().timestamp(), 1, 0
+            )
+            YouthFormDataRepository.update_total_points(youth.id, 10)
+
+        path = kiosk.publish_kiosk("ala-kiosk")
+        assert "Maria" in path.read_text(encoding="utf-8")
+        assert (self.kiosk_dir / kiosk.PLOTLY_JS).exists()
+
+        with patch("kiosk.render_kiosk_html") as mock_render:
+            assert kiosk.publish_kiosk("ala-kiosk") == path
+            bump_data_version("outra-ala")
+            kiosk.publish_kiosk("ala-kiosk")
+            mock_render.assert_not_called()
+
+            mock_render.return_value = "<html>novo</html>"
+            bump_data_version("ala-kiosk")
+            kiosk.publish_kiosk("ala-kiosk")
+            mock_render.assert_called_once()
+        assert path.read_text(encoding="utf-8") == "<html>novo</html>"
+
+    def test_slow_ward_does_not_hold_up_others(self):
+        """Test a ward is published while another one is being rendered"""
+        with kiosk._publish_lock("ala-lenta"):
+            path = kiosk.publish_kiosk("ala-rapida")
+
+        assert path.exists()
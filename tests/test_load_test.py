@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+# Add benchmarks directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import load_test
+
+
+class TestLoadTestReport:
+    """Test the helpers of the concurrent-session load test"""
+
+    def test_parses_mix(self):
+        """Test weights are read per action, defaulting to 1"""
+        assert load_test.parse_mix("dashboard=9, register") == {
+            "dashboard": 9.0,
+            "register": 1.0,
+        }
+
+    def test_rejects_unknown_action(self):
+        """Test a typo in the mix is reported instead of ignored"""
+        with pytest.raises(ValueError, match="login"):
+            load_test.parse_mix("dashboard=1,login=1")
+
+    def test_percentiles_in_milliseconds(self):
+        """Test the percentiles of a spread of latencies"""
+        latencies = [i / 1000 for i in range(1, 101)]
+
+        result = load_test.percentiles(latencies)
+
+        assert result["p50"] == pytest.approx(50.5)
+        assert result["p95"] == pytest.approx(95.05)
+        assert result["p99"] == pytest.approx(99.01)
+
+    def test_percentiles_of_few_runs(self):
+        """Test a single run and no runs still give a report"""
+        assert load_test.percentiles([0.2]) == {
+            "p50": 200.0,
+            "p95": 200.0,
+            "p99": 200.0,
+        }
+        assert load_test.percentiles([])["p99"] == 0.0
+
+    def test_summarizes_sessions(self):
+        """Test runs, queries and memory are aggregated over sessions"""
+        mib = 1024 * 1024
+        results = [
+            {
+                "session": 0,
+                "latencies": {"dashboard": [0.1, 0.3], "register": [0.5]},
+                "queries": 6,
+                "errors": 0,
+                "rss_before": 100 * mib,
+                "rss_after": 104 * mib,
+            },
+            {
+                "session": 1,
+                "latencies": {"dashboard": [0.2]},
+                "queries": 2,
+                "errors": 1,
+                "rss_before": 100 * mib,
+                "rss_after": 102 * mib,
+            },
+        ]
+
+        summary = load_test.summarize(results, duration=2)
+
+        assert summary["sessions"] == 2
+        assert summary["runs"] == 4
+        assert summary["throughput"] == 2.0
+        assert summary["errors"] == 1
+        assert summary["queries_per_run"] == 2.0
+        assert summary["memory_per_session"] == 3 * mib
+        assert summary["latency_by_action"]["dashboard"]["runs"] == 3
+        assert summary["latency_by_action"]["register"]["p50"] == 500.0
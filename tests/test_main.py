@@ -0,0 +1,44 @@
+import os
+import sys
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main
+
+
+class TestMain:
+    """Test the container entry point"""
+
+    @patch("main.bootstrap")
+    @patch("main.start_warmup")
+    @patch("main.start_public_server")
+    @patch("main.start_change_listener")
+    @patch("main.fail_interrupted_jobs")
+    @patch("main.migrate")
+    @patch("main.start_memory_tracking")
+    def test_starts_public_server_and_dashboard(
+        self,
+        mock_start_memory_tracking,
+        mock_migrate,
+        mock_fail_interrupted_jobs,
+        mock_start_change_listener,
+        mock_start_server,
+        mock_start_warmup,
+        mock_bootstrap,
+    ):
+        """Test the public server is up and the warm-up started before
+        Streamlit takes over"""
+        main.main()
+
+        mock_start_server.assert_called_once_with()
+        mock_start_warmup.assert_called_once_with()
+        mock_migrate.assert_called_once_with()
+        mock_fail_interrupted_jobs.assert_called_once_with()
+        mock_start_change_listener.assert_called_once_with()
+        mock_start_memory_tracking.assert_called_once_with()
+        mock_bootstrap.run.assert_called_once_with(
+            main.DASHBOARD, False, [], {}
+        )
+        assert main.DASHBOARD.endswith("Dashboard.py")
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import sys
+import tracemalloc
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import memory
+from memory import MB, PAGE, memory_report, tracked
+from profiling import REPOSITORY, SECTION
+from utils import handle_database_operation
+
+
+@pytest.fixture(autouse=True)
+def clean_report():
+    """Every test starts with an empty report"""
+    memory.reset_memory_report()
+    yield
+    memory.reset_memory_report()
+
+
+@pytest.fixture
+def tracing():
+    """Traces allocations during the test"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    yield
+    if started:
+        tracemalloc.stop()
+
+
+class TestTracking:
+    """Test the accounting of pages, sections and repository calls"""
+
+    def test_nothing_is_recorded_without_tracing(self):
+        """Test the blocks are free while tracking is off"""
+        with tracked(SECTION, "Ranking"):
+            bytearray(MB)
+
+        assert memory_report().stats == {}
+        assert memory.start_page_run("Dashboard") is None
+
+    def test_start_only_when_enabled(self):
+        """Test tracing only starts with MEMORY_TRACKING=1"""
+        assert not memory.start_memory_tracking()
+        with patch("memory.MEMORY_TRACKING", True):
+            try:
+                assert memory.start_memory_tracking()
+            finally:
+                tracemalloc.stop()
+
+    def test_peak_and_retained(self, tracing):
+        """Test a freed buffer counts towards the peak only"""
+        kept = []
+        with tracked(SECTION, "Ranking"):
+            bytearray(2 * MB)
+            kept.append(bytearray(MB))
+
+        stats = memory_report().stats[(SECTION, "Ranking")]
+        assert stats.runs == 1
+        assert stats.max_peak >= 2 * MB
+        assert MB <= stats.last_retained < 2 * MB
+
+    def test_nested_blocks_keep_the_outer_peak(self, tracing):
+        """Test a nested block resetting the peak does not hide what the
+        outer block allocated before it"""
+        with tracked(SECTION, "Dados"):
+            bytearray(3 * MB)
+            handle_database_operation(lambda: None, "consulta de jovens")
+
+        stats = memory_report().stats
+        assert stats[(SECTION, "Dados")].max_peak >= 3 * MB
+        assert stats[(REPOSITORY, "consulta de jovens")].max_peak < MB
+
+    def test_page_run(self, tracing):
+        """Test a page run records its peak, the lines that retained the
+        most and the state of the session"""
+        kept = []
+        with patch("memory.MEMORY_SNAPSHOT_INTERVAL_SECONDS", 0):
+            memory.start_page_run("Dashboard")
+            with tracked(SECTION, "Ranking"):
+                bytearray(4 * MB)
+            kept.append(bytearray(MB))
+            memory.finish_page_run("sessao-1", {"tenant": "default"})
+
+        report = memory_report()
+        page = report.stats[(PAGE, "Dashboard")]
+        assert page.max_peak >= 4 * MB
+        assert page.last_retained >= MB
+        (biggest, *_) = report.page_allocations["Dashboard"]
+        assert biggest.size >= MB
+        assert biggest.location.startswith("tests/test_memory.py:")
+        assert "sessao-1" in report.sessions
+
+    def test_pages_are_compared_at_most_once_per_interval(self, tracing):
+        """Test snapshots are not taken on every run"""
+        with patch("memory.MEMORY_SNAPSHOT_INTERVAL_SECONDS", 3600):
+            first = memory.start_page_run("Dashboard")
+            memory.finish_page_run()
+            second = memory.start_page_run("Dashboard")
+            memory.finish_page_run()
+
+        assert first.snapshot is not None
+        assert second.snapshot is None
+        assert memory_report().stats[(PAGE, "Dashboard")].runs == 2
+
+    def test_threshold_is_logged(self, tracing, caplog):
+        """Test a peak over the threshold is logged"""
+        with (
+            patch("memory.MEMORY_PEAK_LOG_MB", 1),
+            caplog.at_level(logging.WARNING),
+        ):
+            with tracked(SECTION, "Gráficos"):
+                bytearray(2 * MB)
+
+        assert "Seção 'Gráficos' peaked at" in caplog.text
+
+    def test_memory_by_package(self, tracing):
+        """Test traced memory is grouped by package, largest first"""
+        kept = bytearray(2 * MB)
+
+        sizes = memory.memory_by_package()
+
+        assert kept
+        assert sizes
+        assert [size for _, size in sizes] == sorted(
+            (size for _, size in sizes), reverse=True
+        )
+
+    def test_package_of(self):
+        """Test files are attributed to the app or to their package"""
+        assert memory._package_of(memory.__file__) == "app"
+        site_packages = os.path.dirname(os.path.dirname(pytest.__file__))
+        pandas_file = os.path.join(site_packages, "pandas", "core", "frame.py")
+        with patch.object(sys, "path", [site_packages]):
+            assert memory._package_of(pandas_file) == "pandas"
+
+
+class TestSessionState:
+    """Test the size of the state kept by each session"""
+
+    def test_deep_sizeof(self):
+        """Test nested values are counted once, even in cycles"""
+        inner = ["x" * 1000]
+        state = {"a": inner, "b": inner}
+        state["self"] = state
+
+        size = memory.deep_sizeof(state)
+
+        assert 1000 < size < 3000
+
+    def test_sessions_are_bounded_and_logged(self, caplog):
+        """Test only the latest sessions are kept and big ones logged"""
+        with (
+            patch("memory.MEMORY_MAX_SESSIONS", 2),
+            patch("memory.SESSION_STATE_LOG_MB", 0.001),
+            caplog.at_level(logging.WARNING),
+        ):
+            memory.record_session_state("a", {})
+            memory.record_session_state("b", {})
+            memory.record_session_state("c", {"dados": "x" * 5000})
+
+        assert list(memory_report().sessions) == ["b", "c"]
+        assert "Session c keeps" in caplog.text
+
+
+class TestDiagnosticsPage:
+    """Test the diagnostics page"""
+
+    def run_page(self):
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("pages/3_🩺_Diagnóstico.py")
+        at.session_state["password_correct"] = True
+        at.run(timeout=10)
+        return at
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_explains_how_to_enable(self):
+        """Test the page says how to turn tracking on"""
+        at = self.run_page()
+
+        assert not at.exception
+        assert at.title[0].value == "Diagnóstico de Memória"
+        assert "MEMORY_TRACKING=1" in at.info[0].value
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_shows_readiness_details(self):
+        """Test the readiness state hidden from the public port is shown"""
+        at = self.run_page()
+
+        assert not at.exception
+        assert "Prontidão do Processo" in [h.value for h in at.header]
+        assert "pool" in json.loads(at.json[0].value)
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_summarizes_tracked_memory(self, tracing):
+        """Test the recorded pages, sections and sessions are listed"""
+        memory.record_memory(SECTION, "Ranking", 3 * MB, MB)
+        memory.record_session_state("sessao-1", {"tenant": "default"})
+
+        at = self.run_page()
+        at.button[0].click().run(timeout=10)
+
+        assert not at.exception
+        headers = [h.value for h in at.header]
+        assert "Páginas, Seções e Consultas" in headers
+        assert "Estado das Sessões" in headers
+        assert len(at.dataframe) == 3
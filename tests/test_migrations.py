@@ -0,0 +1,240 @@
+import logging
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import SQLModel
+
+import migrations
+from database import CompiledFormData, create_database_engine
+from migrations import (
+    MIGRATIONS,
+    declared_index,
+    index_statement,
+    migrate,
+    pending_migrations,
+)
+
+# Schema of the first release, before any migration
+FIRST_RELEASE_SCHEMA = (
+    "CREATE TABLE youthformdata (id INTEGER PRIMARY KEY, name VARCHAR NOT "
+    "NULL, age INTEGER NOT NULL, organization VARCHAR NOT NULL, "
+    "total_points INTEGER NOT NULL)",
+    "CREATE TABLE tasksformdata (id INTEGER PRIMARY KEY, tasks VARCHAR NOT "
+    "NULL, points INTEGER NOT NULL, repeatable BOOLEAN NOT NULL)",
+    "CREATE TABLE compiledformdata (id INTEGER PRIMARY KEY, youth_id "
+    "INTEGER NOT NULL REFERENCES youthformdata (id), task_id INTEGER NOT "
+    "NULL REFERENCES tasksformdata (id), timestamp FLOAT NOT NULL, "
+    "quantity INTEGER NOT NULL, bonus INTEGER NOT NULL)",
+)
+
+NOON = datetime(2025, 9, 7, 12).timestamp()
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A database of the first release with a few entries, two of them of
+    a non-repeatable task on the same day"""
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in FIRST_RELEASE_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO youthformdata VALUES (1, 'Ana', 15, 'Moças', 30)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO tasksformdata VALUES (1, 'Batismo', 10, 0), "
+            "(2, 'Visitar', 5, 1)"
+        )
+        connection.execute(
+            text(
+                "INSERT INTO compiledformdata VALUES "
+                "(1, 1, 1, :noon, 1, 0), (2, 1, 1, :later, 1, 0), "
+                "(3, 1, 2, :noon, 2, 0), (4, 1, 1, :next_day, 1, 0)"
+            ),
+            {"noon": NOON, "later": NOON + 60, "next_day": NOON + 86400},
+        )
+    return engine
+
+
+def columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def indexes(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+class TestMigrate:
+    """Test the migrations bring any database up to the models"""
+
+    def test_first_release_database_is_brought_up_to_date(self, legacy_engine):
+        """Test the columns, tables and indexes added since the first
+        release are created and the existing rows filled"""
+        assert migrate(legacy_engine) == [m.version for m in MIGRATIONS]
+
+        assert {
+            "idempotency_key",
+            "day_bucket",
+            "season_id",
+            "tenant_id",
+        } <= columns(legacy_engine, "compiledformdata")
+        assert "ix_compiledformdata_non_repeatable_daily" in indexes(
+            legacy_engine, "compiledformdata"
+        )
+        assert "ix_youthformdata_tenant" in indexes(
+            legacy_engine, "youthformdata"
+        )
+        assert {
+            "season",
+            "seasonsummary",
+            "job",
+            "datachange",
+            "agg_task_totals",
+        } <= set(inspect(legacy_engine).get_table_names())
+        assert {"owner", "heartbeat_at"} <= columns(legacy_engine, "job")
+        with legacy_engine.connect() as connection:
+            rows = connection.exec_driver_sql(
+                "SELECT id, day_bucket, tenant_id FROM compiledformdata "
+                "ORDER BY id"
+            ).all()
+        day = datetime(2025, 9, 7).toordinal()
+        # The second entry of the same day keeps no bucket, and
+        # repeatable tasks never get one
+        assert rows == [
+            (1, day, "default"),
+            (2, None, "default"),
+            (3, None, "default"),
+            (4, day + 1, "default"),
+        ]
+
+    def test_every_model_change_has_a_migration(self, legacy_engine):
+        """Test a migrated first release database has every table, column
+        and index of the models, so no schema change relies on create_all"""
+        migrate(legacy_engine)
+
+        tables = set(inspect(legacy_engine).get_table_names())
+        for table in SQLModel.metadata.sorted_tables:
+            assert table.name in tables
+            assert {c.name for c in table.columns} <= columns(
+                legacy_engine, table.name
+            ), table.name
+            assert {i.name for i in table.indexes} <= indexes(
+                legacy_engine, table.name
+            ), table.name
+
+    def test_applied_migrations_are_not_run_again(self, legacy_engine):
+        """Test a second run has nothing left to do"""
+        migrate(legacy_engine)
+
+        assert pending_migrations(legacy_engine) == []
+        assert migrate(legacy_engine) == []
+
+    def test_new_database_only_records_the_versions(self, tmp_path):
+        """Test a database create_all built has every step already done"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+        SQLModel.metadata.create_all(engine)
+        before = {
+            table: indexes(engine, table)
+            for table in inspect(engine).get_table_names()
+        }
+
+        assert len(migrate(engine)) == len(MIGRATIONS)
+        for table, names in before.items():
+            assert indexes(engine, table) == names
+
+    def test_failed_migration_is_run_again(self, legacy_engine):
+        """Test a migration failing halfway is not recorded, and applying
+        it again completes it"""
+        with (
+            patch.object(
+                migrations,
+                "MIGRATIONS",
+                MIGRATIONS[:3]
+                + (
+                    migrations.Migration(
+                        4,
+                        "tenants",
+                        lambda engine: 1 / 0,
+                    ),
+                ),
+            ),
+            pytest.raises(ZeroDivisionError),
+        ):
+            migrate(legacy_engine)
+
+        assert [m.version for m in pending_migrations(legacy_engine)] == [
+            4,
+            5,
+            6,
+            7,
+            8,
+        ]
+        assert migrate(legacy_engine) == [4, 5, 6, 7, 8]
+
+
+class TestBackfill:
+    """Test derived columns are filled without long transactions"""
+
+    def test_rows_are_filled_in_batches(self, legacy_engine):
+        """Test the day buckets are written a batch at a time"""
+        migrations.add_column(
+            legacy_engine,
+            CompiledFormData.__table__,
+            "day_bucket",
+            "INTEGER",
+        )
+
+        with patch("migrations.MIGRATION_BATCH_PAUSE_SECONDS", 0):
+            batches = migrations.backfill(
+                legacy_engine,
+                migrations._select_day_buckets,
+                migrations._apply_day_buckets,
+                batch_size=1,
+            )
+
+        assert batches == 3
+        assert (
+            migrations.add_column(
+                legacy_engine,
+                CompiledFormData.__table__,
+                "day_bucket",
+                "INTEGER",
+            )
+            is False
+        )
+
+
+class TestPostgres:
+    """Test the statements sent to Postgres"""
+
+    def test_indexes_are_built_concurrently(self):
+        """Test the declared indexes are built without blocking writes"""
+        engine = create_engine("postgresql://localhost/gincana")
+        index = declared_index(
+            CompiledFormData.__table__,
+            "ix_compiledformdata_non_repeatable_daily",
+        )
+
+        assert index_statement(index, engine) == (
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+            "ix_compiledformdata_non_repeatable_daily ON compiledformdata "
+            "(youth_id, task_id, day_bucket) WHERE day_bucket IS NOT NULL"
+        )
+
+    def test_release_fails_without_postgres(self, caplog):
+        """Test the release command fails rather than migrating the SQLite
+        fallback when Postgres cannot be reached"""
+        with (
+            patch("database.POSTGRES_URL", "postgresql://localhost/gincana"),
+            caplog.at_level(logging.ERROR),
+        ):
+            assert migrations.main() == 1
+
+        assert "could not be reached" in caplog.text
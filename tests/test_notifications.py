@@ -0,0 +1,164 @@
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import Session, SQLModel, select
+
+import notifications
+from database import (
+    DataChange,
+    YouthFormDataRepository,
+    create_database_engine,
+)
+from notifications import ChangeListener, ChangeNotice, publish_change
+from tenancy import get_data_version, tenant_scope
+
+TENANT = "ala-notificada"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A SQLite file shared by this process and a pretend second machine"""
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    SQLModel.metadata.create_all(engine)
+    with patch("database.engine", engine):
+        yield engine
+
+
+def publish_from_other_machine(tenant=TENANT, table="youthformdata"):
+    with patch("notifications.ORIGIN", "outra-maquina"):
+        publish_change(tenant, table)
+
+
+def data_changes(engine):
+    with Session(engine) as session:
+        return session.exec(select(DataChange)).all()
+
+
+class TestPublishing:
+    """Test the writes are announced to the other processes"""
+
+    def test_writes_are_published_with_their_table(self, engine):
+        """Test a repository write appends a change with its ward and
+        table"""
+        with (
+            patch("tenancy._change_listeners", [publish_change]),
+            tenant_scope(TENANT),
+        ):
+            YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+
+        (change,) = data_changes(engine)
+        assert (change.tenant_id, change.table_name) == (
+            TENANT,
+            "youthformdata",
+        )
+        assert change.origin == notifications.ORIGIN
+
+    def test_failures_do_not_break_the_write(self, engine, caplog):
+        """Test a change that cannot be published is only logged"""
+        SQLModel.metadata.drop_all(engine, tables=[DataChange.__table__])
+        with caplog.at_level(logging.ERROR):
+            publish_change(TENANT, "youthformdata")
+
+        assert "Publishing the change" in caplog.text
+
+    def test_payload_round_trip(self):
+        """Test a notice survives the NOTIFY payload"""
+        notice = ChangeNotice(TENANT, "season", "maquina-1")
+
+        assert ChangeNotice.from_payload(notice.to_payload()) == notice
+
+
+class TestListening:
+    """Test the writes of other processes invalidate the caches here"""
+
+    def test_polling_applies_other_machines_writes(self, engine):
+        """Test a change of another machine bumps the ward's version,
+        while the changes of this process are ignored"""
+        listener = ChangeListener(engine)
+        listener.poll()
+        before = get_data_version(TENANT)
+
+        publish_change(TENANT, "youthformdata")
+        listener.poll()
+        assert get_data_version(TENANT) == before
+
+        publish_from_other_machine()
+        listener.poll()
+        assert get_data_version(TENANT) == before + 1
+        assert listener.state()["received"] == 1
+
+    def test_only_new_changes_are_applied(self, engine):
+        """Test changes made before the listener started are skipped"""
+        publish_from_other_machine()
+        listener = ChangeListener(engine)
+        before = get_data_version(TENANT)
+
+        listener.poll()
+        listener.poll()
+
+        assert get_data_version(TENANT) == before
+
+    def test_old_changes_are_pruned(self, engine):
+        """Test the change table does not grow forever"""
+        listener = ChangeListener(engine)
+        listener.poll()
+        publish_from_other_machine()
+
+        with patch("notifications.NOTIFY_RETENTION_SECONDS", 0):
+            listener.poll()
+
+        assert data_changes(engine) == []
+
+    def test_changes_arrive_within_a_second(self, engine):
+        """Test the background listener applies a change quickly"""
+        listener = ChangeListener(engine)
+        with patch("notifications.NOTIFY_POLL_SECONDS", 0.05):
+            listener.start()
+            try:
+                time.sleep(0.2)
+                before = get_data_version(TENANT)
+                publish_from_other_machine()
+                deadline = time.monotonic() + 1
+                while (
+                    get_data_version(TENANT) == before
+                    and time.monotonic() < deadline
+                ):
+                    time.sleep(0.01)
+                assert listener.state()["running"]
+            finally:
+                listener.stop()
+
+        assert get_data_version(TENANT) == before + 1
+        assert listener.state()["mode"] == "poll"
+
+    def test_postgres_notifications_are_drained(self, engine, caplog):
+        """Test the notifications received by a LISTEN connection are
+        applied and malformed ones skipped"""
+        listener = ChangeListener(engine)
+        before = get_data_version(TENANT)
+        connection = SimpleNamespace(
+            poll=lambda: None,
+            notifies=[
+                SimpleNamespace(
+                    payload=ChangeNotice(
+                        TENANT, "season", "outra-maquina"
+                    ).to_payload()
+                ),
+                SimpleNamespace(payload="{}"),
+            ],
+        )
+
+        with caplog.at_level(logging.ERROR):
+            listener.drain(connection)
+
+        assert connection.notifies == []
+        assert get_data_version(TENANT) == before + 1
+        assert "Ignoring notification {}" in caplog.text
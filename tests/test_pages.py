@@ -779,3 +779,39 @@ class TestPageErrorHandling:
         # Test the conditional logic for None task
         is_repeatable = selected_task.repeatable if selected_task else True
         assert is_repeatable is True  # Default when task is None
+
+
+class TestRegistroTarefasDoubleSubmit:
+    """Test a form submitted twice only registers one entry"""
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_same_form_submitted_twice_stores_one_entry(self, tmp_path):
+        """Test a second submission of a form already stored, arriving
+        after the first run finished, does not store the entry again"""
+        from sqlmodel import SQLModel
+
+        from database import (
+            CompiledFormDataRepository,
+            TasksFormDataRepository,
+            YouthFormDataRepository,
+            create_database_engine,
+        )
+
+        # A file, so the page running on another thread sees the same data
+        engine = create_database_engine(f"sqlite:///{tmp_path / 'form.db'}")
+        SQLModel.metadata.create_all(engine)
+        with patch("database.engine", engine):
+            YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+            TasksFormDataRepository.store("Visitar", 5, True)
+            os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+            at = AppTest.from_file("pages/2_📝_Registro_das_Tarefas.py")
+            at.session_state["password_correct"] = True
+            at.run(timeout=10)
+
+            # A double-click sends the browser's state of the form twice
+            states = at.button[0].click().root.get_widget_states()
+            at._run(states, timeout=10)
+            at._run(states, timeout=10)
+
+            assert not at.exception
+            assert len(CompiledFormDataRepository.get_all()) == 1
@@ -0,0 +1,269 @@
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import profiling
+import sections
+from profiling import (
+    COMPUTATION,
+    REPOSITORY,
+    SECTION,
+    PageProfile,
+    ProfileMode,
+    StackSampler,
+    timed,
+)
+from utils import handle_database_operation
+
+
+def busy(seconds):
+    """Keeps the thread on the CPU, so the sampler finds it there"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profile():
+    """A sampling profile installed as the profile of the current run"""
+    page_profile = PageProfile("Teste", ProfileMode.SAMPLING)
+    token = profiling._current_profile.set(page_profile)
+    page_profile.start()
+    yield page_profile
+    page_profile.stop()
+    profiling._current_profile.reset(token)
+
+
+class TestStackSampler:
+    """Test the sampler behind the flame graphs"""
+
+    def test_samples_followed_threads(self):
+        """Test the stacks of the followed threads are counted by name"""
+        sampler = StackSampler(0.001, 60)
+        sampler.follow(threading.get_ident())
+
+        sampler.sample()
+        sampler.sample()
+
+        (thread_name,) = sampler.samples
+        assert thread_name == threading.current_thread().name
+        (stack,) = sampler.samples[thread_name]
+        assert sampler.samples[thread_name][stack] == 2
+        # Stacks start at the first frame of the app, not at pytest
+        assert stack[-1].startswith("sample (profiling.py:")
+
+    def test_unfollowed_threads_are_not_sampled(self):
+        """Test a thread is no longer sampled once its work is over"""
+        sampler = StackSampler(0.001, 60)
+        thread_id = threading.get_ident()
+        sampler.follow(thread_id)
+        sampler.follow(thread_id)
+        sampler.unfollow(thread_id)
+        sampler.sample()
+        sampler.unfollow(thread_id)
+        sampler.sample()
+
+        assert sum(sum(s.values()) for s in sampler.samples.values()) == 1
+
+    def test_exports(self):
+        """Test the folded stacks and the speedscope file"""
+        sampler = StackSampler(0.01, 60)
+        sampler.samples = {
+            "MainThread": {("a", "b"): 3, ("a",): 1},
+            "section_0": {("c",): 2},
+        }
+
+        assert sampler.folded() == (
+            "MainThread;a;b 3\nMainThread;a 1\nsection_0;c 2\n"
+        )
+        document = sampler.speedscope("Dashboard")
+        assert [f["name"] for f in document["shared"]["frames"]] == [
+            "a",
+            "b",
+            "c",
+        ]
+        main, section = document["profiles"]
+        assert main["samples"] == [[0, 1], [0]]
+        assert main["weights"] == pytest.approx([0.03, 0.01])
+        assert section["name"] == "section_0"
+        assert section["samples"] == [[2]]
+
+        top = {stat.function: stat for stat in sampler.top_functions()}
+        assert top["a"].total_seconds == pytest.approx(0.04)
+        assert top["a"].self_seconds == pytest.approx(0.01)
+        assert top["b"].self_seconds == pytest.approx(0.03)
+
+    def test_stops_by_itself(self):
+        """Test a sampler left running stops after its maximum time"""
+        sampler = StackSampler(0.001, 0.02)
+        sampler.start()
+        sampler._thread.join(timeout=2)
+
+        assert not sampler._thread.is_alive()
+
+
+class TestTimings:
+    """Test the timings recorded while a profile runs"""
+
+    def test_nothing_is_recorded_without_a_profile(self):
+        """Test timing a block outside a profiled run is a no-op"""
+        with timed(REPOSITORY, "consulta"):
+            pass
+
+        assert profiling._current_profile.get() is None
+
+    def test_repository_calls_are_timed(self, profile):
+        """Test database operations are recorded by name"""
+        handle_database_operation(lambda: 1, "consulta de jovens")
+        handle_database_operation(lambda: 2, "consulta de jovens")
+
+        ((name, calls, seconds),) = profile.timings_of(REPOSITORY)
+        assert (name, calls) == ("consulta de jovens", 2)
+        assert seconds >= 0
+
+    def test_section_threads_are_timed_and_sampled(self, profile):
+        """Test work submitted to the section executor lands in the profile
+        of the run that submitted it"""
+        sections.submit_section(busy, 0.05).result()
+        with profiling.section("Ranking"):
+            busy(0.02)
+        profile.stop()
+
+        assert profile.timings_of(COMPUTATION)[0][:2] == ("busy", 1)
+        assert profile.timings_of(SECTION)[0][:2] == ("Ranking", 1)
+        threads = set(profile.sampler.samples)
+        assert any(name.startswith("section") for name in threads)
+        functions = [stat.function for stat in profile.top_functions()]
+        assert any(name.startswith("busy (") for name in functions)
+
+    def test_cprofile_mode(self):
+        """Test the deterministic mode reports call counts"""
+        page_profile = PageProfile("Teste", ProfileMode.CPROFILE)
+        page_profile.start()
+        for _ in range(3):
+            busy(0.001)
+        page_profile.stop()
+
+        busy_stat = next(
+            stat
+            for stat in page_profile.top_functions()
+            if stat.function.startswith("busy (")
+        )
+        assert busy_stat.calls == 3
+        assert busy_stat.total_seconds >= 0.003
+        # The download is a pstats dump
+        assert marshal.loads(marshal.dumps(page_profile.profiler.stats))
+
+    def test_second_cprofile_falls_back_to_sampling(self):
+        """Test a run asking for cProfile while another holds it is
+        sampled instead of failing"""
+        first = PageProfile("Teste", ProfileMode.CPROFILE)
+        second = PageProfile("Teste", ProfileMode.CPROFILE)
+        first.start()
+        try:
+            second.start()
+            second.stop()
+        finally:
+            first.stop()
+
+        assert first.mode is ProfileMode.CPROFILE
+        assert second.mode is ProfileMode.SAMPLING
+        assert second.sampler is not None
+        assert not profiling._cprofile_lock.locked()
+
+    def test_cprofile_stops_by_itself(self):
+        """Test a cProfile left running by a stopped run is disabled and
+        released after its maximum time"""
+        with patch("profiling.PROFILE_MAX_SECONDS", 0.02):
+            page_profile = PageProfile("Teste", ProfileMode.CPROFILE)
+            page_profile.start()
+        deadline = time.monotonic() + 2
+        while profiling._cprofile_lock.locked():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        page_profile.stop()
+        assert page_profile.profiler.stats is not None
+
+
+class TestProfileToggle:
+    """Test the profile report of the pages"""
+
+    def run_dashboard(self, query, logged_in):
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("Dashboard.py")
+        at.query_params.update(query)
+        if logged_in:
+            at.session_state["password_correct"] = True
+        youth = MagicMock(
+            id=1, name="Maria", organization="Moças", total_points=10
+        )
+        with patch(
+            "async_database.load_game_data", return_value=([youth], [], [])
+        ):
+            at.run(timeout=10)
+        return at
+
+    def test_report_for_authenticated_sessions(self):
+        """Test ?profile=1 shows the report and the downloads"""
+        at = self.run_dashboard({"profile": "1"}, logged_in=True)
+
+        assert not at.exception
+        assert at.expander[-1].label == "⏱️ Perfil da página"
+        subheaders = [s.value for s in at.subheader]
+        assert "Funções mais lentas" in subheaders
+        assert "Seções" in subheaders
+        downloads = at.get("download_button")
+        assert len(downloads) == 2
+
+    def test_cprofile_report(self):
+        """Test ?profile=cprofile offers a pstats download"""
+        at = self.run_dashboard({"profile": "cprofile"}, logged_in=True)
+
+        assert not at.exception
+        assert at.expander[-1].label == "⏱️ Perfil da página"
+        assert len(at.get("download_button")) == 1
+
+    def test_busy_cprofile_warns_and_samples(self):
+        """Test the page says it was sampled while cProfile is taken"""
+        with profiling._cprofile_lock:
+            at = self.run_dashboard({"profile": "cprofile"}, logged_in=True)
+
+        assert not at.exception
+        assert "amostragem" in at.warning[0].value
+        assert len(at.get("download_button")) == 2
+
+    @pytest.mark.parametrize(
+        "query,logged_in",
+        [({"profile": "1"}, False), ({}, True), ({"profile": "x"}, True)],
+    )
+    def test_no_report(self, query, logged_in):
+        """Test the report needs both the password and a known mode"""
+        at = self.run_dashboard(query, logged_in)
+
+        assert not at.exception
+        assert not any(e.label == "⏱️ Perfil da página" for e in at.expander)
+
+
+class TestSpeedscopeDocument:
+    """Test the downloaded file loads as JSON"""
+
+    def test_serializes(self, profile):
+        """Test a real profile exports without custom types"""
+        busy(0.02)
+        profile.stop()
+
+        document = json.loads(
+            json.dumps(profile.sampler.speedscope(profile.page))
+        )
+        assert document["profiles"][0]["type"] == "sampled"
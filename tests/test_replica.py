@@ -0,0 +1,135 @@
+import os
+import sys
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import SQLModel
+
+import database
+from async_database import AsyncYouthFormDataRepository, run_async
+from database import YouthFormDataRepository, create_database_engine
+from replica import ReplicaRouter
+from tenancy import bump_data_version, tenant_scope
+
+TENANT = "ala-replica"
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """A primary and a replica with different youths, so each read shows
+    where it went"""
+    primary = create_database_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_database_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "Primária"), (replica, "Réplica")):
+        SQLModel.metadata.create_all(engine)
+        with (
+            patch("database.engine", engine),
+            patch("database.replica_router", None),
+            tenant_scope(TENANT),
+        ):
+            YouthFormDataRepository.store(name, 15, "Moças", 0)
+    return primary, replica
+
+
+@pytest.fixture
+def router(engines):
+    primary, replica = engines
+    router = ReplicaRouter(replica, sticky_seconds=0)
+    with (
+        patch("database.engine", primary),
+        patch("database.replica_router", router),
+        tenant_scope(TENANT),
+    ):
+        yield router
+
+
+def names(youths):
+    return [youth.name for youth in youths]
+
+
+class TestReplicaRouter:
+    """Test which engine the reads go to"""
+
+    def test_reads_go_to_the_replica(self, router):
+        """Test the pages and the snapshot read from the replica"""
+        assert names(YouthFormDataRepository.get_all()) == ["Réplica"]
+        assert names(run_async(AsyncYouthFormDataRepository.get_all())) == [
+            "Réplica"
+        ]
+        assert router.state()["replica_reads"] == 2
+
+    def test_writes_stay_on_the_primary(self, router):
+        """Test a write never goes to the replica"""
+        YouthFormDataRepository.store("Nova", 15, "Moças", 0)
+
+        with patch.object(router, "sticky_seconds", 0):
+            assert names(YouthFormDataRepository.get_all()) == ["Réplica"]
+        with patch("database.replica_router", None):
+            assert sorted(names(YouthFormDataRepository.get_all())) == [
+                "Nova",
+                "Primária",
+            ]
+
+    def test_ward_that_just_wrote_reads_its_writes(self, router):
+        """Test the ward reads from the primary right after a write, while
+        the other wards keep using the replica"""
+        router.sticky_seconds = 60
+        bump_data_version()
+
+        assert names(YouthFormDataRepository.get_all()) == ["Primária"]
+        with tenant_scope("ala-sem-escritas"):
+            assert router.choose(database.engine) is router.replica
+
+    def test_lagging_replica_is_skipped(self, router):
+        """Test reads go to the primary while the replica is behind"""
+        with patch.object(router, "measure_lag", return_value=30.0):
+            assert names(YouthFormDataRepository.get_all()) == ["Primária"]
+
+        assert router.state()["lag_seconds"] == 30.0
+        assert not router.state()["available"]
+
+    def test_lag_is_measured_once_per_interval(self, router):
+        """Test reads reuse the last measure of the lag"""
+        with patch.object(router, "measure_lag", return_value=0.0) as lag:
+            for _ in range(3):
+                YouthFormDataRepository.get_all()
+
+        assert lag.call_count == 1
+
+    def test_failed_replica_falls_back_to_the_primary(self, router):
+        """Test a read failing on the replica runs again on the primary,
+        and the replica is skipped until the retry delay is over"""
+        router.check()
+        with router.replica.begin() as connection:
+            connection.exec_driver_sql("DROP TABLE youthformdata")
+
+        assert names(YouthFormDataRepository.get_all()) == ["Primária"]
+        assert router.state()["error"]
+        assert router.choose(database.engine) is database.engine
+        with patch.object(router, "retry_seconds", 0):
+            router.mark_down(RuntimeError("sem conexão"))
+            with patch.object(router, "measure_lag", return_value=0.0):
+                assert router.choose(database.engine) is router.replica
+
+    def test_unreachable_replica_is_skipped(self, router):
+        """Test a replica that cannot be measured is not read from"""
+        with patch.object(
+            router, "measure_lag", side_effect=OSError("sem rota")
+        ):
+            assert names(YouthFormDataRepository.get_all()) == ["Primária"]
+
+        assert router.state()["error"] == "sem rota"
+
+    def test_without_replica_everything_reads_the_primary(self, engines):
+        """Test nothing changes until a replica is configured"""
+        primary, _ = engines
+        with (
+            patch("database.engine", primary),
+            tenant_scope(TENANT),
+        ):
+            assert database.replica_state() is None
+            assert database.read_engine() is primary
+            assert names(YouthFormDataRepository.get_all()) == ["Primária"]
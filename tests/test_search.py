@@ -0,0 +1,168 @@
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+from streamlit.testing.v1 import AppTest
+
+import search
+from database import YouthFormDataRepository
+from search import NameIndex, get_youth_index, normalize
+from tenancy import bump_data_version, tenant_scope
+
+
+def youths(*names):
+    return [
+        SimpleNamespace(
+            id=i,
+            name=name,
+            age=15,
+            organization="Moças",
+            total_points=0,
+        )
+        for i, name in enumerate(names, start=1)
+    ]
+
+
+def names(rows):
+    return [row.name for row in rows]
+
+
+@pytest.fixture(autouse=True)
+def clean_indexes():
+    """Every test builds its own indexes"""
+    search.clear_search_indexes()
+    yield
+    search.clear_search_indexes()
+
+
+@pytest.fixture
+def test_engine(tmp_path):
+    # A file, so the page running on another thread sees the same data
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    SQLModel.metadata.create_all(engine)
+    with patch("database.engine", engine):
+        yield engine
+
+
+class TestNameIndex:
+    """Test the search over the names of the youths"""
+
+    def test_normalize(self):
+        """Test accents, case and extra spaces are ignored"""
+        assert normalize("  JOÃO   da Conceição ") == "joao da conceicao"
+
+    def test_every_word_must_start_a_word_of_the_name(self):
+        """Test each typed word matches the start of a word of the name,
+        accent and case insensitively"""
+        index = NameIndex(
+            youths("Maria da Silva", "Mário Souza", "Ana Maria", "Joana")
+        )
+
+        assert names(index.search("ma sil")) == ["Maria da Silva"]
+        assert names(index.search("MARI")) == [
+            "Maria da Silva",
+            "Mário Souza",
+            "Ana Maria",
+        ]
+        # Joana only shares trigrams with the query, so it comes last
+        assert names(index.search("ana")) == ["Ana Maria", "Joana"]
+
+    def test_typos_fall_back_to_trigrams(self):
+        """Test a misspelled name is still found, after the prefix
+        matches"""
+        index = NameIndex(youths("João Silva", "Pedro Santos"))
+
+        assert names(index.search("Joao Slva")) == ["João Silva"]
+        assert index.search("xyz") == []
+
+    def test_only_the_best_matches_are_returned(self):
+        """Test the results are limited and an empty query lists the
+        first names alphabetically"""
+        index = NameIndex(youths(*(f"Jovem {i}" for i in range(1, 101))))
+
+        assert names(index.search("jovem 1", limit=3)) == [
+            "Jovem 1",
+            "Jovem 10",
+            "Jovem 100",
+        ]
+        assert len(index.search("", limit=20)) == 20
+        assert index.get(42).name == "Jovem 42"
+        assert index.get(999) is None
+
+
+class TestYouthIndex:
+    """Test the index kept for each ward"""
+
+    def test_rebuilt_after_writes(self, test_engine):
+        """Test the index is reused until the ward's data changes"""
+        YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        first = get_youth_index()
+
+        assert get_youth_index() is first
+        YouthFormDataRepository.store("Bruno", 16, "Rapazes", 0)
+        second = get_youth_index()
+        assert second is not first
+        assert names(second.search("")) == ["Ana", "Bruno"]
+
+    def test_kept_across_writes_to_other_tables(self, test_engine):
+        """Test entries and aggregate refreshes do not rebuild the index,
+        while a write announced by another machine does"""
+        YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        first = get_youth_index()
+
+        bump_data_version(table="compiledformdata")
+        bump_data_version(table="aggregates")
+        assert get_youth_index() is first
+
+        bump_data_version(table="youthformdata", publish=False)
+        assert get_youth_index() is not first
+
+    def test_rebuilt_once_old(self, test_engine):
+        """Test an old index is built again to see other machines' writes"""
+        YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        first = get_youth_index()
+
+        with patch("search.SEARCH_INDEX_MAX_AGE_SECONDS", 0):
+            assert get_youth_index() is not first
+
+    def test_one_index_per_ward(self, test_engine):
+        """Test wards do not see each other's youths"""
+        with tenant_scope("ala-1"):
+            YouthFormDataRepository.store("Ana", 15, "Moças", 0)
+        with tenant_scope("ala-2"):
+            assert len(get_youth_index()) == 0
+        with tenant_scope("ala-1"):
+            assert names(get_youth_index().search("an")) == ["Ana"]
+
+
+class TestYouthPicker:
+    """Test the youth picker of the registration page"""
+
+    @patch.dict(os.environ, {"AUTH": "test_password"})
+    def test_only_matches_are_sent_to_the_browser(self, test_engine):
+        """Test the picker offers the matches of the search only"""
+        for name in ("Ana", "Bruno", "Bianca"):
+            YouthFormDataRepository.store(name, 15, "Moças", 0)
+        os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
+        at = AppTest.from_file("pages/2_📝_Registro_das_Tarefas.py")
+        at.session_state["password_correct"] = True
+
+        with patch("search.SEARCH_RESULTS_LIMIT", 2):
+            at.run(timeout=10)
+            assert at.selectbox[0].options == ["Ana", "Bianca"]
+            assert any(
+                "Mostrando 2 de 3 jovens" in caption.value
+                for caption in at.caption
+            )
+
+            at.text_input[0].input("bru").run(timeout=10)
+
+        assert not at.exception
+        assert at.selectbox[0].options == ["Bruno"]
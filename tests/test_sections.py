@@ -0,0 +1,176 @@
+import datetime as dt
+import os
+import sys
+from unittest.mock import MagicMock
+
+from freezegun import freeze_time
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import sections
+from tenancy import get_current_tenant, tenant_scope
+
+
+class TestSectionExecutor:
+    """Test the thread pool shared by the Dashboard sections"""
+
+    def test_executor_is_shared_and_bounded(self):
+        """Test that every caller gets the same bounded pool"""
+        executor = sections.get_section_executor()
+
+        assert executor is sections.get_section_executor()
+        assert executor._max_workers == sections.SECTION_WORKERS
+        assert executor.submit(lambda: 21 * 2).result() == 42
+
+    def test_sections_run_in_the_submitting_tenant(self):
+        """Test that section threads see the tenant of the session"""
+        with tenant_scope("ala-norte"):
+            future = sections.submit_section(get_current_tenant)
+
+        assert future.result() == "ala-norte"
+
+
+class TestSectionBuilders:
+    """Test the pure computations behind each Dashboard section"""
+
+    def test_task_points_and_chart(self):
+        """Test points per task include bonus and feed the pie chart"""
+        tasks = [
+            MagicMock(id=1, tasks="Ler", points=10),
+            MagicMock(id=2, tasks="Visitar", points=5),
+        ]
+        compiled = [
+            MagicMock(task_id=1, quantity=2, bonus=1),
+            MagicMock(task_id=2, quantity=1, bonus=0),
+            MagicMock(task_id=3, quantity=1, bonus=0),  # Unknown task
+        ]
+
+        task_points = sections.calculate_task_points(compiled, tasks)
+        chart = sections.build_task_points_chart(task_points)
+
+        assert task_points == {"Ler": 21, "Visitar": 5}
+        assert list(chart.data[0].values) == [21, 5]
+
+    def test_organization_points_and_chart(self):
+        """Test points per organization feed the bar chart"""
+        youths = [
+            MagicMock(organization="Rapazes", total_points=10),
+            MagicMock(organization="Moças", total_points=15),
+            MagicMock(organization="Rapazes", total_points=5),
+        ]
+
+        points = sections.calculate_organization_points(youths)
+        chart = sections.build_organization_chart(*points)
+
+        assert points == (15, 15)
+        assert list(chart.data[0].y) == [15, 15]
+
+    def test_ranking_dataframe(self):
+        """Test the ranking table numbers youths in the given order"""
+        youths = [
+            MagicMock(age=16, organization="Moças", total_points=9),
+            MagicMock(age=15, organization="Rapazes", total_points=3),
+        ]
+
+        df = sections.build_ranking_dataframe(youths)
+
+        assert list(df["Ranking"]) == [1, 2]
+        assert list(df["Pontuação Total"]) == [9, 3]
+
+    def test_charts_are_skipped_without_data(self):
+        """Test that empty sections build no figure"""
+        assert sections.build_book_deliveries_chart({}) is None
+        assert sections.build_task_points_chart({}) is None
+        assert sections.build_organization_chart(0, 0) is None
+        assert sections.build_book_deliveries_chart({1: 3}) is not None
+
+
+class TestSeasonSections:
+    """Test sections that depend on the dates of the active season"""
+
+    def test_countdown_to_season_end(self):
+        """Test the countdown uses the season end date when given"""
+        with freeze_time("2026-10-01"):
+            assert sections.calculate_countdown(dt.date(2026, 10, 31)) == 30
+            assert sections.calculate_countdown(dt.date(2026, 9, 1)) == 0
+            assert sections.calculate_countdown() == 0
+
+    def test_weeks_counted_from_season_start(self):
+        """Test week 1 starts at the season instead of the first entry"""
+        tasks = [MagicMock(id=1, tasks="Livro de Mórmon entregue")]
+        # Wednesday of the third week of a season started on a Monday
+        timestamp = dt.datetime(2026, 8, 19, 12).timestamp()
+        compiled = [MagicMock(task_id=1, quantity=2, timestamp=timestamp)]
+
+        by_season = sections.calculate_weekly_book_deliveries(
+            compiled, tasks, dt.date(2026, 8, 3)
+        )
+        by_first_entry = sections.calculate_weekly_book_deliveries(
+            compiled, tasks
+        )
+
+        assert by_season == {3: 2}
+        assert by_first_entry == {1: 2}
+
+
+class TestColumnarSections:
+    """Test the helpers give the same results for rows and columns"""
+
+    @freeze_time("2025-09-17 12:00:00")
+    def test_columns_match_rows(self):
+        """Test every section helper agrees on both representations"""
+        tasks = [
+            MagicMock(
+                id=1,
+                tasks="Entregar Livro de Mórmon + foto + relato no grupo",
+                points=10,
+            ),
+            MagicMock(id=2, tasks="Visitar com as Sisteres", points=5),
+        ]
+        youths = [
+            MagicMock(id=1, organization="Moças", total_points=47),
+            MagicMock(id=2, organization="Rapazes", total_points=15),
+        ]
+        youths[0].name, youths[1].name = "Ana", "Davi"
+        now = dt.datetime(2025, 9, 17).timestamp()
+        week = 7 * 24 * 3600
+        rows = [
+            MagicMock(
+                youth_id=1,
+                task_id=1,
+                timestamp=now - 2 * week,
+                quantity=2,
+                bonus=0,
+            ),
+            MagicMock(
+                youth_id=2,
+                task_id=2,
+                timestamp=now - week,
+                quantity=1,
+                bonus=10,
+            ),
+            MagicMock(
+                youth_id=1, task_id=2, timestamp=now, quantity=3, bonus=2
+            ),
+            MagicMock(
+                youth_id=3, task_id=9, timestamp=now, quantity=1, bonus=0
+            ),
+        ]
+        columns = sections.EntryColumns.from_entries(rows)
+
+        assert sections.calculate_task_totals(
+            columns, tasks
+        ) == sections.calculate_task_totals(rows, tasks)
+        assert sections.calculate_task_points(
+            columns, tasks
+        ) == sections.calculate_task_points(rows, tasks)
+        assert sections.calculate_weekly_youth_points(
+            columns, tasks, youths
+        ) == sections.calculate_weekly_youth_points(rows, tasks, youths)
+        assert sections.calculate_weekly_book_deliveries(
+            columns, tasks
+        ) == sections.calculate_weekly_book_deliveries(rows, tasks)
+        assert sections.calculate_weekly_series(
+            columns, tasks
+        ) == sections.calculate_weekly_series(rows, tasks)
@@ -0,0 +1,301 @@
+import datetime as dt
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+import api
+import kiosk
+from async_database import clear_game_data_cache
+from database import (
+    CompiledFormDataRepository,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+    clear_known_tenants,
+)
+from server import start_public_server
+from tenancy import tenant_scope
+
+
+def http_get(url, **headers):
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+class TestKioskServer:
+    """Test the kiosk pages served by the public server"""
+
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_path):
+        """Serve a published page from a temporary directory"""
+        (tmp_path / "ala-tv.html").write_text("<html>tv</html>")
+        (tmp_path / kiosk.PLOTLY_JS).write_text("// plotly")
+
+        with (
+            patch("kiosk.KIOSK_DIR", tmp_path),
+            patch(
+                "kiosk.publish_kiosk", side_effect=kiosk.kiosk_path
+            ) as self.publish,
+            patch(
+                "server.is_known_tenant",
+                side_effect=lambda tenant: tenant == "ala-tv",
+            ),
+        ):
+            server = start_public_server(0)
+            self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            yield
+            server.shutdown()
+            server.server_close()
+
+    def get(self, path, **headers):
+        return http_get(self.base_url + path, **headers)
+
+    def test_page_is_served_with_validators(self):
+        """Test the page carries ETag and Last-Modified"""
+        status, headers, body = self.get("/kiosk/ala-tv.html")
+
+        assert status == 200
+        assert body == b"<html>tv</html>"
+        assert headers["Content-Type"] == "text/html; charset=utf-8"
+        assert headers["ETag"]
+        assert headers["Last-Modified"]
+
+    def test_conditional_requests_get_not_modified(self):
+        """Test that revalidating an unchanged page returns no body"""
+        _, headers, _ = self.get("/kiosk/ala-tv.html")
+
+        by_etag = self.get(
+            "/kiosk/ala-tv.html", **{"If-None-Match": headers["ETag"]}
+        )
+        by_date = self.get(
+            "/kiosk/ala-tv.html",
+            **{"If-Modified-Since": headers["Last-Modified"]},
+        )
+        stale = self.get("/kiosk/ala-tv.html", **{"If-None-Match": '"old"'})
+
+        assert by_etag[0] == 304
+        assert by_date[0] == 304
+        assert stale[0] == 200
+
+    def test_plotly_bundle_is_cached_for_long(self):
+        """Test the versioned plotly bundle is served as immutable"""
+        status, headers, _ = self.get(f"/kiosk/{kiosk.PLOTLY_JS}")
+
+        assert status == 200
+        assert headers["Content-Type"] == "text/javascript"
+        assert "max-age=31536000" in headers["Cache-Control"]
+
+    @pytest.mark.parametrize(
+        "path",
+        ["/kiosk/ala-nova.html", "/kiosk/../etc.html", "/kiosk/ala", "/outro"],
+    )
+    def test_unknown_pages_are_not_found(self, path):
+        """Test that only published pages of valid wards are served"""
+        assert self.get(path)[0] == 404
+
+    def test_unknown_wards_are_not_published(self):
+        """Test that no page is rendered for a ward that does not exist"""
+        assert self.get("/kiosk/ala-inventada.html")[0] == 404
+        self.publish.assert_not_called()
+
+    def test_failed_render_keeps_last_page(self):
+        """Test the last published page is served when rendering fails"""
+        with patch("kiosk.publish_kiosk", side_effect=RuntimeError("db")):
+            status, _, body = self.get("/kiosk/ala-tv.html")
+
+        assert status == 200
+        assert body == b"<html>tv</html>"
+
+
+class TestApiServer:
+    """Test the JSON API served by the public server"""
+
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_path):
+        """Serve the API from a temporary database with one youth"""
+        test_engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+        SQLModel.metadata.create_all(test_engine)
+        clear_game_data_cache()
+        clear_known_tenants()
+        api._responses.clear()
+
+        with patch("database.engine", test_engine):
+            with tenant_scope("ala-api"):
+                youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+                task = TasksFormDataRepository.store(
+                    "Visitar com as Sisteres", 5, True
+                )
+                CompiledFormDataRepository.store(
+                    youth.id, task.id, dt.datetime.now().timestamp(), 2, 1
+                )
+                YouthFormDataRepository.update_total_points(youth.id, 11)
+            self.youth_id = youth.id
+
+            server = start_public_server(0)
+            self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            yield
+            server.shutdown()
+            server.server_close()
+
+    def get(self, path, **headers):
+        return http_get(self.base_url + path, **headers)
+
+    def test_rankings(self):
+        """Test rankings of a ward are served as JSON"""
+        status, headers, body = self.get("/api/rankings?ala=ala-api")
+        data = json.loads(body)
+
+        assert status == 200
+        assert headers["Content-Type"] == "application/json; charset=utf-8"
+        assert headers["Access-Control-Allow-Origin"] == "*"
+        assert data["ala"] == "ala-api"
+        assert data["season"] is None
+        assert [
+            (r["position"], r["name"], r["total_points"])
+            for r in data["rankings"]
+        ] == [(1, "Maria", 11)]
+
+    def test_other_endpoints(self):
+        """Test weekly points, activity totals and weekly series"""
+        weekly = json.loads(self.get("/api/weekly-points?ala=ala-api")[2])
+        totals = json.loads(self.get("/api/activity-totals?ala=ala-api")[2])
+        series = json.loads(self.get("/api/weekly-series?ala=ala-api")[2])
+
+        assert [w["points"] for w in weekly["weekly_points"]] == [11]
+        assert totals["totals"]["Lições"] == 2
+        assert totals["this_week"]["Lições"] == 2
+        assert [(w["week"], w["points"]) for w in series["weekly_series"]] == [
+            (1, 11)
+        ]
+        assert series["weekly_series"][0]["activities"]["Lições"] == 2
+
+    def test_conditional_get(self):
+        """Test an unchanged ward answers 304 and a write changes the ETag"""
+        _, headers, _ = self.get("/api/rankings?ala=ala-api")
+        etag = headers["ETag"]
+
+        assert (
+            self.get("/api/rankings?ala=ala-api", **{"If-None-Match": etag})[0]
+            == 304
+        )
+
+        with tenant_scope("ala-api"):
+            # A write that leaves the rankings as they were keeps the ETag
+            YouthFormDataRepository.store("João", 16, "Rapazes", 0)
+            unchanged = self.get(
+                "/api/rankings?ala=ala-api", **{"If-None-Match": etag}
+            )
+            YouthFormDataRepository.update_total_points(self.youth_id, 20)
+        status, headers, _ = self.get(
+            "/api/rankings?ala=ala-api", **{"If-None-Match": etag}
+        )
+        assert unchanged[0] == 304
+        assert status == 200
+        assert headers["ETag"] != etag
+
+    def test_errors(self):
+        """Test unknown endpoints, invalid wards and database failures"""
+        assert self.get("/api/nada")[0] == 404
+        assert self.get("/api/rankings?ala=Ala%20Centro")[0] == 400
+        with patch("api.get_game_data", side_effect=RuntimeError("db")):
+            status, _, body = self.get("/api/rankings?ala=ala-api")
+
+        assert status == 503
+        assert "error" in json.loads(body)
+
+    def test_unknown_ward(self):
+        """Test a ward without youths is not found and not cached"""
+        with patch("api.get_game_data") as mock_game_data:
+            status, _, body = self.get("/api/rankings?ala=ala-inventada")
+
+        assert status == 404
+        assert json.loads(body) == {"error": "Ala inexistente"}
+        mock_game_data.assert_not_called()
+        assert len(api._responses) == 0
+
+    def test_default_tenant(self):
+        """Test requests without a ward read the default one"""
+        data = json.loads(self.get("/api/rankings")[2])
+
+        assert data["ala"] == "default"
+        assert data["rankings"] == []
+
+
+class TestHealthServer:
+    """Test the health endpoints served by the public server"""
+
+    @pytest.fixture(autouse=True)
+    def server(self, tmp_path):
+        """Serve the health checks from a temporary database"""
+        test_engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}")
+        SQLModel.metadata.create_all(test_engine)
+
+        with patch("database.engine", test_engine):
+            server = start_public_server(0)
+            self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            yield
+            server.shutdown()
+            server.server_close()
+
+    def get(self, path, **headers):
+        return http_get(self.base_url + path, **headers)
+
+    def test_liveness(self):
+        """Test liveness answers without touching the database"""
+        with patch("health.database") as mock_database:
+            status, headers, body = self.get("/healthz")
+
+        assert status == 200
+        assert headers["Cache-Control"] == "no-store"
+        assert json.loads(body) == {"status": "ok"}
+        mock_database.engine.connect.assert_not_called()
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": "ready", "seconds": 1.5, "error": None},
+    )
+    def test_readiness(self, mock_warmup_status):
+        """Test readiness answers with its outcome only"""
+        with patch("sections.calculate_task_totals") as mock_aggregate:
+            status, _, body = self.get("/readyz")
+
+        assert status == 200
+        assert json.loads(body) == {"status": "ready"}
+        mock_aggregate.assert_not_called()
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": "running", "seconds": None, "error": None},
+    )
+    def test_not_ready_while_warming_up(self, mock_warmup_status):
+        """Test traffic waits for the warm-up to finish"""
+        status, _, body = self.get("/readyz")
+
+        assert status == 503
+        assert json.loads(body)["status"] == "not_ready"
+
+    @patch(
+        "health.warmup_status",
+        return_value={"state": "failed", "seconds": 1.0, "error": "x"},
+    )
+    def test_not_ready_when_database_fails(self, mock_warmup_status):
+        """Test a database error is not raised nor shown to the public"""
+        with patch(
+            "health._ping_database", side_effect=RuntimeError("senha errada")
+        ):
+            status, _, body = self.get("/readyz")
+
+        assert status == 503
+        assert json.loads(body) == {"status": "not_ready"}
@@ -0,0 +1,146 @@
+import dataclasses
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+import snapshot
+from tenancy import bump_data_version, tenant_scope
+
+
+def game_rows(name="Ana"):
+    return snapshot.freeze_game_data(
+        [
+            SimpleNamespace(
+                id=1,
+                name=name,
+                age=15,
+                organization="Moças",
+                total_points=10,
+            )
+        ],
+        [SimpleNamespace(id=1, tasks="Ler", points=10, repeatable=True)],
+        [
+            SimpleNamespace(
+                id=1,
+                youth_id=1,
+                task_id=1,
+                timestamp=1.0,
+                quantity=1,
+                bonus=0,
+                season_id=None,
+            )
+        ],
+    )
+
+
+class TestFreezeGameData:
+    """Test the compact copies kept by the snapshot"""
+
+    def test_rows_are_immutable_and_slotted(self):
+        """Test sessions cannot change the shared rows"""
+        youths, tasks, compiled = game_rows()
+
+        assert youths[0].name == "Ana"
+        assert tasks[0].repeatable is True
+        assert compiled[0].quantity == 1
+        assert not hasattr(youths[0], "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            youths[0].total_points = 99
+
+
+class TestSnapshotStore:
+    """Test the snapshot shared by every session of the process"""
+
+    def test_reads_do_not_load_until_the_ward_changes(self):
+        """Test reruns without writes never query"""
+        load = MagicMock(
+            side_effect=lambda season_id, with_entries: game_rows()
+        )
+        store = snapshot.SnapshotStore(load)
+
+        with tenant_scope("ala-snapshot"):
+            first = store.get(3)
+            assert store.get(3) is first
+            load.assert_called_once_with(3, True)
+
+            bump_data_version()
+            assert store.get(3) is not first
+
+        assert load.call_count == 2
+        assert len(store) == 1
+
+    def test_refresh_picks_up_writes_of_other_machines(self):
+        """Test old snapshots are loaded again after the interval"""
+        names = iter(["Ana", "Bia"])
+        store = snapshot.SnapshotStore(
+            lambda season_id, with_entries: game_rows(next(names)),
+            refresh_seconds=0,
+        )
+
+        with tenant_scope("ala-intervalo"):
+            store.get()
+            store.refresh()
+            youths, _, _ = store.get().game_data
+
+        assert youths[0].name == "Bia"
+
+    def test_snapshot_without_entries_is_shared_by_the_seasons(self):
+        """Test pages reading only youths and tasks load them once for
+        every season, apart from the full snapshots"""
+        load = MagicMock(
+            side_effect=lambda season_id, with_entries: game_rows()
+        )
+        store = snapshot.SnapshotStore(load)
+
+        with tenant_scope("ala-sem-entradas"):
+            roster = store.get(3, with_entries=False)
+            assert store.get(4, with_entries=False) is roster
+            assert store.get(3) is not roster
+
+        assert [c.args for c in load.call_args_list] == [
+            (None, False),
+            (3, True),
+        ]
+
+    def test_failed_refresh_keeps_the_last_snapshot(self):
+        """Test a database error does not empty the dashboard"""
+        load = MagicMock(return_value=game_rows())
+        store = snapshot.SnapshotStore(load, refresh_seconds=0)
+
+        with tenant_scope("ala-falha"):
+            first = store.get()
+            load.side_effect = RuntimeError("db")
+            store.refresh()
+            assert store.get() is first
+
+    def test_idle_snapshots_are_dropped(self):
+        """Test wards nobody reads stop using memory"""
+        store = snapshot.SnapshotStore(
+            lambda season_id, with_entries: game_rows(), idle_seconds=-1
+        )
+
+        with tenant_scope("ala-ociosa"):
+            store.get()
+        store.refresh()
+
+        assert len(store) == 0
+
+    def test_refresher_runs_after_writes(self):
+        """Test the refresher thread wakes up on a write"""
+        store = snapshot.SnapshotStore(
+            lambda season_id, with_entries: game_rows()
+        )
+        with patch.object(store, "refresh") as mock_refresh:
+            thread = store.start_refresher()
+            while not mock_refresh.called:
+                bump_data_version("ala-refresh")
+                thread.join(timeout=0.01)
+
+        assert thread.name == "snapshot-refresher"
+        assert thread.daemon
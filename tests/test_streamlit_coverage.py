@@ -35,7 +35,8 @@ class TestStreamlitPageCoverage:
 
         os.chdir(os.path.join(os.path.dirname(__file__), "..", "src"))
         at = AppTest.from_file("Dashboard.py")
-        at.run()
+        with patch("async_database.load_game_data", return_value=([], [], [])):
+            at.run()
         assert not at.exception
 
         # Test with some data
@@ -87,7 +88,15 @@ class TestStreamlitPageCoverage:
 
         mock_compiled.return_value = [mock_compiled1, mock_compiled2]
 
-        at.run()
+        with patch(
+            "async_database.load_game_data",
+            return_value=(
+                mock_youth.return_value,
+                mock_tasks.return_value,
+                mock_compiled.return_value,
+            ),
+        ):
+            at.run()
         assert not at.exception
 
 
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+
+from tenancy import (
+    DEFAULT_TENANT,
+    bump_data_version,
+    get_current_tenant,
+    get_data_version,
+    get_table_version,
+    is_valid_tenant,
+    set_current_tenant,
+    tenant_scope,
+    wait_for_data_change,
+)
+
+
+class TestCurrentTenant:
+    """Test the tenant scoping of the current context"""
+
+    def test_default_tenant(self):
+        """Test that contexts start in the default tenant"""
+        assert get_current_tenant() == DEFAULT_TENANT
+
+    def test_tenant_scope_restores_previous(self):
+        """Test that a scope restores the tenant it replaced"""
+        with tenant_scope("ala-norte"):
+            assert get_current_tenant() == "ala-norte"
+            with tenant_scope("estaca-sul"):
+                assert get_current_tenant() == "estaca-sul"
+            assert get_current_tenant() == "ala-norte"
+        assert get_current_tenant() == DEFAULT_TENANT
+
+    @pytest.mark.parametrize(
+        "tenant", ["", "Ala", "ala norte", "../ala", "-ala", "a" * 65]
+    )
+    def test_invalid_tenants_are_rejected(self, tenant):
+        """Test that only lowercase slugs are accepted"""
+        assert is_valid_tenant(tenant) is False
+        with pytest.raises(ValueError):
+            set_current_tenant(tenant)
+        with pytest.raises(ValueError):
+            with tenant_scope(tenant):
+                pass
+
+
+class TestDataVersions:
+    """Test the per tenant data versions that key the caches"""
+
+    def test_versions_are_independent(self):
+        """Test that a write to one tenant keeps the others cached"""
+        small_ward = get_data_version("ala-pequena")
+        busy_stake = get_data_version("estaca-grande")
+
+        with tenant_scope("estaca-grande"):
+            bump_data_version()
+        bump_data_version("estaca-grande")
+
+        assert get_data_version("estaca-grande") == busy_stake + 2
+        assert get_data_version("ala-pequena") == small_ward
+
+    def test_table_versions(self):
+        """Test a table's version only follows the writes to that table,
+        and to unknown tables"""
+        youths = get_table_version("youthformdata", "ala-tabelas")
+
+        bump_data_version("ala-tabelas", "compiledformdata")
+        assert get_table_version("youthformdata", "ala-tabelas") == youths
+        bump_data_version("ala-tabelas", "youthformdata")
+        bump_data_version("ala-tabelas")
+        assert get_table_version("youthformdata", "ala-tabelas") == youths + 2
+
+    def test_waiters_are_woken_by_a_write(self):
+        """Test background refreshers notice writes right away"""
+        woken = []
+        waiter = threading.Thread(
+            target=lambda: woken.append(wait_for_data_change(5))
+        )
+        waiter.start()
+        while waiter.is_alive() and not woken:
+            bump_data_version("ala-acordada")
+            waiter.join(timeout=0.01)
+
+        assert woken == [True]
+        assert wait_for_data_change(0.01) is False
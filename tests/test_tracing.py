@@ -0,0 +1,143 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import sections
+import tracing
+from async_database import run_async
+from profiling import COMPUTATION, REPOSITORY, SECTION, section
+from tracing import SQL, traced
+from utils import handle_database_operation
+
+
+async def current_span():
+    return tracing._current_span.get()
+
+
+@pytest.fixture
+def trace():
+    """A traced run exported to the console"""
+    with patch("tracing.TRACING_EXPORTER", "console"):
+        root = tracing.start_trace("Dashboard", tenant="default")
+        yield root
+        tracing._current_span.set(None)
+
+
+def spans_by_name(trace_):
+    return {span.name: span for span in trace_.spans}
+
+
+class TestSpans:
+    """Test the spans of a page run"""
+
+    def test_nothing_is_traced_when_disabled(self):
+        """Test runs are not traced without an exporter"""
+        assert tracing.start_trace("Dashboard") is None
+        with traced(SECTION, "Ranking") as span:
+            assert span is None
+        assert tracing.finish_trace() is None
+
+    def test_spans_nest_from_section_to_sql(self, trace):
+        """Test a section, its repository call and the SQL it runs nest"""
+        engine = create_engine("sqlite://")
+        with section("Ranking"):
+            handle_database_operation(
+                lambda: engine.connect().execute(text("SELECT 1")).all(),
+                "busca do ranking",
+            )
+        finished = tracing.finish_trace()
+
+        spans = spans_by_name(finished)
+        ranking = spans["Ranking"]
+        repository = spans["busca do ranking"]
+        statement = spans["SELECT"]
+        assert ranking.parent_id == trace.span_id
+        assert (ranking.kind, repository.kind) == (SECTION, REPOSITORY)
+        assert repository.parent_id == ranking.span_id
+        assert statement.kind == SQL
+        assert statement.parent_id == repository.span_id
+        assert statement.attributes["db.statement"] == "SELECT 1"
+        assert statement.attributes["db.system"] == "sqlite"
+        assert trace.end_ns >= ranking.end_ns >= statement.end_ns
+
+    def test_spans_follow_the_run_to_other_threads(self, trace):
+        """Test section threads and the async loop see the span of the
+        code that handed them work"""
+        sections.submit_section(lambda: None).result()
+        with traced(REPOSITORY, "busca dos dados") as repository:
+            loop_span = run_async(current_span())
+        finished = tracing.finish_trace()
+
+        computation = next(s for s in finished.spans if s.kind == COMPUTATION)
+        assert computation.parent_id == trace.span_id
+        assert computation.thread.startswith("section")
+        assert loop_span is repository
+
+    def test_errors_are_recorded(self, trace):
+        """Test a failing block and a failing statement end their spans
+        with the error"""
+        engine = create_engine("sqlite://")
+        with pytest.raises(ValueError), traced(SECTION, "Gráficos"):
+            raise ValueError("sem dados")
+        with pytest.raises(OperationalError), engine.connect() as connection:
+            connection.execute(text("SELECT * FROM tabela_inexistente"))
+        finished = tracing.finish_trace()
+
+        spans = spans_by_name(finished)
+        assert spans["Gráficos"].error == "ValueError: sem dados"
+        assert "no such table" in spans["SELECT"].error
+
+
+class TestExporters:
+    """Test where finished traces go"""
+
+    def test_console_prints_a_tree(self, trace, capsys):
+        """Test the console shows each span indented below its parent"""
+        with section("Ranking"), traced(REPOSITORY, "busca do ranking"):
+            pass
+        tracing.finish_trace()
+
+        lines = capsys.readouterr().err.splitlines()
+        assert lines[0] == f"trace {trace.trace.trace_id}"
+        assert "  Página Dashboard [" in lines[1]
+        assert "    Seção Ranking [" in lines[2]
+        assert "      Repositório busca do ranking [" in lines[3]
+
+    def test_file_appends_json_lines(self, tmp_path):
+        """Test the spans are written as OpenTelemetry-like JSON lines"""
+        path = tmp_path / "traces.jsonl"
+        with (
+            patch("tracing.TRACING_EXPORTER", "file"),
+            patch("tracing.TRACING_FILE", path),
+        ):
+            root = tracing.start_trace("Dashboard", tenant="ala-1")
+            with section("Ranking"):
+                pass
+            tracing.finish_trace()
+
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        by_name = {span["name"]: span for span in spans}
+        assert by_name["Ranking"]["parentSpanId"] == root.span_id
+        assert by_name["Dashboard"]["parentSpanId"] is None
+        assert by_name["Dashboard"]["attributes"]["tenant"] == "ala-1"
+        assert {span["traceId"] for span in spans} == {root.trace.trace_id}
+        assert all(span["status"] == {"code": "OK"} for span in spans)
+
+    def test_fast_runs_are_dropped(self, capsys):
+        """Test runs under the minimum duration are not exported"""
+        with (
+            patch("tracing.TRACING_EXPORTER", "console"),
+            patch("tracing.TRACING_MIN_DURATION_MS", 60_000),
+        ):
+            tracing.start_trace("Dashboard")
+            tracing.finish_trace()
+
+        assert capsys.readouterr().err == ""
@@ -7,7 +7,15 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 import streamlit as st
 
-from utils import check_password, handle_database_operation
+from tenancy import DEFAULT_TENANT, get_current_tenant, set_current_tenant
+from utils import (
+    check_password,
+    get_idempotency_key,
+    handle_database_operation,
+    reset_idempotency_key,
+    select_tenant,
+    ward_password,
+)
 
 
 class TestCheckPassword:
@@ -112,6 +120,79 @@ class TestCheckPassword:
             # Password should remain in session state for incorrect attempts
 
 
+class TestIdempotencyKey:
+    """Test idempotency keys of form submissions"""
+
+    def setup_method(self):
+        """Reset Streamlit session state before each test"""
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+
+    def test_key_is_stable_until_reset(self):
+        """Test that reruns reuse the key and a reset issues a new one"""
+        first = get_idempotency_key("compiled_form")
+        assert get_idempotency_key("compiled_form") == first
+        assert get_idempotency_key("other_form") != first
+
+        reset_idempotency_key("compiled_form")
+        assert get_idempotency_key("compiled_form") != first
+
+
+class TestSelectTenant:
+    """Test choosing the ward of a session from the URL"""
+
+    def setup_method(self):
+        """Reset Streamlit session state before each test"""
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+
+    def teardown_method(self):
+        """Return the test context to the default tenant"""
+        set_current_tenant(DEFAULT_TENANT)
+
+    def test_default_tenant_without_query_parameter(self):
+        """Test that sessions without a ward use the default one"""
+        with patch("streamlit.query_params", {}):
+            assert select_tenant() == DEFAULT_TENANT
+
+    def test_tenant_from_query_parameter_is_kept(self):
+        """Test the ward survives page navigation without the parameter"""
+        with patch("streamlit.query_params", {"ala": "ala-centro"}):
+            assert select_tenant() == "ala-centro"
+        with patch("streamlit.query_params", {}):
+            assert select_tenant() == "ala-centro"
+        assert get_current_tenant() == "ala-centro"
+
+    def test_changing_ward_asks_for_the_password_again(self):
+        """Test a session logged into one ward is not logged into another
+        by editing the URL"""
+        with patch("streamlit.query_params", {"ala": "ala-centro"}):
+            select_tenant()
+        st.session_state["password_correct"] = True
+
+        with patch("streamlit.query_params", {"ala": "ala-centro"}):
+            select_tenant()
+        assert st.session_state["password_correct"] is True
+
+        with patch("streamlit.query_params", {"ala": "ala-norte"}):
+            select_tenant()
+        assert "password_correct" not in st.session_state
+
+    @patch.dict(
+        os.environ, {"AUTH": "geral", "AUTH_ALA_CENTRO": "centro"}, clear=True
+    )
+    def test_each_ward_can_have_its_own_password(self):
+        """Test a ward uses its own password, and the shared one without"""
+        assert ward_password("ala-centro") == "centro"
+        assert ward_password("ala-norte") == "geral"
+        assert ward_password(DEFAULT_TENANT) == "geral"
+
+    def test_invalid_tenant_is_ignored(self):
+        """Test that a malformed ward does not change the session's"""
+        with patch("streamlit.query_params", {"ala": "../Ala Centro"}):
+            assert select_tenant() == DEFAULT_TENANT
+
+
 class TestHandleDatabaseOperation:
     """Test database operation error handling"""
 
@@ -0,0 +1,108 @@
+import datetime as dt
+import os
+import sys
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+import aggregates
+import api
+import warmup
+from async_database import clear_game_data_cache
+from cache import figure_cache
+from database import (
+    CompiledFormDataRepository,
+    TasksFormDataRepository,
+    YouthFormDataRepository,
+)
+from tenancy import DEFAULT_TENANT, tenant_scope
+
+
+class TestWarmup:
+    """Test the warm-up of a freshly started process"""
+
+    @pytest.fixture(autouse=True)
+    def setup_test_db(self, tmp_path):
+        """Point the database at a temporary file with empty caches"""
+        test_engine = create_engine(f"sqlite:///{tmp_path / 'warmup.db'}")
+        SQLModel.metadata.create_all(test_engine)
+        clear_game_data_cache()
+        figure_cache.clear()
+        api._responses.clear()
+
+        with patch("database.engine", test_engine):
+            yield
+
+        refresher = aggregates._refreshers.pop(test_engine, None)
+        if refresher is not None:
+            refresher.stop()
+        clear_game_data_cache()
+        figure_cache.clear()
+        api._responses.clear()
+
+    def test_warm_up_fills_the_caches_of_every_ward(self):
+        """Test charts and API responses are built for wards with data"""
+        with tenant_scope("ala-warmup"):
+            youth = YouthFormDataRepository.store("Maria", 15, "Moças", 0)
+            task = TasksFormDataRepository.store(
+                "Entregar Livro de Mórmon + foto + relato no grupo", 10, True
+            )
+            CompiledFormDataRepository.store(
+                youth.id, task.id, dt.datetime.now().timestamp(), 1, 0
+            )
+            YouthFormDataRepository.update_total_points(youth.id, 10)
+
+        assert warmup.known_tenants() == sorted([DEFAULT_TENANT, "ala-warmup"])
+
+        with (
+            patch("sections.calculate_weekly_book_deliveries") as mock_books,
+            patch("sections.calculate_task_points") as mock_task_points,
+        ):
+            warmup.warm_up()
+
+        # The charts are built from the aggregates, as on the Dashboard
+        mock_books.assert_not_called()
+        mock_task_points.assert_not_called()
+        status = warmup.warmup_status()
+        assert status["state"] == warmup.WarmupState.READY
+        assert status["seconds"] >= 0
+        charts = {
+            key[0] for key in figure_cache._entries if key[1] == "ala-warmup"
+        }
+        assert charts == {"book_deliveries", "task_points", "organization"}
+        # The aggregates were refreshed and read ahead of the Dashboard
+        assert aggregates.aggregates_state()["running"]
+        (totals,) = [
+            rows
+            for key, rows in aggregates.aggregate_cache._entries.items()
+            if key[0] == "ala-warmup"
+        ]
+        assert len(totals.task_totals) == 1
+        assert {
+            key[0] for key in api._responses._entries if key[1] == "ala-warmup"
+        } == set(api.ENDPOINTS)
+
+    def test_failed_warm_up_is_reported(self):
+        """Test a database error leaves the process marked as failed"""
+        with patch(
+            "warmup.open_connections", side_effect=Exception("sem conexão")
+        ):
+            warmup.warm_up()
+
+        status = warmup.warmup_status()
+        assert status["state"] == warmup.WarmupState.FAILED
+        assert status["error"] == "sem conexão"
+
+    def test_start_warmup_runs_in_the_background(self):
+        """Test the warm-up does not block the caller"""
+        with patch("warmup.warm_up") as mock_warm_up:
+            thread = warmup.start_warmup()
+            thread.join(timeout=5)
+
+        assert thread.name == "warmup"
+        assert thread.daemon
+        mock_warm_up.assert_called_once_with()